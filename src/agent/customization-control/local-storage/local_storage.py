@@ -12,6 +12,13 @@ from pathlib import Path
 import json
 import time
 
+try:
+    from learning.adaptive_profiler import profiled
+except ImportError:
+    # Profiling hooks are optional outside the reasoning engine
+    def profiled(name=None, **kwargs):
+        return lambda fn: fn
+
 
 @dataclass
 class ChatMessage:
@@ -103,6 +110,7 @@ class LocalStorage:
             )
         """)
     
+    @profiled("local_storage.store_message")
     def store_message(self, msg: ChatMessage):
         """Store chat message LOCALLY"""
         self.conn.execute("""
@@ -111,6 +119,7 @@ class LocalStorage:
         """, [msg.session_id, msg.role, msg.content, msg.timestamp, 
               json.dumps(msg.metadata)])
     
+    @profiled("local_storage.get_session_history")
     def get_session_history(self, session_id: str) -> List[ChatMessage]:
         """Get session history from LOCAL storage"""
         result = self.conn.execute("""
@@ -131,6 +140,7 @@ class LocalStorage:
             ))
         return messages
     
+    @profiled("local_storage.store_rag_context")
     def store_rag_context(self, context: RAGContext):
         """Store RAG context LOCALLY"""
         self.conn.execute("""
@@ -139,6 +149,7 @@ class LocalStorage:
         """, [context.session_id, context.document, context.embedding,
               json.dumps(context.metadata)])
     
+    @profiled("local_storage.search_rag_context")
     def search_rag_context(self, session_id: str, query: str) -> List[RAGContext]:
         """Search RAG context LOCALLY (full-text search)"""
         result = self.conn.execute("""
@@ -158,6 +169,7 @@ class LocalStorage:
             ))
         return contexts
     
+    @profiled("local_storage.set_preference")
     def set_preference(self, key: str, value: Any):
         """Set user preference - stored LOCALLY ONLY"""
         self.conn.execute("""
@@ -165,6 +177,7 @@ class LocalStorage:
             VALUES (?, ?, ?)
         """, [key, json.dumps(value), str(time.time())])
     
+    @profiled("local_storage.get_preference")
     def get_preference(self, key: str) -> Optional[Any]:
         """Get user preference from LOCAL storage"""
         result = self.conn.execute("""
@@ -187,6 +200,7 @@ class LocalStorage:
             UPDATE sessions SET last_active = ? WHERE session_id = ?
         """, [str(time.time()), session_id])
     
+    @profiled("local_storage.export_to_parquet")
     def export_to_parquet(self, table: str, output_path: str):
         """Export table to Parquet for LOCAL backup"""
         result = self.conn.execute(f"SELECT * FROM {table}").fetch_arrow_table()
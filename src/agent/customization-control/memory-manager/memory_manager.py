@@ -9,6 +9,13 @@ import time
 import json
 from datetime import datetime, timedelta
 
+try:
+    from learning.adaptive_profiler import profiled
+except ImportError:
+    # Profiling hooks are optional outside the reasoning engine
+    def profiled(name=None, **kwargs):
+        return lambda fn: fn
+
 
 @dataclass
 class MemoryEntry:
@@ -108,6 +115,7 @@ class MemoryManager:
         )
         self.memory.long_term.append(long_term_entry)
     
+    @profiled("memory_manager.consolidate")
     def consolidate(self, importance_threshold: float = 0.7):
         """
         Consolidate memories:
@@ -138,6 +146,7 @@ class MemoryManager:
         
         self.memory.long_term = unique_long_term
     
+    @profiled("memory_manager.search")
     def search(self, query: str, memory_type: str = "all") -> List[MemoryEntry]:
         """Search memories by content"""
         results = []
@@ -159,6 +168,7 @@ class MemoryManager:
         results.sort(key=lambda e: e.importance, reverse=True)
         return results
     
+    @profiled("memory_manager.get_recent")
     def get_recent(self, count: int = 10, memory_type: str = "all") -> List[MemoryEntry]:
         """Get recent memories"""
         memories = []
@@ -170,6 +180,7 @@ class MemoryManager:
         memories.sort(key=lambda e: e.timestamp, reverse=True)
         return memories[:count]
     
+    @profiled("memory_manager.get_by_tags")
     def get_by_tags(self, tags: List[str]) -> List[MemoryEntry]:
         """Get memories by tags"""
         results = []
@@ -192,6 +203,7 @@ class MemoryManager:
         """Get context information"""
         return self.memory.context.get(key)
     
+    @profiled("memory_manager.load")
     def load(self) -> bool:
         """Load memory from file"""
         if not self.memory_path.exists():
@@ -211,6 +223,7 @@ class MemoryManager:
         
         return True
     
+    @profiled("memory_manager.save")
     def save(self):
         """Save memory to file"""
         # Consolidate before saving
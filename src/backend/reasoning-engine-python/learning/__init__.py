@@ -11,12 +11,14 @@ from .online_learner import OnlineLearner
 from .preference_engine import PreferenceEngine
 from .skill_acquisition import SkillAcquisitionEngine
 from .context_adapter import ContextAdapter
+from .contextual_bandit import ContextualBandit
 
 __all__ = [
     'OnlineLearner',
     'PreferenceEngine',
     'SkillAcquisitionEngine',
     'ContextAdapter',
+    'ContextualBandit',
 ]
 
 __version__ = '1.0.0'
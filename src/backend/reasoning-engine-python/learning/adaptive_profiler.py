@@ -1,26 +1,46 @@
+import os
 import time
+import random
+import inspect
+import functools
 import threading
 import statistics
-from typing import Dict, Any, List, Callable, Optional
+import tracemalloc
+from collections import deque
+from typing import Dict, Any, List, Callable, Optional, Deque, Sequence, Tuple
 
 class AdaptiveProfiler:
     """
     Collects runtime metrics and adapts learning/execution parameters online.
     Provides hooks for the online learner and workflow optimizer.
+
+    Observations are appended to a per-thread buffer without taking any lock;
+    the emitter thread (or an explicit snapshot) merges all buffers into the
+    shared metric windows. A thread whose buffer reaches buffer_size before
+    the emitter comes round merges it itself, so no observation is dropped.
     """
 
     def __init__(self,
                  window_size: int = 50,
                  emit_interval_sec: float = 5.0,
-                 observers: Optional[List[Callable[[Dict[str, Any]], None]]] = None):
+                 observers: Optional[List[Callable[[Dict[str, Any]], None]]] = None,
+                 buffer_size: int = 10000,
+                 enabled: bool = True,
+                 alloc_sample_rate: float = 0.0):
         self.window_size = window_size
         self.emit_interval_sec = emit_interval_sec
-        self.metrics: Dict[str, List[float]] = {}
+        self.buffer_size = buffer_size
+        self.enabled = enabled
+        self.alloc_sample_rate = alloc_sample_rate
+        self.metrics: Dict[str, Deque[float]] = {}
         self.tags: Dict[str, Any] = {}
         self._lock = threading.RLock()
+        self._local = threading.local()
+        self._buffers: List[Tuple[threading.Thread, Deque[Tuple[str, float]]]] = []
         self._stop = threading.Event()
         self._thread: Optional[threading.Thread] = None
         self.observers = observers or []
+        self.sinks: List[Callable[[List[Tuple[str, float]]], None]] = []
 
     def start(self):
         if self._thread and self._thread.is_alive():
@@ -47,11 +67,69 @@ class AdaptiveProfiler:
                         pass
 
     def observe(self, name: str, value: float):
+        # Hot path: single-producer deque append, no shared lock
+        try:
+            buf = self._local.buffer
+        except AttributeError:
+            buf = self._register_buffer()
+        buf.append((name, value))
+        if len(buf) >= self.buffer_size:
+            with self._lock:
+                self._merge_buffers()
+
+    def _register_buffer(self) -> Deque[Tuple[str, float]]:
+        buf: Deque[Tuple[str, float]] = deque()
+        self._local.buffer = buf
         with self._lock:
-            arr = self.metrics.setdefault(name, [])
-            arr.append(value)
-            if len(arr) > self.window_size:
-                del arr[0:len(arr) - self.window_size]
+            self._buffers.append((threading.current_thread(), buf))
+        return buf
+
+    def add_sink(self, sink: Callable[[List[Tuple[str, float]]], None]):
+        """Register a callback receiving every batch of merged observations."""
+        with self._lock:
+            self.sinks.append(sink)
+
+    def _merge_buffers(self):
+        # Caller holds self._lock. popleft() is atomic against the owning
+        # thread's append(), so buffers are drained without stopping writers.
+        live = []
+        batch: Optional[List[Tuple[str, float]]] = [] if self.sinks else None
+        for thread, buf in self._buffers:
+            while True:
+                try:
+                    item = buf.popleft()
+                except IndexError:
+                    break
+                name, value = item
+                arr = self.metrics.get(name)
+                if arr is None:
+                    arr = self.metrics[name] = deque(maxlen=self.window_size)
+                arr.append(value)
+                if batch is not None:
+                    batch.append(item)
+            if thread.is_alive() or buf:
+                live.append((thread, buf))
+        self._buffers = live
+        if batch:
+            for sink in self.sinks:
+                try:
+                    sink(batch)
+                except Exception:
+                    # best-effort emit
+                    pass
+
+    def span(self, name: str, track_alloc: Optional[bool] = None) -> "_Span":
+        """
+        Context manager recording `<name>.wall_ms` and `<name>.cpu_ms`.
+        Allocation deltas (`<name>.alloc_kb`) are recorded only while
+        tracemalloc is tracing, for a sampled fraction of spans
+        (alloc_sample_rate) unless track_alloc forces it on or off.
+        """
+        if not self.enabled:
+            return _NOOP_SPAN
+        if track_alloc is None:
+            track_alloc = self.alloc_sample_rate > 0 and random.random() < self.alloc_sample_rate
+        return _Span(self, name, track_alloc and tracemalloc.is_tracing())
 
     def set_tag(self, key: str, value: Any):
         with self._lock:
@@ -59,6 +137,7 @@ class AdaptiveProfiler:
 
     def snapshot(self) -> Dict[str, Any]:
         with self._lock:
+            self._merge_buffers()
             stats: Dict[str, Any] = {"tags": dict(self.tags)}
             for k, arr in self.metrics.items():
                 if not arr:
@@ -77,7 +156,7 @@ class AdaptiveProfiler:
             return stats
 
     @staticmethod
-    def _percentile(arr: List[float], p: float) -> float:
+    def _percentile(arr: Sequence[float], p: float) -> float:
         if not arr:
             return 0.0
         arr_sorted = sorted(arr)
@@ -101,12 +180,81 @@ class AdaptiveProfiler:
             hints["increase_exploration"] = True
         return hints
 
+class _Span:
+    __slots__ = ("_profiler", "_name", "_track_alloc", "_wall", "_cpu", "_mem")
+
+    def __init__(self, profiler: AdaptiveProfiler, name: str, track_alloc: bool):
+        self._profiler = profiler
+        self._name = name
+        self._track_alloc = track_alloc
+
+    def __enter__(self):
+        if self._track_alloc:
+            self._mem = tracemalloc.get_traced_memory()[0]
+        self._cpu = time.thread_time()
+        self._wall = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        wall = time.perf_counter() - self._wall
+        cpu = time.thread_time() - self._cpu
+        observe = self._profiler.observe
+        observe(self._name + ".wall_ms", wall * 1000.0)
+        observe(self._name + ".cpu_ms", cpu * 1000.0)
+        if self._track_alloc:
+            observe(self._name + ".alloc_kb", (tracemalloc.get_traced_memory()[0] - self._mem) / 1024.0)
+        return False
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+_NOOP_SPAN = _NoopSpan()
+
 # Global singleton helper
 _profiler: Optional[AdaptiveProfiler] = None
 
 def get_profiler() -> AdaptiveProfiler:
     global _profiler
     if _profiler is None:
-        _profiler = AdaptiveProfiler()
-        _profiler.start()
+        _profiler = AdaptiveProfiler(enabled=os.getenv("ADAPTIVE_PROFILER_ENABLED", "1") != "0")
+        if _profiler.enabled:
+            _profiler.start()
     return _profiler
+
+def profiled(name: Optional[str] = None,
+             profiler: Optional[AdaptiveProfiler] = None,
+             track_alloc: Optional[bool] = None):
+    """
+    Decorator wrapping a sync or async callable in a profiler span.
+    Defaults to the global profiler and the function's qualified name.
+    For coroutines, cpu_ms is the thread CPU time spent between the first
+    call and completion, including other tasks interleaved on the loop.
+    """
+    def decorator(fn):
+        span_name = name or f"{fn.__module__}.{fn.__qualname__}"
+
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                prof = profiler or get_profiler()
+                if not prof.enabled:
+                    return await fn(*args, **kwargs)
+                with prof.span(span_name, track_alloc):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            prof = profiler or get_profiler()
+            if not prof.enabled:
+                return fn(*args, **kwargs)
+            with prof.span(span_name, track_alloc):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
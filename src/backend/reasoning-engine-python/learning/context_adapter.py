@@ -5,13 +5,16 @@ Implements:
 - Strategy selection based on context
 - Dynamic behavior adaptation
 - Fallback mechanisms
+- Bounded, time-windowed context history with running statistics
 """
 
 import logging
-from typing import Dict, Any, Optional
+from collections import Counter, deque
+from functools import lru_cache
+from typing import Deque, Dict, Any, List, Optional, Tuple
 from dataclasses import dataclass
 from enum import Enum
-from datetime import datetime
+from datetime import datetime, timedelta
 
 logger = logging.getLogger(__name__)
 
@@ -42,13 +45,53 @@ class Context:
     def __post_init__(self):
         if self.timestamp is None:
             self.timestamp = datetime.now()
+    
+    def key(self) -> Tuple[Optional[str], ...]:
+        """Hashable tuple of the fields that drive strategy selection."""
+        return (self.device_type, self.time_of_day, self.task_complexity,
+                self.user_sentiment, self.network_quality)
+
+# Context fields aggregated over the history window
+_STAT_FIELDS = ('device_type', 'time_of_day', 'task_complexity', 'user_sentiment', 'network_quality')
+
+@lru_cache(maxsize=1024)
+def _strategy_for(context_key: Tuple[Optional[str], ...]) -> 'AdaptationStrategy':
+    device_type, time_of_day, task_complexity, user_sentiment, _ = context_key
+    
+    # Mobile devices: be concise
+    if device_type in ['mobile', 'tablet']:
+        return AdaptationStrategy.CONCISE
+    
+    # Late hours: be cautious
+    if time_of_day == "night":
+        return AdaptationStrategy.CAUTIOUS
+    
+    # Negative sentiment: be reactive and careful
+    if user_sentiment in ['negative', 'frustrated']:
+        return AdaptationStrategy.REACTIVE
+    
+    # Complex tasks: be verbose and proactive
+    if task_complexity == "high":
+        return AdaptationStrategy.VERBOSE
+    
+    # Default: confident
+    return AdaptationStrategy.CONFIDENT
 
 class ContextAdapter:
     """Adapts agent behavior based on context."""
     
-    def __init__(self):
+    def __init__(self, history_size: int = 1000, history_window_sec: float = 3600.0):
+        """Initialize the adapter.
+        
+        Args:
+            history_size: Maximum number of contexts kept in history
+            history_window_sec: Contexts older than this are dropped from history
+        """
         self._ready = True
-        self.context_history = []
+        self.history_size = history_size
+        self.history_window = timedelta(seconds=history_window_sec)
+        self.context_history: Deque[Context] = deque()
+        self._stats: Dict[str, Counter] = {name: Counter() for name in _STAT_FIELDS}
         logger.info("ContextAdapter initialized")
     
     def is_ready(self) -> bool:
@@ -59,22 +102,48 @@ class ContextAdapter:
         """Detect current context."""
         env = environment or {}
         state = user_state or {}
+        now = datetime.now()
         
         context = Context(
             device_type=env.get('device', 'desktop'),
-            time_of_day=self._get_time_category(),
+            time_of_day=self._get_time_category(now),
             task_complexity=state.get('task_complexity', 'medium'),
             user_sentiment=state.get('sentiment', 'neutral'),
-            network_quality=env.get('network', 'good')
+            network_quality=env.get('network', 'good'),
+            timestamp=now
         )
         
-        self.context_history.append(context)
+        self._record(context)
         logger.debug(f"Detected context: device={context.device_type}, time={context.time_of_day}")
         return context
     
-    def _get_time_category(self) -> str:
+    def _record(self, context: Context) -> None:
+        """Append to history, expiring old entries and updating statistics."""
+        history = self.context_history
+        cutoff = context.timestamp - self.history_window
+        while history and (len(history) >= self.history_size or history[0].timestamp < cutoff):
+            self._count(history.popleft(), -1)
+        history.append(context)
+        self._count(context, 1)
+    
+    def _count(self, context: Context, delta: int) -> None:
+        for name in _STAT_FIELDS:
+            counter = self._stats[name]
+            value = getattr(context, name)
+            counter[value] += delta
+            if counter[value] <= 0:
+                del counter[value]
+    
+    def get_context_statistics(self) -> Dict[str, Any]:
+        """Distribution of context fields over the retained history."""
+        return {
+            'total_contexts': len(self.context_history),
+            **{name: dict(counter) for name, counter in self._stats.items()}
+        }
+    
+    def _get_time_category(self, now: Optional[datetime] = None) -> str:
         """Categorize current time."""
-        hour = datetime.now().hour
+        hour = (now or datetime.now()).hour
         if 6 <= hour < 12:
             return "morning"
         elif 12 <= hour < 17:
@@ -85,25 +154,12 @@ class ContextAdapter:
             return "night"
     
     def select_strategy(self, task: str, context: Context) -> AdaptationStrategy:
-        """Select adaptation strategy based on context."""
-        # Mobile devices: be concise
-        if context.device_type in ['mobile', 'tablet']:
-            return AdaptationStrategy.CONCISE
-        
-        # Late hours: be cautious
-        if context.time_of_day == "night":
-            return AdaptationStrategy.CAUTIOUS
-        
-        # Negative sentiment: be reactive and careful
-        if context.user_sentiment in ['negative', 'frustrated']:
-            return AdaptationStrategy.REACTIVE
+        """Select adaptation strategy based on context.
         
-        # Complex tasks: be verbose and proactive
-        if context.task_complexity == "high":
-            return AdaptationStrategy.VERBOSE
-        
-        # Default: confident
-        return AdaptationStrategy.CONFIDENT
+        The choice depends only on the context fields and is memoized
+        over the context tuple.
+        """
+        return _strategy_for(context.key())
     
     def apply_adaptation(self, action: Dict[str, Any], 
                         strategy: AdaptationStrategy) -> Dict[str, Any]:
@@ -129,3 +185,23 @@ class ContextAdapter:
         
         logger.debug(f"Applied {strategy.value} strategy to action")
         return adapted
+    
+    def adapt_many(self, actions: List[Dict[str, Any]], context: Context) -> List[Dict[str, Any]]:
+        """Adapt every action of a multi-action plan to one context.
+        
+        Args:
+            actions: Actions of the plan; an optional 'task' key names the task
+            context: Context shared by the plan
+            
+        Returns:
+            Adapted copies of the actions, in order
+        """
+        strategies: Dict[str, AdaptationStrategy] = {}
+        adapted = []
+        for action in actions:
+            task = action.get('task', '')
+            strategy = strategies.get(task)
+            if strategy is None:
+                strategy = strategies[task] = self.select_strategy(task, context)
+            adapted.append(self.apply_adaptation(action, strategy))
+        return adapted
@@ -0,0 +1,165 @@
+"""Contextual Bandit for Parameter Exploration.
+
+Implements:
+- LinUCB and linear Thompson sampling over a fixed set of arms
+- One independent model per action type
+- Sherman-Morrison inverse updates (O(d^2) per event)
+- JSON-serializable state for persistence
+"""
+
+import logging
+import zlib
+from typing import Dict, Any, Optional, Sequence
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ARMS = (0.5, 0.75, 1.0, 1.5, 2.0)
+
+class _ArmModels:
+    """Ridge-regression state for every arm of one action type."""
+
+    def __init__(self, n_arms: int, n_features: int, ridge: float):
+        self.A_inv = np.repeat(np.eye(n_features)[None] / ridge, n_arms, axis=0)
+        self.b = np.zeros((n_arms, n_features))
+        self.pulls = np.zeros(n_arms, dtype=np.int64)
+
+    def theta(self) -> np.ndarray:
+        return np.einsum('kij,kj->ki', self.A_inv, self.b)
+
+class ContextualBandit:
+    """Per-action-type contextual bandit choosing among parameter variants."""
+
+    def __init__(self, arms: Sequence[float] = DEFAULT_ARMS, n_features: int = 16,
+                 alpha: float = 1.0, strategy: str = "linucb",
+                 ridge: float = 1.0, seed: Optional[int] = None):
+        """Initialize the bandit.
+
+        Args:
+            arms: Parameter variants (scale factors for numeric parameters)
+            n_features: Context feature dimension, including the bias term
+            alpha: Exploration strength (UCB width or posterior scale)
+            strategy: "linucb" or "thompson"
+            ridge: L2 regularization of each arm's regression
+            seed: Seed for Thompson sampling
+        """
+        if strategy not in ("linucb", "thompson"):
+            raise ValueError(f"Unknown bandit strategy: {strategy}")
+        self.arms = list(arms)
+        self.n_features = n_features
+        self.alpha = alpha
+        self.strategy = strategy
+        self.ridge = ridge
+        self.models: Dict[str, _ArmModels] = {}
+        self._rng = np.random.default_rng(seed)
+
+    def featurize(self, context: Optional[Dict[str, Any]]) -> np.ndarray:
+        """Hash context key/value pairs into a fixed-size feature vector.
+
+        Values are treated as categorical; the first feature is a bias term.
+        """
+        x = np.zeros(self.n_features)
+        x[0] = 1.0
+        for key, value in (context or {}).items():
+            if key == 'bandit_arm':
+                continue
+            bucket = zlib.crc32(f"{key}={value}".encode()) % (self.n_features - 1)
+            x[bucket + 1] = 1.0
+        return x
+
+    def _models_for(self, action_type: str) -> _ArmModels:
+        models = self.models.get(action_type)
+        if models is None:
+            models = self.models[action_type] = _ArmModels(
+                len(self.arms), self.n_features, self.ridge
+            )
+        return models
+
+    def select(self, action_type: str, context: Optional[Dict[str, Any]] = None) -> int:
+        """Choose an arm index for the given action type and context."""
+        models = self._models_for(action_type)
+        x = self.featurize(context)
+        if self.strategy == "thompson":
+            scores = np.empty(len(self.arms))
+            theta = models.theta()
+            for k in range(len(self.arms)):
+                sample = self._rng.multivariate_normal(
+                    theta[k], self.alpha ** 2 * models.A_inv[k], method='cholesky'
+                )
+                scores[k] = sample @ x
+        else:
+            mean = models.theta() @ x
+            width = np.sqrt(np.einsum('i,kij,j->k', x, models.A_inv, x))
+            scores = mean + self.alpha * width
+        return int(np.argmax(scores))
+
+    def best_arm(self, action_type: str,
+                 context: Optional[Dict[str, Any]] = None) -> Optional[int]:
+        """Greedy arm for exploitation, or None if the action type is untrained."""
+        models = self.models.get(action_type)
+        if models is None or not models.pulls.any():
+            return None
+        scores = models.theta() @ self.featurize(context)
+        scores[models.pulls == 0] = -np.inf
+        return int(np.argmax(scores))
+
+    def update(self, action_type: str, arm: int,
+               context: Optional[Dict[str, Any]], reward: float) -> None:
+        """Record the reward observed for an arm (O(d^2))."""
+        if not 0 <= arm < len(self.arms):
+            raise ValueError(f"Arm {arm} out of range for {len(self.arms)} arms")
+        models = self._models_for(action_type)
+        x = self.featurize(context)
+        A_inv = models.A_inv[arm]
+        Ax = A_inv @ x
+        A_inv -= np.outer(Ax, Ax) / (1.0 + x @ Ax)
+        models.b[arm] += reward * x
+        models.pulls[arm] += 1
+        logger.debug(f"Bandit update {action_type}[{self.arms[arm]}] reward={reward:.2f}")
+
+    def get_statistics(self, action_type: str) -> Dict[str, Any]:
+        """Pull counts and bias-only reward estimates per arm."""
+        models = self.models.get(action_type)
+        if models is None:
+            return {}
+        estimates = models.theta() @ self.featurize(None)
+        return {
+            'arms': self.arms,
+            'pulls': models.pulls.tolist(),
+            'estimated_reward': estimates.tolist()
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialize bandit state."""
+        return {
+            'arms': self.arms,
+            'n_features': self.n_features,
+            'alpha': self.alpha,
+            'strategy': self.strategy,
+            'ridge': self.ridge,
+            'models': {
+                action_type: {
+                    'A_inv': models.A_inv.tolist(),
+                    'b': models.b.tolist(),
+                    'pulls': models.pulls.tolist()
+                }
+                for action_type, models in self.models.items()
+            }
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'ContextualBandit':
+        """Restore bandit state."""
+        bandit = cls(
+            arms=data['arms'],
+            n_features=data['n_features'],
+            alpha=data['alpha'],
+            strategy=data['strategy'],
+            ridge=data['ridge']
+        )
+        for action_type, state in data['models'].items():
+            models = bandit._models_for(action_type)
+            models.A_inv = np.array(state['A_inv'], dtype=np.float64)
+            models.b = np.array(state['b'], dtype=np.float64)
+            models.pulls = np.array(state['pulls'], dtype=np.int64)
+        return bandit
@@ -0,0 +1,223 @@
+import re
+import bisect
+import hashlib
+import threading
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+
+from .adaptive_profiler import AdaptiveProfiler, get_profiler
+
+# Latency-oriented bucket bounds (most profiler metrics are *_ms)
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    1.0, 5.0, 10.0, 25.0, 50.0, 100.0, 250.0, 500.0, 1000.0, 2500.0, 5000.0, 10000.0,
+)
+
+_INVALID_CHARS = re.compile(r"[^a-zA-Z0-9_]")
+
+# Sample names a family may emit; none may clash with another family's
+_SAMPLE_SUFFIXES = ("", "_total", "_created", "_bucket", "_count", "_sum", "_info")
+
+# Signed memory deltas from profiler spans; exported as two counters
+_ALLOC_SUFFIX = ".alloc_kb"
+
+def _metric_name(namespace: str, name: str) -> str:
+    return _INVALID_CHARS.sub("_", f"{namespace}_{name}")
+
+def _label_name(key: Any) -> str:
+    label = _INVALID_CHARS.sub("_", str(key))
+    return label if label and not label[0].isdigit() else f"_{label}"
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _fmt(value: float) -> str:
+    return repr(float(value))
+
+class _Histogram:
+    __slots__ = ("bounds", "counts", "count", "total")
+
+    def __init__(self, bounds: Sequence[float]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+
+    def add(self, value: float):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+
+class _Delta:
+    __slots__ = ("allocated", "freed")
+
+    def __init__(self):
+        self.allocated = 0.0
+        self.freed = 0.0
+
+    def add(self, value: float):
+        if value >= 0:
+            self.allocated += value
+        else:
+            self.freed -= value
+
+class OpenMetricsExporter:
+    """
+    Renders AdaptiveProfiler data in the OpenMetrics text format.
+
+    Cumulative histograms are fed from the profiler's merged observation
+    batches; each family's text block is re-rendered only when it received
+    new values. Allocation deltas (`*.alloc_kb`) can be negative, so they
+    become `*_allocated_kb` and `*_freed_kb` counters instead. A metric
+    whose family or sample names (`_count`, `_sum`, `_total`, ...) would
+    clash with another family's gets a hash suffix. Window
+    quantiles, tags and adaptive hints are refreshed on every emitter
+    tick. Scrapes return the last precomputed payload.
+    """
+
+    CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+
+    def __init__(self,
+                 profiler: AdaptiveProfiler,
+                 namespace: str = "agentic",
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.profiler = profiler
+        self.namespace = namespace
+        self.buckets = tuple(sorted(buckets))
+        self._bucket_labels = [_fmt(b) for b in self.buckets] + ["+Inf"]
+        self._histograms: Dict[str, _Histogram] = {}
+        self._deltas: Dict[str, _Delta] = {}
+        self._families: Dict[str, str] = {}  # profiler name -> family
+        self._owners: Dict[str, str] = {}    # sample name -> profiler name
+        for reserved in ("profiler_observations", "profiler_window", "adaptive_hint", "profiler_tags"):
+            self._claim(_metric_name(namespace, reserved), "")
+        self._blocks: Dict[str, str] = {}
+        self._dirty: set = set()
+        self._observations_total = 0
+        self._lock = threading.Lock()
+        self._payload = b"# EOF\n"
+        profiler.add_sink(self._on_batch)
+        profiler.observers.append(self._on_snapshot)
+
+    def _on_batch(self, batch: List[Tuple[str, float]]):
+        with self._lock:
+            hists = self._histograms
+            for name, value in batch:
+                if name.endswith(_ALLOC_SUFFIX):
+                    delta = self._deltas.get(name)
+                    if delta is None:
+                        delta = self._deltas[name] = _Delta()
+                    delta.add(value)
+                else:
+                    hist = hists.get(name)
+                    if hist is None:
+                        hist = hists[name] = _Histogram(self.buckets)
+                    hist.add(value)
+                self._dirty.add(name)
+            self._observations_total += len(batch)
+
+    def _claim(self, family: str, name: str) -> bool:
+        """Reserve a family's sample names for a profiler name, if all are free."""
+        samples = [family + suffix for suffix in _SAMPLE_SUFFIXES]
+        if any(self._owners.get(sample, name) != name for sample in samples):
+            return False
+        for sample in samples:
+            self._owners[sample] = name
+        return True
+
+    def _family(self, name: str) -> str:
+        """Sanitized family name, unique per profiler metric name."""
+        family = self._families.get(name)
+        if family is None:
+            base = family = _metric_name(self.namespace, name)
+            attempt = 0
+            while not self._claim(family, name):
+                digest = hashlib.blake2b(f"{name}#{attempt}".encode(), digest_size=4).hexdigest()
+                family = f"{base}_{digest}"
+                attempt += 1
+            self._families[name] = family
+        return family
+
+    def _render_histogram(self, name: str, hist: _Histogram) -> str:
+        metric = self._family(name)
+        lines = [f"# TYPE {metric} histogram"]
+        cumulative = 0
+        for label, n in zip(self._bucket_labels, hist.counts):
+            cumulative += n
+            lines.append(f'{metric}_bucket{{le="{label}"}} {cumulative}')
+        lines.append(f"{metric}_count {hist.count}")
+        lines.append(f"{metric}_sum {_fmt(hist.total)}")
+        return "\n".join(lines) + "\n"
+
+    def _render_delta(self, name: str, delta: _Delta) -> str:
+        base = name[:-len(_ALLOC_SUFFIX)]
+        lines = []
+        for suffix, value in (("allocated_kb", delta.allocated), ("freed_kb", delta.freed)):
+            metric = self._family(f"{base}.{suffix}")
+            lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric}_total {_fmt(value)}")
+        return "\n".join(lines) + "\n"
+
+    def _render_window(self, snapshot: Dict[str, Any]) -> str:
+        metric = _metric_name(self.namespace, "profiler_window")
+        lines = [f"# TYPE {metric} gauge"]
+        for name, stats in snapshot.items():
+            if name in ("tags", "adaptive_hints") or not isinstance(stats, dict):
+                continue
+            label = _escape(name)
+            for key in ("mean", "p50", "p90", "p99"):
+                lines.append(f'{metric}{{metric="{label}",stat="{key}"}} {_fmt(stats[key])}')
+        return "\n".join(lines) + "\n"
+
+    def _render_hints(self, snapshot: Dict[str, Any]) -> str:
+        hints = _metric_name(self.namespace, "adaptive_hint")
+        tags = _metric_name(self.namespace, "profiler_tags")
+        lines = [f"# TYPE {hints} gauge"]
+        for key, value in snapshot.get("adaptive_hints", {}).items():
+            lines.append(f'{hints}{{hint="{_escape(key)}"}} {_fmt(value)}')
+        tag_values = snapshot.get("tags", {})
+        if tag_values:
+            used: set = set()
+            pairs = []
+            for key, value in sorted(tag_values.items(), key=lambda kv: str(kv[0])):
+                label = _label_name(key)
+                while label in used:  # keys that sanitize alike
+                    label += "_"
+                used.add(label)
+                pairs.append(f'{label}="{_escape(value)}"')
+            labels = ",".join(pairs)
+            lines.append(f"# TYPE {tags} info")
+            lines.append(f"{tags}_info{{{labels}}} 1")
+        return "\n".join(lines) + "\n"
+
+    def _on_snapshot(self, snapshot: Dict[str, Any]):
+        with self._lock:
+            for name in sorted(self._dirty):  # first name to claim a family keeps it
+                if name in self._deltas:
+                    self._blocks[name] = self._render_delta(name, self._deltas[name])
+                else:
+                    self._blocks[name] = self._render_histogram(name, self._histograms[name])
+            self._dirty.clear()
+            total = _metric_name(self.namespace, "profiler_observations")
+            parts = [self._blocks[name] for name in sorted(self._blocks)]
+            parts.append(f"# TYPE {total} counter\n{total}_total {self._observations_total}\n")
+            parts.append(self._render_window(snapshot))
+            parts.append(self._render_hints(snapshot))
+            parts.append("# EOF\n")
+            self._payload = "".join(parts).encode("utf-8")
+
+    def refresh(self) -> bytes:
+        """Force a snapshot and re-render outside the emitter tick."""
+        self._on_snapshot(self.profiler.snapshot())
+        return self._payload
+
+    def render(self) -> bytes:
+        """Return the last precomputed exposition payload."""
+        return self._payload
+
+# Global exporter bound to the global profiler
+_exporter: Optional[OpenMetricsExporter] = None
+
+def get_exporter() -> OpenMetricsExporter:
+    global _exporter
+    if _exporter is None:
+        _exporter = OpenMetricsExporter(get_profiler())
+    return _exporter
@@ -10,12 +10,15 @@ Implements:
 
 import json
 import logging
-from typing import Dict, List, Any, Optional, Tuple
+from typing import Deque, Dict, List, Any, Iterable, Optional, Tuple
 from dataclasses import dataclass, field
 from datetime import datetime
+from collections import deque
 from enum import Enum
 import numpy as np
 
+from .contextual_bandit import ContextualBandit
+
 logger = logging.getLogger(__name__)
 
 class FeedbackType(Enum):
@@ -61,18 +64,21 @@ class LearningState:
 class OnlineLearner:
     """Online learning engine with RLAIF capabilities."""
     
-    def __init__(self, learning_rate: float = 0.1, memory_size: int = 1000):
+    def __init__(self, learning_rate: float = 0.1, memory_size: int = 1000,
+                 bandit: Optional[ContextualBandit] = None):
         """Initialize the online learner.
         
         Args:
             learning_rate: Rate at which to incorporate new feedback
             memory_size: Maximum number of interactions to remember
+            bandit: Contextual bandit for parameter exploration
         """
         self.learning_rate = learning_rate
         self.memory_size = memory_size
         self.learning_states: Dict[str, LearningState] = {}
-        self.interaction_history: List[Tuple[ActionResult, Optional[UserFeedback]]] = []
+        self.interaction_history: Deque[Tuple[ActionResult, Optional[UserFeedback]]] = deque(maxlen=memory_size)
         self.retry_strategies: Dict[str, List[Dict[str, Any]]] = {}
+        self.bandit = bandit or ContextualBandit()
         self._ready = True
         logger.info(f"OnlineLearner initialized with lr={learning_rate}, memory={memory_size}")
     
@@ -113,10 +119,11 @@ class OnlineLearner:
         if feedback.correction:
             self._incorporate_correction(state, action_result, feedback.correction)
         
-        # Store interaction
+        # Credit the explored parameter variant, if any
+        self._update_bandit(action_result, feedback)
+        
+        # Store interaction (bounded deque evicts the oldest in O(1))
         self.interaction_history.append((action_result, feedback))
-        if len(self.interaction_history) > self.memory_size:
-            self.interaction_history.pop(0)
         
         state.last_updated = datetime.now()
         
@@ -124,6 +131,106 @@ class OnlineLearner:
                    f"success_rate={state.success_rate:.2f}, "
                    f"avg_rating={state.average_rating:.2f}")
     
+    def update_from_feedback_many(self, events: Iterable[Tuple[ActionResult, UserFeedback]]) -> None:
+        """Update learning state from a batch of feedback events.
+        
+        Per-action-type counters and running rating averages are computed
+        in one vectorized pass and match calling update_from_feedback for
+        each event; corrections are still applied in event order.
+        
+        Args:
+            events: (action_result, feedback) pairs in arrival order
+        """
+        events = list(events)
+        if not events:
+            return
+        
+        type_ids: Dict[str, int] = {}
+        codes = np.fromiter(
+            (type_ids.setdefault(a.action_type, len(type_ids)) for a, _ in events),
+            dtype=np.int64, count=len(events)
+        )
+        positive = np.fromiter(
+            (f.feedback_type == FeedbackType.POSITIVE for _, f in events),
+            dtype=np.float64, count=len(events)
+        )
+        ratings = np.fromiter(
+            (np.nan if f.rating is None else f.rating for _, f in events),
+            dtype=np.float64, count=len(events)
+        )
+        rated = ~np.isnan(ratings)
+        n_types = len(type_ids)
+        
+        states = []
+        for action_type in type_ids:
+            if action_type not in self.learning_states:
+                self.learning_states[action_type] = LearningState(action_type=action_type)
+            states.append(self.learning_states[action_type])
+        prev_totals = np.array([s.total_attempts for s in states], dtype=np.int64)
+        prev_avgs = np.array([s.average_rating for s in states], dtype=np.float64)
+        
+        attempts = np.bincount(codes, minlength=n_types)
+        successes = np.bincount(codes, weights=positive, minlength=n_types)
+        
+        # Closed form of the sequential running average: a rated event at
+        # attempt n maps avg -> avg*(n-1)/n + r/n, an unrated one leaves it.
+        # Events are grouped by action type and each rating is weighted by
+        # the product of the shrink factors of the later rated events.
+        order = np.argsort(codes, kind='stable')
+        sc, sr, srated = codes[order], ratings[order], rated[order]
+        starts = np.concatenate(([0], np.cumsum(attempts)[:-1]))
+        ends = starts + attempts
+        n = np.arange(len(sc)) - starts[sc] + prev_totals[sc] + 1
+        shrink = np.where(srated & (n > 1), (n - 1) / n, 1.0)
+        log_csum = np.concatenate(([0.0], np.cumsum(np.log(shrink))))
+        after = log_csum[ends[sc]] - log_csum[1:]
+        contrib = np.where(srated, np.nan_to_num(sr) / n, 0.0) * np.exp(after)
+        averages = (prev_avgs * np.exp(log_csum[ends] - log_csum[starts])
+                    + np.bincount(sc, weights=contrib, minlength=n_types))
+        
+        now = datetime.now()
+        for idx, state in enumerate(states):
+            state.total_attempts += int(attempts[idx])
+            state.successful_attempts += int(successes[idx])
+            state.success_rate = state.successful_attempts / state.total_attempts
+            state.average_rating = float(averages[idx])
+            state.last_updated = now
+        
+        for action_result, feedback in events:
+            if feedback.correction:
+                self._incorporate_correction(
+                    self.learning_states[action_result.action_type],
+                    action_result, feedback.correction
+                )
+            self._update_bandit(action_result, feedback)
+        
+        self.interaction_history.extend(events)
+        logger.info(f"Updated learning state from {len(events)} feedback events "
+                   f"across {n_types} action types")
+    
+    def _update_bandit(self, action_result: ActionResult, feedback: UserFeedback) -> None:
+        """Reward the bandit arm recorded in the action context."""
+        arm = action_result.context.get('bandit_arm')
+        if arm is None:
+            return
+        try:
+            index = int(arm)
+        except (TypeError, ValueError):
+            index = -1
+        if index != arm or not 0 <= index < len(self.bandit.arms):
+            logger.warning(f"Ignoring bandit reward for {action_result.action_type}: "
+                           f"invalid arm {arm!r}")
+            return
+        if feedback.rating is not None:
+            reward = feedback.rating
+        elif feedback.feedback_type == FeedbackType.POSITIVE:
+            reward = 1.0
+        elif feedback.feedback_type == FeedbackType.NEGATIVE:
+            reward = 0.0
+        else:
+            reward = 1.0 if action_result.success else 0.0
+        self.bandit.update(action_result.action_type, index, action_result.context, reward)
+    
     def _incorporate_correction(self, state: LearningState, 
                                action_result: ActionResult,
                                correction: Dict[str, Any]) -> None:
@@ -159,7 +266,12 @@ class OnlineLearner:
         state = self.learning_states[action_type]
         optimized = (base_parameters or {}).copy()
         
-        # Apply learned parameters
+        # Apply the best-performing explored variant
+        arm = self.bandit.best_arm(action_type)
+        if arm is not None:
+            optimized = self._explore_parameters(optimized, self.bandit.arms[arm])
+        
+        # Apply learned parameters (explicit corrections take precedence)
         optimized.update(state.learned_parameters)
         
         logger.info(f"Optimized parameters for {action_type}: {optimized}")
@@ -207,21 +319,28 @@ class OnlineLearner:
                     'parameters': state.learned_parameters
                 }
         
-        # Fall back to exploration
+        # Fall back to bandit-driven exploration; the caller passes
+        # 'bandit_arm' back in the retried action's context so the
+        # outcome is credited to this variant.
+        arm = self.bandit.select(action_type, action_result.context)
         return {
             'strategy': 'exploration',
-            'parameters': self._explore_parameters(action_result.parameters)
+            'parameters': self._explore_parameters(action_result.parameters, self.bandit.arms[arm]),
+            'bandit_arm': arm
         }
     
-    def _explore_parameters(self, base_parameters: Dict[str, Any]) -> Dict[str, Any]:
-        """Explore parameter space for better solutions."""
+    def _explore_parameters(self, base_parameters: Dict[str, Any],
+                            scale: float) -> Dict[str, Any]:
+        """Apply a parameter variant (scale factor) to numeric parameters."""
         explored = base_parameters.copy()
         
         for key, value in explored.items():
-            if isinstance(value, (int, float)):
-                # Add small random variation
-                variation = np.random.normal(0, 0.1) * value
-                explored[key] = value + variation
+            if isinstance(value, bool):
+                continue
+            if isinstance(value, int):
+                explored[key] = max(1, round(value * scale)) if value > 0 else value
+            elif isinstance(value, float):
+                explored[key] = value * scale
         
         return explored
     
@@ -274,6 +393,7 @@ class OnlineLearner:
                 }
                 for action_type, state in self.learning_states.items()
             },
+            'bandit': self.bandit.to_dict(),
             'meta': {
                 'learning_rate': self.learning_rate,
                 'memory_size': self.memory_size,
@@ -288,6 +408,7 @@ class OnlineLearner:
         
         self.learning_rate = state_dict['meta']['learning_rate']
         self.memory_size = state_dict['meta']['memory_size']
+        self.interaction_history = deque(self.interaction_history, maxlen=self.memory_size)
         
         self.learning_states = {}
         for action_type, state_data in state_dict['learning_states'].items():
@@ -301,4 +422,7 @@ class OnlineLearner:
                 last_updated=datetime.fromisoformat(state_data['last_updated'])
             )
         
+        if 'bandit' in state_dict:
+            self.bandit = ContextualBandit.from_dict(state_dict['bandit'])
+        
         logger.info(f"Imported learning state with {len(self.learning_states)} action types")
@@ -6,18 +6,25 @@ Implements:
 - Personalized recommendations
 - Privacy-preserving learning
 - Explainable AI
+- Optional sharded on-disk profile store with lazy loading, LRU
+  eviction of cold users and write-behind batching
 """
 
 import json
 import logging
-from typing import Dict, List, Any, Optional, Tuple
+from typing import Deque, Dict, List, Any, Optional, Set, Tuple
 from dataclasses import dataclass, field
 from datetime import datetime
-from collections import defaultdict
+from collections import defaultdict, deque, OrderedDict
+import bisect
+import heapq
 import math
+import numpy as np
 
 logger = logging.getLogger(__name__)
 
+_SECONDS_PER_DAY = 86400.0
+
 @dataclass
 class InteractionEvent:
     """Represents a user interaction event."""
@@ -30,7 +37,11 @@ class InteractionEvent:
 
 @dataclass
 class PreferenceSignal:
-    """A learned preference signal."""
+    """A learned preference signal.
+    
+    `confidence` is the value as of `last_seen`; time decay is applied
+    when the signal is read, never stored.
+    """
     key: str
     value: Any
     confidence: float = 0.5
@@ -38,20 +49,175 @@ class PreferenceSignal:
     last_seen: datetime = field(default_factory=datetime.now)
     context_tags: List[str] = field(default_factory=list)
 
+class _Interner:
+    """Dense integer ids for hashable values, reference counted per row.
+    
+    When no row uses a value any more its id is freed and handed to the
+    next new value, so the id space tracks the resident signals rather
+    than every value ever seen.
+    """
+    
+    def __init__(self):
+        self.ids: Dict[Any, int] = {}
+        self.values: List[Any] = []
+        self._refs: List[int] = []
+        self._free: List[int] = []
+    
+    def __len__(self) -> int:
+        """Size of the id space (live and free ids)."""
+        return len(self.values)
+    
+    def get(self, value: Any) -> Optional[int]:
+        return self.ids.get(value)
+    
+    def acquire(self, value: Any) -> int:
+        idx = self.ids.get(value)
+        if idx is None:
+            if self._free:
+                idx = self._free.pop()
+                self.values[idx] = value
+            else:
+                idx = len(self.values)
+                self.values.append(value)
+                self._refs.append(0)
+            self.ids[value] = idx
+        self._refs[idx] += 1
+        return idx
+    
+    def release(self, idx: int) -> None:
+        self._refs[idx] -= 1
+        if self._refs[idx] == 0:
+            del self.ids[self.values[idx]]
+            self._free.append(idx)
+
+class _SignalColumns:
+    """Columnar mirror of all users' signals for vectorized scoring.
+    
+    One row per (user, signal key); string keys and context pairs are
+    interned to integer ids. Rows of removed signals are marked dead
+    (user id -1) and reused by later appends rather than compacted.
+    """
+    
+    def __init__(self, capacity: int = 1024):
+        self.size = 0
+        self.user = np.empty(capacity, dtype=np.int64)
+        self.key = np.empty(capacity, dtype=np.int64)
+        self.pair = np.empty(capacity, dtype=np.int64)  # context pair id or -1
+        self.confidence = np.empty(capacity, dtype=np.float64)
+        self.frequency = np.empty(capacity, dtype=np.int64)
+        self.last_seen = np.empty(capacity, dtype=np.float64)  # POSIX seconds
+        self._free: List[int] = []
+    
+    def append(self, user: int, key: int, pair: int) -> int:
+        if self._free:
+            row = self._free.pop()
+            self.user[row] = user
+            self.key[row] = key
+            self.pair[row] = pair
+            return row
+        if self.size == len(self.user):
+            for name in ('user', 'key', 'pair', 'confidence', 'frequency', 'last_seen'):
+                column = getattr(self, name)
+                grown = np.empty(len(column) * 2, dtype=column.dtype)
+                grown[:self.size] = column[:self.size]
+                setattr(self, name, grown)
+        row = self.size
+        self.user[row] = user
+        self.key[row] = key
+        self.pair[row] = pair
+        self.size += 1
+        return row
+    
+    def release(self, row: int) -> None:
+        self.user[row] = -1
+        self._free.append(row)
+
+class _ResidentProfiles(OrderedDict):
+    """LRU cache of user profiles in front of a ShardedProfileStore.
+    
+    Missing users are loaded from the store on first access; inserting
+    beyond `capacity` evicts the least recently used user, flushing its
+    pending signals first.
+    """
+    
+    def __init__(self, engine: 'PreferenceEngine', capacity: int):
+        super().__init__()
+        self.engine = engine
+        self.capacity = capacity
+    
+    def __missing__(self, user_id: str) -> Dict[str, 'PreferenceSignal']:
+        profile = self.engine._load_user(user_id)
+        self[user_id] = profile
+        for signal in profile.values():
+            self.engine._index_signal(user_id, signal, dirty=False)
+        return profile
+    
+    def __getitem__(self, user_id: str) -> Dict[str, 'PreferenceSignal']:
+        if dict.__contains__(self, user_id):
+            self.move_to_end(user_id)
+            return dict.__getitem__(self, user_id)
+        return self.__missing__(user_id)
+    
+    def __contains__(self, user_id: object) -> bool:
+        return dict.__contains__(self, user_id) or self.engine.profile_store.has_user(user_id)
+    
+    def __setitem__(self, user_id: str, profile: Dict[str, 'PreferenceSignal']) -> None:
+        super().__setitem__(user_id, profile)
+        self.move_to_end(user_id)
+        self.shrink()
+    
+    def shrink(self) -> None:
+        while len(self) > self.capacity:
+            # Written back before removal, so a failed write keeps the profile
+            user_id = next(iter(self))
+            self.engine._evict_user(user_id, dict.__getitem__(self, user_id))
+            super().__delitem__(user_id)
+
 class PreferenceEngine:
     """Engine for learning and predicting user preferences."""
     
-    def __init__(self, memory_backend=None, decay_factor: float = 0.95):
+    def __init__(self, memory_backend=None, decay_factor: float = 0.95,
+                 profile_store=None, max_resident_users: int = 10000,
+                 flush_batch_size: int = 512, history_size: int = 10000):
         """Initialize preference engine.
         
         Args:
             memory_backend: Optional memory system for persistence
             decay_factor: Time decay factor for preference signals (0-1)
+            profile_store: Optional ShardedProfileStore; when set, profiles
+                are loaded lazily and cold users are evicted
+            max_resident_users: Profiles kept in memory with a profile store
+            flush_batch_size: Changed signals buffered before a write-behind flush
+            history_size: Number of recent interaction events retained
         """
         self.memory_backend = memory_backend
         self.decay_factor = decay_factor
-        self.user_profiles: Dict[str, Dict[str, PreferenceSignal]] = defaultdict(dict)
-        self.interaction_history: List[InteractionEvent] = []
+        self.profile_store = profile_store
+        self.flush_batch_size = flush_batch_size
+        if profile_store is not None:
+            self.user_profiles: Dict[str, Dict[str, PreferenceSignal]] = _ResidentProfiles(
+                self, max_resident_users
+            )
+        else:
+            self.user_profiles = defaultdict(dict)
+        self.interaction_history: Deque[InteractionEvent] = deque(maxlen=history_size)
+        # Signal keys changed since the last flush, per user
+        self._dirty: Dict[str, Set[str]] = defaultdict(set)
+        self._pending = 0
+        # Per user: (context key, value) -> signal keys, and signals ordered
+        # by descending score upper bound as (-bound, key)
+        self._context_index: Dict[str, Dict[Tuple[str, str], Set[str]]] = defaultdict(dict)
+        self._ranked: Dict[str, List[Tuple[float, str]]] = defaultdict(list)
+        self._bounds: Dict[str, Dict[str, float]] = defaultdict(dict)
+        # Columnar signal store for batched scoring
+        self._columns = _SignalColumns()
+        self._rows: Dict[Tuple[str, str], int] = {}
+        self._user_rows: Dict[str, List[int]] = defaultdict(list)
+        # Interned ids, freed when users are evicted
+        self._users = _Interner()
+        self._keys = _Interner()
+        self._key_rank: Optional[np.ndarray] = None
+        self._pairs = _Interner()
         self._ready = True
         logger.info(f"PreferenceEngine initialized with decay={decay_factor}")
     
@@ -83,6 +249,7 @@ class PreferenceEngine:
         
         # Extract preference signals
         self._extract_preferences(event)
+        self._maybe_flush()
         
         logger.debug(f"Observed interaction for user {user_id}: {action}")
     
@@ -90,48 +257,192 @@ class PreferenceEngine:
         """Extract preference signals from an interaction event."""
         user_id = event.user_id
         profile = self.user_profiles[user_id]
+        now = datetime.now()
         
         # Learn from action patterns
         action_key = f"action:{event.action}"
         if action_key in profile:
             signal = profile[action_key]
-            signal.frequency += 1
-            signal.last_seen = datetime.now()
+            self._touch(signal, now)
             # Update confidence based on satisfaction
             if event.satisfaction is not None:
                 signal.confidence = (
                     0.7 * signal.confidence + 0.3 * event.satisfaction
                 )
         else:
-            profile[action_key] = PreferenceSignal(
+            signal = profile[action_key] = PreferenceSignal(
                 key=action_key,
                 value=event.action,
                 confidence=event.satisfaction or 0.5,
                 frequency=1
             )
+        self._index_signal(user_id, signal)
         
         # Learn from context patterns
         for ctx_key, ctx_value in event.context.items():
             pref_key = f"context:{ctx_key}:{ctx_value}"
             if pref_key in profile:
                 signal = profile[pref_key]
-                signal.frequency += 1
-                signal.last_seen = datetime.now()
+                self._touch(signal, now)
             else:
-                profile[pref_key] = PreferenceSignal(
+                signal = profile[pref_key] = PreferenceSignal(
                     key=pref_key,
                     value=ctx_value,
                     frequency=1
                 )
+            self._index_signal(user_id, signal)
         
         # Learn from outcome patterns
         if event.satisfaction and event.satisfaction > 0.7:
             outcome_key = f"outcome:{event.action}"
-            profile[outcome_key] = PreferenceSignal(
+            signal = profile[outcome_key] = PreferenceSignal(
                 key=outcome_key,
                 value=event.outcome,
                 confidence=event.satisfaction
             )
+            self._index_signal(user_id, signal)
+    
+    def _touch(self, signal: PreferenceSignal, now: datetime) -> None:
+        """Fold elapsed decay into a signal that is being observed again."""
+        signal.confidence = self._decayed_confidence(signal, now)
+        signal.frequency += 1
+        signal.last_seen = now
+    
+    def _decayed_confidence(self, signal: PreferenceSignal, now: datetime) -> float:
+        """Closed-form exponential decay since the signal was last seen."""
+        # Whole days on the epoch clock, as in _predict_batch; naive datetime
+        # differences would disagree by an hour across DST changes
+        days_old = math.floor((now.timestamp() - signal.last_seen.timestamp()) / _SECONDS_PER_DAY)
+        if days_old <= 0:
+            return signal.confidence
+        return signal.confidence * self.decay_factor ** days_old
+    
+    @staticmethod
+    def _score_bound(signal: PreferenceSignal) -> float:
+        """Upper bound on the score of a signal that matches no context."""
+        return min(signal.confidence + min(math.log(signal.frequency + 1) / 5, 0.5), 1.0)
+    
+    def _index_signal(self, user_id: str, signal: PreferenceSignal, dirty: bool = True) -> None:
+        """Update the context index, bound ordering and columns for a changed signal."""
+        if dirty and self.profile_store is not None:
+            keys = self._dirty[user_id]
+            if signal.key not in keys:
+                keys.add(signal.key)
+                self._pending += 1
+        
+        pair = None
+        if signal.key.startswith("context:"):
+            parts = signal.key.split(":", 2)
+            if len(parts) == 3:
+                pair = (parts[1], parts[2])
+                index = self._context_index[user_id]
+                index.setdefault(pair, set()).add(signal.key)
+        
+        columns = self._columns
+        row = self._rows.get((user_id, signal.key))
+        if row is None:
+            if self._keys.get(signal.key) is None:
+                self._key_rank = None
+            key_id = self._keys.acquire(signal.key)
+            pair_id = -1 if pair is None else self._pairs.acquire(pair)
+            user_idx = self._users.acquire(user_id)
+            row = self._rows[(user_id, signal.key)] = columns.append(user_idx, key_id, pair_id)
+            self._user_rows[user_id].append(row)
+        columns.confidence[row] = signal.confidence
+        columns.frequency[row] = signal.frequency
+        columns.last_seen[row] = signal.last_seen.timestamp()
+        
+        ranked = self._ranked[user_id]
+        bounds = self._bounds[user_id]
+        old = bounds.get(signal.key)
+        new = self._score_bound(signal)
+        if old is not None:
+            if old == new:
+                return
+            del ranked[bisect.bisect_left(ranked, (-old, signal.key))]
+        bisect.insort(ranked, (-new, signal.key))
+        bounds[signal.key] = new
+    
+    def _drop_user_index(self, user_id: str) -> None:
+        """Remove a user from all index structures and free their rows."""
+        self._context_index.pop(user_id, None)
+        self._ranked.pop(user_id, None)
+        self._bounds.pop(user_id, None)
+        columns = self._columns
+        for row in self._user_rows.pop(user_id, []):
+            key_id, pair_id = int(columns.key[row]), int(columns.pair[row])
+            del self._rows[(user_id, self._keys.values[key_id])]
+            self._keys.release(key_id)
+            if pair_id >= 0:
+                self._pairs.release(pair_id)
+            self._users.release(int(columns.user[row]))
+            columns.release(row)
+    
+    def _reindex_user(self, user_id: str, dirty: bool = True) -> None:
+        """Rebuild all index structures for a user."""
+        self._drop_user_index(user_id)
+        for signal in self.user_profiles[user_id].values():
+            self._index_signal(user_id, signal, dirty)
+    
+    def _load_user(self, user_id: str) -> Dict[str, PreferenceSignal]:
+        """Read a user's signals from the profile store."""
+        profile = {}
+        for _, key, value, confidence, frequency, last_seen in self.profile_store.load_profile(user_id):
+            profile[key] = PreferenceSignal(
+                key=key,
+                value=value,
+                confidence=confidence,
+                frequency=frequency,
+                last_seen=last_seen
+            )
+        logger.debug(f"Loaded {len(profile)} signals for user {user_id}")
+        return profile
+    
+    def _evict_user(self, user_id: str, profile: Dict[str, PreferenceSignal]) -> None:
+        """Write back a cold user's pending signals and drop them from memory."""
+        keys = self._dirty.get(user_id)
+        if keys:
+            self.profile_store.write_signals(
+                [self._signal_row(user_id, profile[key]) for key in keys]
+            )
+            self._pending -= len(keys)
+        self._dirty.pop(user_id, None)
+        self._drop_user_index(user_id)
+        logger.debug(f"Evicted user {user_id} from resident profiles")
+    
+    @staticmethod
+    def _signal_row(user_id: str, signal: PreferenceSignal) -> tuple:
+        return (user_id, signal.key, signal.value, signal.confidence,
+                signal.frequency, signal.last_seen)
+    
+    def _maybe_flush(self) -> None:
+        if self.profile_store is not None and self._pending >= self.flush_batch_size:
+            self.flush()
+    
+    def flush(self) -> int:
+        """Write all pending signal changes to the profile store.
+        
+        Returns:
+            Number of signals written
+        """
+        if self.profile_store is None or not self._dirty:
+            return 0
+        rows = []
+        for user_id, keys in self._dirty.items():
+            profile = dict.get(self.user_profiles, user_id, {})
+            rows.extend(self._signal_row(user_id, profile[key]) for key in keys if key in profile)
+        # Cleared only once written, so a failed write loses nothing
+        written = self.profile_store.write_signals(rows)
+        self._dirty.clear()
+        self._pending = 0
+        logger.info(f"Flushed {written} preference signals")
+        return written
+    
+    def close(self) -> None:
+        """Flush pending signal changes and close the profile store."""
+        if self.profile_store is not None:
+            self.flush()
+            self.profile_store.close()
     
     def save_preference(self, key: str, value: Any, user_id: Optional[str] = None) -> None:
         """Explicitly save a user preference.
@@ -151,6 +462,8 @@ class PreferenceEngine:
             confidence=1.0,  # Explicit preferences have max confidence
             frequency=1
         )
+        self._index_signal(uid, profile[pref_key])
+        self._maybe_flush()
         
         # Persist to memory backend if available
         if self.memory_backend:
@@ -177,54 +490,157 @@ class PreferenceEngine:
         
         profile = self.user_profiles[user_id]
         context = context or {}
+        now = datetime.now()
+        
+        # Context matches come straight from the index
+        matches: Dict[str, int] = {}
+        index = self._context_index.get(user_id, {})
+        for ctx_key, ctx_value in context.items():
+            for key in index.get((ctx_key, str(ctx_value)), ()):
+                matches[key] = matches.get(key, 0) + 1
+        
+        # Min-heap of the best 10 (score, key) pairs
+        top: List[Tuple[float, str]] = []
         
-        # Apply time decay to signals
-        self._apply_time_decay(profile)
+        def consider(signal: PreferenceSignal, n_matches: int) -> None:
+            score = self._score_preference(signal, self._decayed_confidence(signal, now), n_matches)
+            if score <= 0.3:  # Threshold for relevance
+                return
+            if len(top) < 10:
+                heapq.heappush(top, (score, signal.key))
+            elif (score, signal.key) > top[0]:
+                heapq.heapreplace(top, (score, signal.key))
+        
+        for key, n_matches in matches.items():
+            consider(profile[key], n_matches)
+        
+        # Remaining signals in descending bound order; stop once no
+        # unmatched signal can pass the threshold or enter the top 10
+        for neg_bound, key in self._ranked.get(user_id, ()):
+            bound = -neg_bound
+            if bound <= 0.3 or (len(top) == 10 and bound < top[0][0]):
+                break
+            if key not in matches:
+                consider(profile[key], 0)
         
-        # Score preferences based on context match
         scored_prefs = []
-        for signal in profile.values():
-            score = self._score_preference(signal, context)
-            if score > 0.3:  # Threshold for relevance
-                scored_prefs.append({
-                    'key': signal.key,
-                    'value': signal.value,
-                    'confidence': signal.confidence,
-                    'score': score,
-                    'frequency': signal.frequency
-                })
-        
-        # Sort by score (descending)
-        scored_prefs.sort(key=lambda x: x['score'], reverse=True)
+        for score, key in sorted(top, reverse=True):
+            signal = profile[key]
+            scored_prefs.append({
+                'key': signal.key,
+                'value': signal.value,
+                'confidence': self._decayed_confidence(signal, now),
+                'score': score,
+                'frequency': signal.frequency
+            })
         
         logger.debug(f"Predicted {len(scored_prefs)} preferences for user {user_id}")
-        return scored_prefs[:10]  # Return top 10
+        return scored_prefs
     
-    def _apply_time_decay(self, profile: Dict[str, PreferenceSignal]) -> None:
-        """Apply time decay to preference signals."""
-        now = datetime.now()
-        for signal in profile.values():
-            # Calculate days since last seen
-            days_old = (now - signal.last_seen).days
-            # Apply exponential decay
-            decay = self.decay_factor ** days_old
-            signal.confidence *= decay
+    def predict_preferences_batch(self, user_ids: List[str],
+                                  contexts: Optional[List[Optional[Dict[str, Any]]]] = None,
+                                  top_k: int = 10) -> List[List[Dict[str, Any]]]:
+        """Predict preferences for many (user, context) requests at once.
+        
+        Scores every signal of the requested users in one vectorized pass
+        over the columnar store, with the same scoring and ordering as
+        predict_preferences.
+        
+        Args:
+            user_ids: User identifier per request (may repeat, e.g. per tab)
+            contexts: Context per request, aligned with user_ids
+            top_k: Number of preferences to return per request
+            
+        Returns:
+            Predicted preferences per request, aligned with user_ids
+        """
+        contexts = contexts if contexts is not None else [None] * len(user_ids)
+        if len(contexts) != len(user_ids):
+            raise ValueError("contexts must be aligned with user_ids")
+        
+        resident = self.user_profiles
+        if not isinstance(resident, _ResidentProfiles):
+            return self._predict_batch(user_ids, contexts, top_k)
+        
+        # Keep every requested user resident for the duration of the batch
+        unique_users = list(dict.fromkeys(user_ids))
+        capacity = resident.capacity
+        resident.capacity = max(capacity, len(unique_users))
+        try:
+            for user_id in unique_users:
+                if user_id in resident:
+                    resident[user_id]  # loads from the profile store
+            return self._predict_batch(user_ids, contexts, top_k)
+        finally:
+            resident.capacity = capacity
+            resident.shrink()
     
-    def _score_preference(self, signal: PreferenceSignal, 
-                         context: Dict[str, Any]) -> float:
-        """Score a preference signal based on context match."""
-        base_score = signal.confidence
+    def _predict_batch(self, user_ids: List[str], contexts: List[Optional[Dict[str, Any]]],
+                       top_k: int) -> List[List[Dict[str, Any]]]:
+        """Vectorized scoring over resident users' rows."""
+        results: List[List[Dict[str, Any]]] = [[] for _ in user_ids]
+        row_lists, request_ids, pair_keys = [], [], []
+        n_pairs = max(len(self._pairs), 1)
+        for req, (user_id, context) in enumerate(zip(user_ids, contexts)):
+            rows = self._user_rows.get(user_id)
+            if not rows:
+                continue
+            row_lists.append(np.asarray(rows, dtype=np.int64))
+            request_ids.append(np.full(len(rows), req, dtype=np.int64))
+            for ctx_key, ctx_value in (context or {}).items():
+                pair_id = self._pairs.get((ctx_key, str(ctx_value)))
+                if pair_id is not None:
+                    pair_keys.append(req * n_pairs + pair_id)
+        if not row_lists:
+            return results
+        
+        columns = self._columns
+        rows = np.concatenate(row_lists)
+        requests = np.concatenate(request_ids)
         
+        days_old = np.floor((datetime.now().timestamp() - columns.last_seen[rows]) / _SECONDS_PER_DAY)
+        confidence = columns.confidence[rows] * self.decay_factor ** np.maximum(days_old, 0.0)
+        frequency_boost = np.minimum(np.log(columns.frequency[rows] + 1) / 5, 0.5)
+        pairs = columns.pair[rows]
+        matched = (pairs >= 0) & np.isin(requests * n_pairs + pairs, np.asarray(pair_keys, dtype=np.int64))
+        scores = np.minimum(confidence + frequency_boost + 0.2 * matched, 1.0)
+        
+        keep = scores > 0.3  # Threshold for relevance
+        rows, requests, scores, confidence = rows[keep], requests[keep], scores[keep], confidence[keep]
+        
+        # Order by request, then score and key descending
+        if self._key_rank is None:
+            self._key_rank = np.argsort(np.argsort(np.array(self._keys.values)))
+        key_ids = columns.key[rows]
+        order = np.lexsort((-self._key_rank[key_ids], -scores, requests))
+        sorted_requests = requests[order]
+        group_start = np.searchsorted(sorted_requests, sorted_requests, side='left')
+        selected = order[(np.arange(len(order)) - group_start) < top_k]
+        
+        for i in selected:
+            req = int(requests[i])
+            signal = self.user_profiles[user_ids[req]][self._keys.values[key_ids[i]]]
+            results[req].append({
+                'key': signal.key,
+                'value': signal.value,
+                'confidence': float(confidence[i]),
+                'score': float(scores[i]),
+                'frequency': signal.frequency
+            })
+        
+        logger.debug(f"Batch-predicted preferences for {len(user_ids)} requests")
+        return results
+    
+    def _score_preference(self, signal: PreferenceSignal, confidence: float,
+                         n_matches: int) -> float:
+        """Score a preference signal given its decayed confidence and context matches."""
         # Boost score for frequent preferences
         frequency_boost = min(math.log(signal.frequency + 1) / 5, 0.5)
         
         # Boost score for context matches
-        context_boost = 0.0
-        for ctx_key, ctx_value in context.items():
-            if f":{ctx_key}:{ctx_value}" in signal.key:
-                context_boost += 0.2
+        context_boost = 0.2 * n_matches
         
-        return min(base_score + frequency_boost + context_boost, 1.0)
+        return min(confidence + frequency_boost + context_boost, 1.0)
     
     def get_user_profile(self, user_id: str) -> Dict[str, Any]:
         """Get user profile summary.
@@ -239,6 +655,7 @@ class PreferenceEngine:
             return {}
         
         profile = self.user_profiles[user_id]
+        now = datetime.now()
         
         return {
             'user_id': user_id,
@@ -249,8 +666,8 @@ class PreferenceEngine:
             'learned_preferences': sum(
                 1 for s in profile.values() if not s.key.startswith('explicit:')
             ),
-            'avg_confidence': sum(s.confidence for s in profile.values()) / len(profile)
-                            if profile else 0.0
+            'avg_confidence': sum(self._decayed_confidence(s, now) for s in profile.values())
+                            / len(profile) if profile else 0.0
         }
     
     def export_profile(self, user_id: str) -> str:
@@ -297,5 +714,14 @@ class PreferenceEngine:
                 last_seen=datetime.fromisoformat(data['last_seen'])
             )
         
+        if self.profile_store is not None:
+            # Replace the stored rows at once rather than write-behind, so
+            # an exit before the next flush cannot leave the user empty
+            self._pending -= len(self._dirty.pop(user_id, ()))
+            self.profile_store.delete_user(user_id)
+            self.profile_store.write_signals(
+                self._signal_row(user_id, signal) for signal in profile.values()
+            )
         self.user_profiles[user_id] = profile
+        self._reindex_user(user_id, dirty=False)
         logger.info(f"Imported profile for user {user_id} with {len(profile)} preferences")
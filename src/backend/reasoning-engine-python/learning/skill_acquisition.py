@@ -5,16 +5,22 @@ Implements:
 - Adaptive learning path generation
 - Difficulty adjustment
 - Progress tracking
+- Indexed module catalog (skill -> modules by difficulty)
+- Prerequisite-aware topological path planning with memoization
 """
 
+import bisect
+import heapq
 import logging
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Tuple
 from dataclasses import dataclass, field
 from datetime import datetime
 from enum import Enum
 
 logger = logging.getLogger(__name__)
 
+PLAN_CACHE_SIZE = 1024
+
 class SkillLevel(Enum):
     NOVICE = 0
     BEGINNER = 1
@@ -44,20 +50,115 @@ class LearningModule:
     skill: str
     difficulty: float  # 0-1 scale
     content: Any
-    prerequisites: List[str] = field(default_factory=list)
+    prerequisites: List[str] = field(default_factory=list)  # module ids
 
 class SkillAcquisitionEngine:
     """Engine for identifying gaps and creating learning paths."""
     
     def __init__(self):
         self.user_skills: Dict[str, Dict[str, Skill]] = {}
-        self.learning_modules: List[LearningModule] = []
+        self._modules: List[LearningModule] = []
+        # Catalog index over learning_modules, built incrementally: per skill,
+        # (difficulty, position, module) sorted ascending plus the bare
+        # difficulties for bisect lookups
+        self._catalog: Dict[str, List[Tuple[float, int, LearningModule]]] = {}
+        self._difficulties: Dict[str, List[float]] = {}
+        self._modules_by_id: Dict[str, LearningModule] = {}
+        self._indexed_count = 0
+        self._catalog_version = 0
+        self._mastery_versions: Dict[str, int] = {}
+        self._plan_cache: Dict[Tuple, List[LearningModule]] = {}
         self._ready = True
         logger.info("SkillAcquisitionEngine initialized")
     
     def is_ready(self) -> bool:
         return self._ready
     
+    @property
+    def learning_modules(self) -> List[LearningModule]:
+        """The module catalog; appending to it directly is supported."""
+        return self._modules
+    
+    @learning_modules.setter
+    def learning_modules(self, modules: List[LearningModule]) -> None:
+        self._modules = modules
+        self.invalidate_catalog()
+    
+    def add_module(self, module: LearningModule) -> None:
+        """Add a learning module to the catalog."""
+        self.learning_modules.append(module)
+        self._sync_catalog()
+    
+    def add_modules(self, modules: List[LearningModule]) -> None:
+        """Add many learning modules to the catalog at once."""
+        self.learning_modules.extend(modules)
+        self._sync_catalog()
+    
+    def replace_module(self, module: LearningModule) -> bool:
+        """Replace the catalog module with the same id; returns whether it existed."""
+        for position, existing in enumerate(self._modules):
+            if existing.id == module.id:
+                self._modules[position] = module
+                self.invalidate_catalog()
+                return True
+        return False
+    
+    def remove_module(self, module_id: str) -> bool:
+        """Remove a module from the catalog; returns whether it existed."""
+        for position, existing in enumerate(self._modules):
+            if existing.id == module_id:
+                del self._modules[position]
+                self.invalidate_catalog()
+                return True
+        return False
+    
+    def invalidate_catalog(self) -> None:
+        """Drop the catalog index; it is rebuilt on next use.
+        
+        Call this after editing learning_modules other than by appending.
+        """
+        self._catalog.clear()
+        self._difficulties.clear()
+        self._modules_by_id.clear()
+        self._indexed_count = 0
+        self._catalog_version += 1
+        self._plan_cache.clear()
+    
+    def get_module(self, module_id: str) -> Optional[LearningModule]:
+        """Look up a catalog module by id."""
+        self._sync_catalog()
+        return self._modules_by_id.get(module_id)
+    
+    def _sync_catalog(self) -> None:
+        """Index modules appended to learning_modules since the last sync.
+        
+        Appends are found by length alone. replace_module, remove_module and
+        assigning learning_modules invalidate the index; in-place edits of
+        the list must be followed by invalidate_catalog().
+        """
+        modules = self._modules
+        if len(modules) == self._indexed_count:
+            return
+        if len(modules) < self._indexed_count:
+            self.invalidate_catalog()
+        
+        touched = set()
+        for position in range(self._indexed_count, len(modules)):
+            module = modules[position]
+            self._catalog.setdefault(module.skill, []).append((module.difficulty, position, module))
+            self._modules_by_id[module.id] = module
+            touched.add(module.skill)
+        for skill in touched:
+            # Timsort merges the sorted prefix and the new run in linear time
+            entries = self._catalog[skill]
+            entries.sort(key=lambda entry: entry[:2])
+            self._difficulties[skill] = [entry[0] for entry in entries]
+        
+        self._indexed_count = len(modules)
+        self._catalog_version += 1
+        self._plan_cache.clear()
+        logger.debug(f"Catalog indexed {len(modules)} modules over {len(self._catalog)} skills")
+    
     def analyze_gaps(self, user_id: str, target_skills: Dict[str, float]) -> List[SkillGap]:
         """Identify skill gaps."""
         gaps = []
@@ -81,52 +182,124 @@ class SkillAcquisitionEngine:
         logger.info(f"Identified {len(gaps)} skill gaps for user {user_id}")
         return gaps
     
-    def create_learning_path(self, gaps: List[SkillGap], learning_style: str = "adaptive") -> List[LearningModule]:
-        """Generate ordered learning path."""
-        path = []
+    def create_learning_path(self, gaps: List[SkillGap], learning_style: str = "adaptive",
+                             user_id: Optional[str] = None) -> List[LearningModule]:
+        """Generate ordered learning path.
         
-        for gap in gaps:
-            # Find modules for this skill
-            matching_modules = [
-                m for m in self.learning_modules 
-                if m.skill == gap.skill_name
-            ]
-            
-            # Sort by difficulty
-            matching_modules.sort(key=lambda x: x.difficulty)
-            
-            # Add modules progressively
-            for module in matching_modules:
-                if module.difficulty <= gap.target_level:
-                    path.append(module)
+        For each gap, the skill's modules up to the target level are taken
+        in ascending difficulty, gaps in the given order. Prerequisites
+        (module ids) are pulled into the path and scheduled before their
+        dependents, also across gaps. With a user_id, prerequisites of
+        skills the user has already mastered to the module's difficulty
+        are treated as satisfied.
+        
+        Plans are memoized until the catalog or the user's mastery changes.
+        """
+        self._sync_catalog()
+        cache_key = (
+            tuple((gap.skill_name, gap.target_level) for gap in gaps),
+            learning_style,
+            user_id,
+            self._mastery_versions.get(user_id, 0) if user_id is not None else 0,
+        )
+        plan = self._plan_cache.get(cache_key)
+        if plan is None:
+            if len(self._plan_cache) >= PLAN_CACHE_SIZE:
+                del self._plan_cache[next(iter(self._plan_cache))]
+            plan = self._plan_cache[cache_key] = self._plan(gaps, user_id)
+        
+        logger.info(f"Created learning path with {len(plan)} modules")
+        return list(plan)
+    
+    def _plan(self, gaps: List[SkillGap], user_id: Optional[str]) -> List[LearningModule]:
+        """Topologically order the gap modules and their prerequisites."""
+        # Priority of each selected module: (gap rank, difficulty rank)
+        priority: Dict[str, Tuple[int, int]] = {}
+        selected: Dict[str, LearningModule] = {}
+        for rank, gap in enumerate(gaps):
+            entries = self._catalog.get(gap.skill_name, [])
+            end = bisect.bisect_right(self._difficulties.get(gap.skill_name, []), gap.target_level)
+            for offset in range(end):
+                module = entries[offset][2]
+                if module.id not in selected:
+                    selected[module.id] = module
+                    priority[module.id] = (rank, offset)
+        
+        # Pull in missing prerequisites; each inherits the priority of the
+        # first dependent that reached it
+        mastery = self.user_skills.get(user_id, {}) if user_id is not None else {}
+        stack = list(selected.values())
+        while stack:
+            module = stack.pop()
+            for prereq_id in module.prerequisites:
+                if prereq_id in selected:
+                    continue
+                prereq = self._modules_by_id.get(prereq_id)
+                if prereq is None:
+                    logger.debug(f"Unknown prerequisite {prereq_id} of module {module.id}")
+                    continue
+                skill = mastery.get(prereq.skill)
+                if skill is not None and skill.mastery >= prereq.difficulty:
+                    continue
+                selected[prereq_id] = prereq
+                priority[prereq_id] = priority[module.id]
+                stack.append(prereq)
         
-        logger.info(f"Created learning path with {len(path)} modules")
+        # Kahn's algorithm, choosing the highest-priority ready module
+        dependents: Dict[str, List[str]] = {module_id: [] for module_id in selected}
+        indegree = dict.fromkeys(selected, 0)
+        for module_id, module in selected.items():
+            for prereq_id in set(module.prerequisites):
+                if prereq_id in selected:
+                    dependents[prereq_id].append(module_id)
+                    indegree[module_id] += 1
+        
+        order = {module_id: i for i, module_id in enumerate(selected)}
+        ready = [(priority[m], order[m], m) for m, degree in indegree.items() if degree == 0]
+        heapq.heapify(ready)
+        path = []
+        while ready:
+            _, _, module_id = heapq.heappop(ready)
+            path.append(selected[module_id])
+            for dependent in dependents[module_id]:
+                indegree[dependent] -= 1
+                if indegree[dependent] == 0:
+                    heapq.heappush(ready, (priority[dependent], order[dependent], dependent))
+        
+        if len(path) < len(selected):
+            cyclic = [m for m, degree in indegree.items() if degree > 0]
+            logger.warning(f"Prerequisite cycle among modules {cyclic}; appending them unordered")
+            path.extend(selected[m] for m in sorted(cyclic, key=lambda m: (priority[m], order[m])))
         return path
     
     def get_adaptive_content(self, user_id: str, skill_name: str) -> Optional[LearningModule]:
         """Get next adaptive content based on progress."""
+        self._sync_catalog()
+        entries = self._catalog.get(skill_name)
+        if not entries:
+            return None
+        
         user_profile = self.user_skills.get(user_id, {})
         skill = user_profile.get(skill_name)
         
         if not skill:
             # Start with easiest module
-            modules = [m for m in self.learning_modules if m.skill == skill_name]
-            if modules:
-                modules.sort(key=lambda x: x.difficulty)
-                return modules[0]
-            return None
+            return entries[0][2]
         
-        # Find module matching current mastery level
+        # Find module matching current mastery level: the nearest difficulty
+        # on either side of the target, earliest added on ties
         target_difficulty = min(skill.mastery + 0.1, 1.0)
-        matching = [
-            m for m in self.learning_modules
-            if m.skill == skill_name and abs(m.difficulty - target_difficulty) < 0.2
-        ]
-        
-        if matching:
-            matching.sort(key=lambda x: abs(x.difficulty - target_difficulty))
-            return matching[0]
+        difficulties = self._difficulties[skill_name]
+        i = bisect.bisect_left(difficulties, target_difficulty)
+        candidates = []
+        if i < len(entries):
+            candidates.append(entries[i])
+        if i > 0:
+            candidates.append(entries[bisect.bisect_left(difficulties, difficulties[i - 1])])
         
+        best = min(candidates, key=lambda entry: (abs(entry[0] - target_difficulty), entry[1]))
+        if abs(best[0] - target_difficulty) < 0.2:
+            return best[2]
         return None
     
     def track_progress(self, user_id: str, skill_name: str, success: bool) -> None:
@@ -146,5 +319,6 @@ class SkillAcquisitionEngine:
         success_rate = skill.successes / skill.attempts
         skill.mastery = 0.7 * skill.mastery + 0.3 * success_rate
         skill.last_practiced = datetime.now()
+        self._mastery_versions[user_id] = self._mastery_versions.get(user_id, 0) + 1
         
         logger.debug(f"Updated skill {skill_name} for user {user_id}: mastery={skill.mastery:.2f}")
@@ -1,11 +1,28 @@
-from fastapi import FastAPI, HTTPException, Query
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Query, Response
 from pydantic import BaseModel
 import duckdb, os, uuid, datetime, json
 
-app = FastAPI(title="Reasoning Engine")
+from learning.adaptive_profiler import profiled
+from learning.metrics_exporter import OpenMetricsExporter, get_exporter
+from learning.preference_engine import PreferenceEngine
+from storage.profile_store import ShardedProfileStore
 
 DUCKDB_PATH = os.getenv("DUCKDB_PATH", "/data/memory.duckdb")
 DUCKDB_ENCRYPTION = os.getenv("DUCKDB_ENCRYPTION", "disabled")
+PROFILE_STORE_DIR = os.getenv("PROFILE_STORE_DIR", "/data/profiles")
+
+preference_engine = PreferenceEngine(profile_store=ShardedProfileStore(PROFILE_STORE_DIR))
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # Write-behind preference changes below the flush batch size live only in memory
+    preference_engine.close()
+    con.close()
+
+app = FastAPI(title="Reasoning Engine", lifespan=lifespan)
+metrics_exporter = get_exporter()
 
 # Initialize DB and tables
 con = duckdb.connect(DUCKDB_PATH, read_only=False)
@@ -39,6 +56,7 @@ class MemoryOut(MemoryIn):
     ts: datetime.datetime
 
 @app.post("/memory", response_model=MemoryOut)
+@profiled("api.create_memory")
 def create_memory(m: MemoryIn):
     mem_id = str(uuid.uuid4())
     ts = datetime.datetime.utcnow()
@@ -49,6 +67,7 @@ def create_memory(m: MemoryIn):
     return MemoryOut(id=mem_id, ts=ts, **m.dict())
 
 @app.get("/memory")
+@profiled("api.list_memories")
 def list_memories(user_id: str = Query(...), q: str | None = None, limit: int = 50):
     if q:
         res = con.execute(
@@ -75,6 +94,7 @@ def list_memories(user_id: str = Query(...), q: str | None = None, limit: int =
     return out
 
 @app.put("/memory/{mem_id}", response_model=MemoryOut)
+@profiled("api.update_memory")
 def update_memory(mem_id: str, m: MemoryIn):
     ts = datetime.datetime.utcnow()
     cur = con.execute(
@@ -86,6 +106,7 @@ def update_memory(mem_id: str, m: MemoryIn):
     return MemoryOut(id=mem_id, ts=ts, **m.dict())
 
 @app.delete("/memory/{mem_id}")
+@profiled("api.delete_memory")
 def delete_memory(mem_id: str):
     cur = con.execute("DELETE FROM memories WHERE id=?", [mem_id])
     if cur.rowcount == 0:
@@ -94,9 +115,15 @@ def delete_memory(mem_id: str):
 
 # Simple RAG query endpoint returning recent relevant memories
 @app.get("/rag/context")
+@profiled("api.rag_context")
 def rag_context(user_id: str, q: str, limit: int = 5):
     res = con.execute(
         "SELECT id, content, ts FROM memories WHERE user_id=? AND lower(content) LIKE ? ORDER BY ts DESC LIMIT ?",
         [user_id, f"%{q.lower()}%", limit],
     ).fetchall()
     return [{"id": r[0], "content": r[1], "ts": r[2]} for r in res]
+
+# Prometheus/OpenMetrics scrape target; payload is precomputed on each profiler tick
+@app.get("/metrics")
+def metrics():
+    return Response(content=metrics_exporter.render(), media_type=OpenMetricsExporter.CONTENT_TYPE)
@@ -0,0 +1,217 @@
+"""
+Analysis Cache - Persistent cache of multi-modal analysis results
+Keyed by file content hash, analyzer version and options
+LOCAL PROCESSING - Privacy-first approach
+"""
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple, Union
+import hashlib
+import json
+import pickle
+import threading
+import time
+
+import duckdb
+
+_HASH_CHUNK = 1 << 20
+_LOW_WATER = 0.9  # eviction frees down to this share of the limits
+_EVICT_BATCH = 256  # rows fetched per eviction query
+
+
+def content_hash(file_path: Path) -> str:
+    """BLAKE2b digest of a file's bytes"""
+    digest = hashlib.blake2b(digest_size=20)
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class AnalysisCache:
+    """
+    On-disk analysis cache (DuckDB) with an in-memory LRU front
+
+    File hashes are only recomputed when a file's mtime or size changed.
+    Entries are evicted least-recently-used once max_entries or max_bytes
+    is exceeded, down to 90% of both limits so eviction runs once per
+    batch of puts; entry count and total size are tracked as entries come
+    and go. The memory tier holds pickled payloads, so every get returns
+    a fresh copy. Data stays in a local database file - NEVER sent externally
+    """
+
+    def __init__(self, db_path: Union[str, Path], max_entries: int = 10000,
+                 max_bytes: int = 512 * 1024 * 1024, memory_entries: int = 1024):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.memory_entries = memory_entries
+        self.conn = duckdb.connect(str(self.db_path))
+        self._lock = threading.RLock()
+        self._memory: "OrderedDict[str, bytes]" = OrderedDict()
+        self._stats: Dict[str, Tuple[int, int, str]] = {}  # path -> (mtime_ns, size, hash)
+        self._touched: Dict[str, float] = {}  # cache_key -> last access, not yet written
+        self.hits = 0
+        self.misses = 0
+        self._init_schema()
+        self._count, self._total = self.conn.execute(
+            "SELECT count(*), coalesce(sum(size), 0) FROM analyses"
+        ).fetchone()
+
+    def _init_schema(self):
+        """Initialize database schema"""
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS analyses (
+                cache_key VARCHAR PRIMARY KEY,
+                content_hash VARCHAR,
+                payload BLOB,
+                size BIGINT,
+                last_access DOUBLE
+            )
+        """)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS file_index (
+                path VARCHAR PRIMARY KEY,
+                mtime_ns BIGINT,
+                size BIGINT,
+                content_hash VARCHAR
+            )
+        """)
+
+    def file_hash(self, file_path: Path) -> str:
+        """Content hash of a file, reused while its mtime and size are unchanged"""
+        path = str(Path(file_path).resolve())
+        stat = Path(path).stat()
+        with self._lock:
+            known = self._stats.get(path)
+            if known is None:
+                row = self.conn.execute(
+                    "SELECT mtime_ns, size, content_hash FROM file_index WHERE path = ?", [path]
+                ).fetchone()
+                known = tuple(row) if row else None
+        if known is not None and known[0] == stat.st_mtime_ns and known[1] == stat.st_size:
+            with self._lock:
+                self._stats[path] = known
+            return known[2]
+
+        digest = content_hash(Path(path))
+        with self._lock:
+            self._stats[path] = (stat.st_mtime_ns, stat.st_size, digest)
+            self.conn.execute(
+                "INSERT OR REPLACE INTO file_index VALUES (?, ?, ?, ?)",
+                [path, stat.st_mtime_ns, stat.st_size, digest]
+            )
+        return digest
+
+    def key_for(self, file_path: Path, modality: str, version: str,
+                options: Optional[Dict[str, Any]] = None) -> str:
+        """Cache key for (content hash, analyzer version, options)"""
+        spec = json.dumps([modality, version, options or {}], sort_keys=True, default=str)
+        return f"{self.file_hash(file_path)}:{hashlib.blake2b(spec.encode(), digest_size=8).hexdigest()}"
+
+    def _remember(self, cache_key: str, payload: bytes) -> None:
+        self._memory[cache_key] = payload
+        self._memory.move_to_end(cache_key)
+        if len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, cache_key: str) -> Optional[Any]:
+        """Cached analysis for a key, or None"""
+        with self._lock:
+            self._touched[cache_key] = time.time()
+            if cache_key in self._memory:
+                self._memory.move_to_end(cache_key)
+                self.hits += 1
+                return pickle.loads(self._memory[cache_key])
+            row = self.conn.execute(
+                "SELECT payload FROM analyses WHERE cache_key = ?", [cache_key]
+            ).fetchone()
+            if row is None:
+                del self._touched[cache_key]
+                self.misses += 1
+                return None
+            payload = bytes(row[0])
+            self._remember(cache_key, payload)
+            self.hits += 1
+            return pickle.loads(payload)
+
+    def put(self, cache_key: str, value: Any) -> None:
+        """Store an analysis and evict old entries beyond the limits"""
+        payload = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            old = self.conn.execute(
+                "SELECT size FROM analyses WHERE cache_key = ?", [cache_key]
+            ).fetchone()
+            self.conn.execute(
+                "INSERT OR REPLACE INTO analyses VALUES (?, ?, ?, ?, ?)",
+                [cache_key, cache_key.split(':', 1)[0], payload, len(payload), time.time()]
+            )
+            if old is None:
+                self._count += 1
+            else:
+                self._total -= old[0]
+            self._total += len(payload)
+            self._touched.pop(cache_key, None)
+            self._remember(cache_key, payload)
+            self._evict()
+
+    def _flush_touched(self) -> None:
+        if self._touched:
+            self.conn.executemany(
+                "UPDATE analyses SET last_access = ? WHERE cache_key = ?",
+                [[ts, key] for key, ts in self._touched.items()]
+            )
+            self._touched.clear()
+
+    def _evict(self) -> None:
+        if self._count <= self.max_entries and self._total <= self.max_bytes:
+            return
+        self._flush_touched()
+        max_count, max_total = int(self.max_entries * _LOW_WATER), self.max_bytes * _LOW_WATER
+        count, total = self._count, self._total
+        # Oldest first, only as many rows as needed, until both marks hold
+        while count > max_count or total > max_total:
+            rows = self.conn.execute(
+                "SELECT cache_key, size FROM analyses ORDER BY last_access LIMIT ?",
+                [max(count - max_count, _EVICT_BATCH)]
+            ).fetchall()
+            if not rows:
+                break
+            doomed = []
+            for cache_key, size in rows:
+                if count <= max_count and total <= max_total:
+                    break
+                doomed.append([cache_key])
+                count -= 1
+                total -= size
+            self.conn.executemany("DELETE FROM analyses WHERE cache_key = ?", doomed)
+            for (cache_key,) in doomed:
+                self._memory.pop(cache_key, None)
+        self._count, self._total = count, total
+
+    def clear(self) -> None:
+        """Remove all cached analyses"""
+        with self._lock:
+            self.conn.execute("DELETE FROM analyses")
+            self.conn.execute("DELETE FROM file_index")
+            self._memory.clear()
+            self._stats.clear()
+            self._touched.clear()
+            self._count, self._total = 0, 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Cache statistics"""
+        return {
+            'entries': self._count,
+            'bytes': self._total,
+            'memory_entries': len(self._memory),
+            'hits': self.hits,
+            'misses': self.misses
+        }
+
+    def close(self) -> None:
+        """Persist access times and close the database"""
+        with self._lock:
+            self._flush_touched()
+            self.conn.close()
@@ -0,0 +1,319 @@
+"""
+Audio IO - Decode audio once into a shared 16 kHz mono buffer
+Feeds Whisper, voice activity detection and feature extraction from one decode
+LOCAL PROCESSING - Privacy-first approach
+"""
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from stat import S_ISDIR
+from typing import Iterator, Optional, Tuple, Union
+import atexit
+import hashlib
+import json
+import math
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import wave
+
+import numpy as np
+
+SAMPLE_RATE = 16000  # what Whisper expects
+_CHUNK_FRAMES = 1 << 20  # source frames decoded per step
+_CACHE_BYTES = 2 * 1024 ** 3  # default cap of the decoded-audio cache
+
+# Resampling filter: Kaiser-windowed sinc low-pass
+_ZERO_CROSSINGS = 16  # filter half-length, in zero crossings of the sinc
+_ROLLOFF = 0.92  # cutoff as a fraction of the lower Nyquist frequency
+_KAISER_BETA = 8.0
+_RESAMPLE_BLOCK = 1 << 14  # output samples computed per step
+
+
+@dataclass
+class AudioBuffer:
+    """Decoded audio: float32 mono samples in [-1, 1] at SAMPLE_RATE"""
+    samples: np.ndarray  # in memory, or an np.memmap for long recordings
+    source_rate: int
+    channels: int
+    source: str = "<memory>"
+
+    @property
+    def sample_rate(self) -> int:
+        return SAMPLE_RATE
+
+    @property
+    def duration(self) -> float:
+        return len(self.samples) / SAMPLE_RATE
+
+    @property
+    def memory_mapped(self) -> bool:
+        return isinstance(self.samples, np.memmap)
+
+
+@lru_cache(maxsize=16)
+def _filter_bank(source_rate: int) -> Tuple[int, int, np.ndarray]:
+    """
+    Polyphase filter bank for source_rate -> SAMPLE_RATE
+    Returns (phases, half-length, bank). The rates' ratio is up/down in
+    lowest terms, so every output falls on one of `up` fractional source
+    positions; bank[phase] holds the taps for source samples
+    base - half + 1 .. base + half around it
+    """
+    up = SAMPLE_RATE // math.gcd(source_rate, SAMPLE_RATE)
+    cutoff = _ROLLOFF * min(1.0, SAMPLE_RATE / source_rate)  # of the source Nyquist
+    half = int(np.ceil(_ZERO_CROSSINGS / cutoff))
+    taps = np.arange(-half + 1, half + 1)
+    t = np.arange(up)[:, None] / up - taps[None, :]  # output-to-tap distance, in source samples
+    window = np.i0(_KAISER_BETA * np.sqrt(np.clip(1.0 - (t / half) ** 2, 0.0, None))) / np.i0(_KAISER_BETA)
+    bank = np.sinc(cutoff * t) * window
+    bank /= bank.sum(axis=1, keepdims=True)  # unity gain at DC for every phase
+    return up, half, bank.astype(np.float32)
+
+
+def _resample(samples: np.ndarray, source_rate: int, offset: float = 0.0,
+              stop: Optional[float] = None) -> np.ndarray:
+    """
+    Resample mono float32 audio to SAMPLE_RATE
+    Polyphase windowed-sinc filter cutting off below the lower Nyquist
+    frequency, so downsampling does not alias. Output positions run from
+    offset up to stop (exclusive), in source samples, so a stream can be
+    resampled block by block
+    """
+    up, half, bank = _filter_bank(source_rate)
+    stop = len(samples) - 1 + 1e-9 if stop is None else stop
+    positions = np.arange(offset, stop, source_rate / SAMPLE_RATE)
+    ticks = np.round(positions * up).astype(np.int64)  # positions in 1/up source samples
+    base, phase = ticks // up, ticks % up
+    # Zero-padded so taps past either end read silence; tap k of output i
+    # reads source sample base[i] - half + 1 + k, i.e. padded[base[i] + 1 + k]
+    padded = np.zeros(len(samples) + 2 * half, dtype=np.float32)
+    padded[half:half + len(samples)] = samples
+    taps = np.arange(2 * half)
+    out = np.empty(len(positions), dtype=np.float32)
+    for start in range(0, len(positions), _RESAMPLE_BLOCK):
+        block = slice(start, start + _RESAMPLE_BLOCK)
+        window = padded[base[block, None] + 1 + taps]
+        out[block] = np.einsum('ij,ij->i', window, bank[phase[block]])
+    return out
+
+
+class Resampler:
+    """
+    Resample a stream of mono float32 chunks to SAMPLE_RATE
+    Each block keeps `margin` source samples (the filter's half-length)
+    of context on both sides and the fractional output position is carried
+    across chunks, so the output matches a whole-signal resample however
+    the input is split
+    """
+
+    def __init__(self, source_rate: int):
+        self.source_rate = source_rate
+        self.ratio = source_rate / SAMPLE_RATE
+        self.margin = _filter_bank(source_rate)[1] + 1
+        self._block = np.zeros(0, dtype=np.float32)
+        self._offset = 0.0  # next output position, relative to the block start
+
+    def feed(self, chunk: np.ndarray) -> np.ndarray:
+        """Resample a chunk; output lags the input by up to margin samples"""
+        block = np.concatenate([self._block, np.asarray(chunk, dtype=np.float32)])
+        out = _resample(block, self.source_rate, self._offset, stop=len(block) - self.margin)
+        offset = self._offset + len(out) * self.ratio
+        drop = max(int(offset) - self.margin, 0)
+        self._block, self._offset = block[drop:], offset - drop
+        return out
+
+    def flush(self) -> np.ndarray:
+        """End of stream: resample what is left"""
+        block, offset = self._block, self._offset
+        self._block, self._offset = np.zeros(0, dtype=np.float32), 0.0
+        if not len(block):
+            return block
+        return _resample(block, self.source_rate, offset)
+
+
+def _pcm_to_float(raw: bytes, sample_width: int, channels: int) -> np.ndarray:
+    """Interleaved integer PCM -> float32 mono"""
+    if sample_width == 1:
+        pcm = (np.frombuffer(raw, dtype=np.uint8).astype(np.float32) - 128.0) / 128.0
+    elif sample_width == 2:
+        pcm = np.frombuffer(raw, dtype='<i2').astype(np.float32) / 32768.0
+    elif sample_width == 3:
+        b = np.frombuffer(raw, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+        pcm = ((b[:, 0] | (b[:, 1] << 8) | (b[:, 2] << 16)) << 8 >> 8).astype(np.float32) / 8388608.0
+    elif sample_width == 4:
+        pcm = np.frombuffer(raw, dtype='<i4').astype(np.float32) / 2147483648.0
+    else:
+        raise ValueError(f"Unsupported sample width: {sample_width}")
+    if channels > 1:
+        pcm = pcm.reshape(-1, channels).mean(axis=1)
+    return pcm
+
+
+def _iter_wav(path: Path) -> Tuple[int, int, Iterator[np.ndarray]]:
+    """(source rate, channels, chunks of 16 kHz samples) from a WAV file"""
+    wav = wave.open(str(path), 'rb')
+    rate, channels, width = wav.getframerate(), wav.getnchannels(), wav.getsampwidth()
+
+    def raw_chunks():
+        with wav:
+            while True:
+                raw = wav.readframes(_CHUNK_FRAMES)
+                if not raw:
+                    return
+                yield _pcm_to_float(raw, width, channels)
+
+    def resampled():
+        resampler = Resampler(rate)
+        for chunk in raw_chunks():
+            out = resampler.feed(chunk)
+            if len(out):
+                yield out
+        out = resampler.flush()
+        if len(out):
+            yield out
+
+    return rate, channels, raw_chunks() if rate == SAMPLE_RATE else resampled()
+
+
+def _iter_ffmpeg(path: Path) -> Tuple[int, int, Iterator[np.ndarray]]:
+    """Decode any container with a local ffmpeg, resampled by ffmpeg itself"""
+    cmd = ["ffmpeg", "-nostdin", "-loglevel", "error", "-i", str(path),
+           "-f", "s16le", "-ac", "1", "-ar", str(SAMPLE_RATE), "-"]
+
+    def chunks():
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        try:
+            while True:
+                raw = proc.stdout.read(_CHUNK_FRAMES * 2)
+                if not raw:
+                    break
+                yield _pcm_to_float(raw[:len(raw) // 2 * 2], 2, 1)
+        finally:
+            proc.stdout.close()
+            if proc.wait() != 0:
+                raise RuntimeError(f"ffmpeg failed: {proc.stderr.read().decode(errors='replace')}")
+    return SAMPLE_RATE, 1, chunks()
+
+
+def iter_audio(path: Union[str, Path]) -> Tuple[int, int, Iterator[np.ndarray]]:
+    """
+    Stream-decode a file to 16 kHz mono float32 chunks
+    Returns (source rate, source channels, chunk iterator)
+    """
+    path = Path(path)
+    if path.suffix.lower() == '.wav':
+        try:
+            return _iter_wav(path)
+        except wave.Error:
+            pass  # compressed or float WAV; let ffmpeg handle it
+    if shutil.which("ffmpeg"):
+        return _iter_ffmpeg(path)
+    try:
+        import librosa
+    except ImportError:
+        raise RuntimeError(f"Cannot decode {path.name}: install ffmpeg or librosa")
+    y, _ = librosa.load(str(path), sr=SAMPLE_RATE, mono=True)
+    return librosa.get_samplerate(str(path)), 1, iter([y.astype(np.float32)])
+
+
+def decode_audio(path: Union[str, Path]) -> AudioBuffer:
+    """Decode a whole file into memory"""
+    rate, channels, chunks = iter_audio(path)
+    parts = list(chunks)
+    samples = np.concatenate(parts) if parts else np.zeros(0, dtype=np.float32)
+    return AudioBuffer(samples, rate, channels, str(path))
+
+
+def _prune_cache(cache_dir: Path, max_bytes: int, keep: Path) -> None:
+    """Delete least recently used decodes until the cache fits in max_bytes"""
+    entries = []
+    for data in cache_dir.glob("*.f32"):
+        try:
+            stat = data.stat()
+        except OSError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, data))
+    total = sum(size for _, size, _ in entries)
+    for _, size, data in sorted(entries, key=lambda e: e[0]):
+        if total <= max_bytes:
+            return
+        if data == keep:
+            continue
+        try:
+            data.unlink()
+            data.with_suffix('.json').unlink(missing_ok=True)
+        except OSError:
+            continue  # still mapped elsewhere (Windows); retry next time
+        total -= size
+
+
+_session_dir: Optional[Path] = None
+_session_lock = threading.Lock()
+
+
+def _session_cache_dir() -> Path:
+    """Private (0700) scratch directory for this process's decodes, removed at exit"""
+    global _session_dir
+    with _session_lock:
+        if _session_dir is None:
+            _session_dir = Path(tempfile.mkdtemp(prefix="audio-decode-"))
+            atexit.register(shutil.rmtree, _session_dir, True)
+        return _session_dir
+
+
+def _check_private(cache_dir: Path) -> None:
+    """Refuse a cache directory that other local users can read or write"""
+    if os.name != 'posix':
+        return
+    st = os.lstat(cache_dir)
+    if not S_ISDIR(st.st_mode) or st.st_uid != os.getuid() or st.st_mode & 0o077:
+        raise PermissionError(f"Decode cache {cache_dir} must be a directory owned by "
+                              f"the current user with mode 0700")
+
+
+def decode_to_memmap(path: Union[str, Path], cache_dir: Optional[Union[str, Path]] = None,
+                     max_cache_bytes: int = _CACHE_BYTES) -> AudioBuffer:
+    """
+    Decode a file chunk by chunk into a float32 file and memory-map it
+    Peak memory stays at one chunk regardless of recording length. Without
+    cache_dir the decode goes to a private directory deleted when the
+    process exits; a given cache_dir persists decodes, is reused while the
+    source's mtime and size are unchanged, must be private to the current
+    user, and is trimmed to max_cache_bytes, least recently used first
+    """
+    path = Path(path).resolve()
+    stat = path.stat()
+    if cache_dir is None:
+        cache_dir = _session_cache_dir()
+    else:
+        cache_dir = Path(cache_dir)
+        cache_dir.mkdir(mode=0o700, parents=True, exist_ok=True)
+        _check_private(cache_dir)
+    key = hashlib.blake2b(f"{path}:{stat.st_mtime_ns}:{stat.st_size}".encode(), digest_size=16).hexdigest()
+    target = cache_dir / f"{key}.f32"
+    header = cache_dir / f"{key}.json"
+
+    if not (target.exists() and header.exists()):
+        rate, channels, chunks = iter_audio(path)
+        tmp = target.with_suffix('.tmp')
+        try:
+            with open(tmp, 'wb') as f:
+                for chunk in chunks:
+                    f.write(np.ascontiguousarray(chunk, dtype='<f4').tobytes())
+            os.replace(tmp, target)
+        finally:
+            tmp.unlink(missing_ok=True)
+        header.write_text(json.dumps({"source_rate": rate, "channels": channels}))
+        _prune_cache(cache_dir, max_cache_bytes, keep=target)
+    else:
+        os.utime(target)  # mark as recently used
+
+    info = json.loads(header.read_text())
+    if target.stat().st_size == 0:
+        samples = np.zeros(0, dtype=np.float32)
+    else:
+        samples = np.memmap(target, dtype='<f4', mode='r')
+    return AudioBuffer(samples, info["source_rate"], info["channels"], str(path))
@@ -4,11 +4,18 @@ Speech-to-text, audio analysis, voice commands
 LOCAL PROCESSING - Privacy-first approach
 """
 from dataclasses import dataclass
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Union, Iterable, Iterator, AsyncIterable, Callable
 from pathlib import Path
 from datetime import datetime
+import importlib.util
 import json
 
+from ..model_cache import get_model, is_loaded
+from .audio_io import SAMPLE_RATE, AudioBuffer, decode_audio, decode_to_memmap
+from .streaming import StreamingTranscriber
+from .vad import StreamingVAD, detect_segments
+from .batch import BatchTranscriber
+
 try:
     import numpy as np
 except ImportError:
@@ -50,23 +57,59 @@ class AudioProcessor:
     All audio processing happens on-device
     """
     
-    def __init__(self, model_size: str = "base"):
+    def __init__(self, model_size: str = "base", mmap_threshold_bytes: int = 64 * 1024 * 1024,
+                 mmap_dir: Optional[str] = None, mmap_cache_bytes: int = 2 * 1024 ** 3):
         self.model_size = model_size
+        self.mmap_threshold_bytes = mmap_threshold_bytes
+        self.mmap_dir = mmap_dir
+        self.mmap_cache_bytes = mmap_cache_bytes
         self._init_models()
     
     def _init_models(self):
-        """Initialize local audio models"""
-        try:
-            # Whisper for speech-to-text (local)
-            import whisper
-            self.whisper_model = whisper.load_model(self.model_size)
-            self.stt_available = True
-            print(f"✅ Audio Processor initialized (model: {self.model_size})")
-        except ImportError:
+        """Check local audio models; weights are loaded on first use"""
+        # Whisper for speech-to-text (local)
+        self.stt_available = importlib.util.find_spec("whisper") is not None
+        if not self.stt_available:
             print("⚠️  Whisper unavailable. Install: pip install openai-whisper")
-            self.stt_available = False
     
-    def transcribe_audio(self, audio_path: str, language: str = None) -> AudioAnalysis:
+    @property
+    def whisper_model(self):
+        """Whisper model from the process-wide cache, loaded on first access"""
+        def load():
+            import whisper
+            model = whisper.load_model(self.model_size)
+            print(f"✅ Whisper model loaded (model: {self.model_size})")
+            return model
+        return get_model(("whisper", self.model_size), load)
+    
+    def warmup(self) -> bool:
+        """Preload the speech-to-text model; returns whether it is ready"""
+        if self.stt_available:
+            self.whisper_model
+        return self.is_warm()
+    
+    def is_warm(self) -> bool:
+        """Check whether the speech-to-text model is resident"""
+        return is_loaded(("whisper", self.model_size))
+    
+    def load_audio(self, audio: Union[str, Path, AudioBuffer],
+                   mmap: Optional[bool] = None) -> AudioBuffer:
+        """
+        Decode audio once to 16 kHz mono float32
+        Files above mmap_threshold_bytes (or with mmap=True) are decoded
+        to disk in chunks and memory-mapped instead of held in RAM. They
+        are kept only for this process unless mmap_dir is set; that cache
+        must be private to the user and is capped at mmap_cache_bytes
+        """
+        if isinstance(audio, AudioBuffer):
+            return audio
+        if mmap is None:
+            mmap = Path(audio).stat().st_size > self.mmap_threshold_bytes
+        if mmap:
+            return decode_to_memmap(audio, self.mmap_dir, self.mmap_cache_bytes)
+        return decode_audio(audio)
+    
+    def transcribe_audio(self, audio_path: Union[str, AudioBuffer], language: str = None) -> AudioAnalysis:
         """
         Transcribe audio with LOCAL processing only
         NO external API calls - privacy guaranteed
@@ -74,18 +117,21 @@ class AudioProcessor:
         if not self.stt_available:
             raise RuntimeError("Speech-to-text not available")
         
+        # One decode shared by Whisper and feature extraction
+        audio = self.load_audio(audio_path)
+        
         # Transcribe with Whisper (runs locally)
         result = self.whisper_model.transcribe(
-            audio_path,
+            np.asarray(audio.samples),
             language=language,
             fp16=False  # CPU compatible
         )
         
         # Extract audio features
-        audio_features = self._extract_audio_features(audio_path)
+        audio_features = self._extract_audio_features(audio)
         
         return AudioAnalysis(
-            audio_path=audio_path,
+            audio_path=audio.source,
             timestamp=datetime.now().isoformat(),
             duration=audio_features.get("duration", 0.0),
             sample_rate=audio_features.get("sample_rate", 16000),
@@ -96,45 +142,73 @@ class AudioProcessor:
             audio_features=audio_features
         )
     
-    def transcribe_realtime(self, audio_stream):
-        """Real-time transcription from audio stream"""
-        # Implement streaming transcription
-        pass
-    
-    def detect_voice_activity(self, audio_path: str) -> List[Dict[str, float]]:
-        """Detect voice activity segments"""
-        # Simple energy-based VAD
-        try:
-            import librosa
-            y, sr = librosa.load(audio_path, sr=16000)
-            
-            # Calculate energy
-            frame_length = int(0.025 * sr)  # 25ms frames
-            hop_length = int(0.010 * sr)    # 10ms hop
-            
-            energy = librosa.feature.rms(y=y, frame_length=frame_length, hop_length=hop_length)[0]
-            threshold = np.mean(energy) * 0.5
-            
-            # Find voice segments
-            voice_segments = []
-            in_voice = False
-            start_time = 0
-            
-            for i, e in enumerate(energy):
-                time = i * hop_length / sr
-                if e > threshold and not in_voice:
-                    start_time = time
-                    in_voice = True
-                elif e <= threshold and in_voice:
-                    voice_segments.append({"start": start_time, "end": time})
-                    in_voice = False
-            
-            return voice_segments
-        except ImportError:
-            print("Install: pip install librosa")
-            return []
-    
-    def analyze_audio_quality(self, audio_path: str) -> Dict[str, Any]:
+    def transcribe_many(self, paths: Iterable[Union[str, Path]], workers: Optional[int] = None,
+                        batch_size: int = 8, language: str = None, use_processes: bool = True,
+                        engine: Optional[Callable] = None, max_span_sec: float = 30.0,
+                        vad_options: Optional[Dict[str, Any]] = None) -> Iterator[AudioAnalysis]:
+        """
+        Bulk transcription across many files
+        
+        Voice segments of all files are pooled into length-bucketed batches
+        and decoded on `workers` processes, each with its own model.
+        Yields one AudioAnalysis per file as soon as that file is done
+        (completion order); per-span text is in audio_features["segments"].
+        engine replaces the default Whisper batch decoder; vad_options are
+        passed to StreamingVAD
+        """
+        if not self.stt_available and engine is None:
+            raise RuntimeError("Speech-to-text not available")
+        scheduler = BatchTranscriber(self, workers=workers, batch_size=batch_size, language=language,
+                                     use_processes=use_processes, engine=engine,
+                                     max_span_sec=max_span_sec, vad_options=vad_options)
+        return scheduler.run(paths)
+    
+    def transcribe_realtime(self, audio_stream: Union[Iterable, AsyncIterable],
+                            sample_rate: int = SAMPLE_RATE, language: str = None, **options):
+        """
+        Real-time transcription from audio stream
+        
+        Takes an iterator or async iterator of PCM chunks (int16 bytes or
+        numpy arrays at sample_rate) and returns a matching (async) iterator
+        of TranscriptSegment, partial and final, with stream timestamps.
+        Options are passed to StreamingTranscriber
+        """
+        if not self.stt_available:
+            raise RuntimeError("Speech-to-text not available")
+        transcriber = StreamingTranscriber(self._window_transcriber(language), sample_rate, **options)
+        if hasattr(audio_stream, "__aiter__"):
+            return transcriber.astream(audio_stream)
+        return transcriber.stream(audio_stream)
+    
+    def _window_transcriber(self, language: Optional[str]):
+        """Whisper over one in-memory window, primed with the previous final text"""
+        model = self.whisper_model
+        
+        def transcribe(samples: np.ndarray, prompt: str) -> str:
+            result = model.transcribe(
+                samples,
+                language=language,
+                fp16=False,
+                initial_prompt=prompt or None,
+                condition_on_previous_text=False
+            )
+            return result["text"].strip()
+        return transcribe
+    
+    def detect_voice_activity(self, audio_path: Union[str, AudioBuffer], **options) -> List[Dict[str, float]]:
+        """
+        Detect voice activity segments
+        Energy-based VAD against an adaptive noise floor on the shared
+        16 kHz buffer; options are passed to StreamingVAD
+        """
+        audio = self.load_audio(audio_path)
+        return detect_segments(audio.samples, audio.sample_rate, **options)
+    
+    def voice_activity_stream(self, **options) -> StreamingVAD:
+        """Stateful VAD for real-time pipelines: feed() 16 kHz chunks, then flush()"""
+        return StreamingVAD(**options)
+    
+    def analyze_audio_quality(self, audio_path: Union[str, AudioBuffer]) -> Dict[str, Any]:
         """Analyze audio quality"""
         features = self._extract_audio_features(audio_path)
         
@@ -152,20 +226,27 @@ class AudioProcessor:
             "snr_estimate": features.get("snr")
         }
     
-    def _extract_audio_features(self, audio_path: str) -> Dict[str, Any]:
+    def _extract_audio_features(self, audio_path: Union[str, AudioBuffer]) -> Dict[str, Any]:
         """Extract basic audio features"""
-        try:
-            import librosa
-            y, sr = librosa.load(audio_path)
-            
-            return {
-                "duration": len(y) / sr,
-                "sample_rate": sr,
-                "channels": 1 if len(y.shape) == 1 else y.shape[0],
-                "snr": float(np.mean(y) / (np.std(y) + 1e-10))
-            }
-        except ImportError:
-            return {"duration": 0.0, "sample_rate": 16000, "channels": 1, "snr": 0.0}
+        audio = self.load_audio(audio_path)
+        y = audio.samples
+        
+        # Running sums so memory-mapped audio is read once, in pieces
+        total, total_sq = 0.0, 0.0
+        for start in range(0, len(y), 1 << 22):
+            block = np.asarray(y[start:start + (1 << 22)], dtype=np.float64)
+            total += block.sum()
+            total_sq += (block * block).sum()
+        n = max(len(y), 1)
+        mean = total / n
+        std = float(np.sqrt(max(total_sq / n - mean * mean, 0.0)))
+        
+        return {
+            "duration": audio.duration,
+            "sample_rate": audio.source_rate,
+            "channels": audio.channels,
+            "snr": float(mean / (std + 1e-10))
+        }
     
     def _calculate_confidence(self, whisper_result: Dict) -> float:
         """Calculate transcription confidence"""
@@ -0,0 +1,217 @@
+"""
+Batch Transcription - Length-bucketed Whisper batches across many files
+Pools voice segments from many recordings into batches on worker processes
+LOCAL PROCESSING - Privacy-first approach
+"""
+from collections import Counter
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait, FIRST_COMPLETED
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+import bisect
+import multiprocessing
+import os
+
+import numpy as np
+
+from ..model_cache import get_model
+from .audio_io import SAMPLE_RATE
+from .vad import detect_segments
+
+# Upper bounds (seconds) of the length buckets; 30 s is Whisper's window
+BUCKETS = (2.0, 5.0, 10.0, 20.0, 30.0)
+
+# engine(segments, options) -> [{"text", "avg_logprob", "language"}] per segment
+BatchEngine = Callable[[List[np.ndarray], Dict[str, Any]], List[Dict[str, Any]]]
+
+
+def whisper_batch(segments: List[np.ndarray], options: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Decode a batch of segments in one Whisper forward pass
+    Runs in worker processes; each process loads its model once
+    """
+    import torch
+    import whisper
+
+    if options.get("threads"):
+        torch.set_num_threads(options["threads"])
+    model_size = options.get("model_size", "base")
+    model = get_model(("whisper", model_size), lambda: whisper.load_model(model_size))
+    mels = torch.stack([
+        whisper.log_mel_spectrogram(whisper.pad_or_trim(torch.from_numpy(np.asarray(segment, dtype=np.float32))),
+                                    model.dims.n_mels)
+        for segment in segments
+    ]).to(model.device)
+    results = whisper.decode(model, mels, whisper.DecodingOptions(
+        language=options.get("language"), fp16=False, without_timestamps=True
+    ))
+    return [{"text": r.text.strip(), "avg_logprob": r.avg_logprob, "language": r.language}
+            for r in results]
+
+
+def plan_spans(voiced: List[Dict[str, float]], duration: float, max_span_sec: float = 30.0,
+               pad_sec: float = 0.1, max_gap_sec: float = 1.0) -> List[Tuple[float, float]]:
+    """
+    Group voice segments into spans of at most max_span_sec
+    Neighbouring segments share a span while it fits and the pause between
+    them is at most max_gap_sec, so long silences are not transcribed;
+    longer segments are split evenly. Spans are padded slightly so word
+    edges are not clipped
+    """
+    spans: List[Tuple[float, float]] = []
+    for segment in voiced:
+        start = max(segment["start"] - pad_sec, 0.0)
+        end = min(segment["end"] + pad_sec, duration)
+        if spans and start - spans[-1][1] <= max_gap_sec and end - spans[-1][0] <= max_span_sec:
+            spans[-1] = (spans[-1][0], max(end, spans[-1][1]))
+            continue
+        pieces = int(np.ceil((end - start) / max_span_sec))
+        edges = np.linspace(start, end, pieces + 1)
+        spans.extend((float(a), float(b)) for a, b in zip(edges[:-1], edges[1:]))
+    return spans
+
+
+@dataclass
+class _FileState:
+    path: str
+    duration: float
+    features: Dict[str, Any]
+    spans: List[Tuple[float, float]]
+    results: Dict[int, Dict[str, Any]] = field(default_factory=dict)
+    failed: bool = False
+
+    @property
+    def done(self) -> bool:
+        return len(self.results) == len(self.spans)
+
+
+class BatchTranscriber:
+    """
+    Throughput-oriented transcription of many files
+
+    Files are decoded and voice-segmented one at a time in the caller's
+    process. Their voice spans go into length buckets, and a bucket is sent
+    to the worker pool as one batch when it holds batch_size spans. Every
+    clip is padded to Whisper's 30 s window, so encoding costs the same
+    for any length; bucketing pays off in decoding, which runs until the
+    longest transcript in the batch ends, so similar-length spans keep
+    short ones from waiting on long ones. Each worker process keeps its
+    own model. Results are yielded per file, as soon as all of a file's
+    spans are transcribed.
+    """
+
+    def __init__(self, processor, workers: Optional[int] = None, batch_size: int = 8,
+                 language: Optional[str] = None, use_processes: bool = True,
+                 engine: Optional[BatchEngine] = None, max_span_sec: float = 30.0,
+                 vad_options: Optional[Dict[str, Any]] = None):
+        self.processor = processor
+        self.workers = workers or max(1, (os.cpu_count() or 1) // 2)
+        self.batch_size = batch_size
+        self.use_processes = use_processes
+        self.engine = engine or whisper_batch
+        self.max_span_sec = max_span_sec
+        self.vad_options = dict(vad_options or {})
+        self.options = {
+            "language": language,
+            "model_size": processor.model_size,
+            "threads": max(1, (os.cpu_count() or 1) // self.workers),
+        }
+
+    def _executor(self) -> Executor:
+        if self.use_processes:
+            return ProcessPoolExecutor(max_workers=self.workers,
+                                       mp_context=multiprocessing.get_context("spawn"))
+        return ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="stt-batch")
+
+    def _prepare(self, path: str) -> Tuple[_FileState, List[np.ndarray]]:
+        audio = self.processor.load_audio(path)
+        voiced = detect_segments(audio.samples, audio.sample_rate, **self.vad_options)
+        spans = plan_spans(voiced, audio.duration, self.max_span_sec)
+        clips = [np.array(audio.samples[int(a * SAMPLE_RATE):int(b * SAMPLE_RATE)], dtype=np.float32)
+                 for a, b in spans]
+        state = _FileState(path, audio.duration, self.processor._extract_audio_features(audio), spans)
+        return state, clips
+
+    def _analysis(self, state: _FileState):
+        from .audio_processor import AudioAnalysis
+
+        ordered = [state.results[i] for i in range(len(state.spans))]
+        languages = Counter(r.get("language") for r in ordered if r.get("language"))
+        segments = [{"start": round(a, 3), "end": round(b, 3), "text": r["text"]}
+                    for (a, b), r in zip(state.spans, ordered)]
+        whisper_like = {"segments": [{"avg_logprob": r.get("avg_logprob", -1.0)} for r in ordered]}
+        return AudioAnalysis(
+            audio_path=state.path,
+            timestamp=datetime.now().isoformat(),
+            duration=state.duration,
+            sample_rate=state.features.get("sample_rate", SAMPLE_RATE),
+            transcription=" ".join(r["text"] for r in ordered if r["text"]),
+            language=languages.most_common(1)[0][0] if languages else "unknown",
+            confidence=self.processor._calculate_confidence(whisper_like) if ordered else 0.0,
+            speaker_count=self.processor._estimate_speakers(whisper_like),
+            audio_features={**state.features, "segments": segments}
+        )
+
+    def run(self, paths: Iterable[str]) -> Iterator[Any]:
+        """Transcribe files, yielding one AudioAnalysis per file in completion order"""
+        files: List[_FileState] = []
+        buckets: List[List[Tuple[int, int, np.ndarray]]] = [[] for _ in BUCKETS]
+        in_flight: Dict[Future, List[Tuple[int, int]]] = {}
+        max_in_flight = 2 * self.workers
+
+        def submit(bucket: List[Tuple[int, int, np.ndarray]]) -> None:
+            future = pool.submit(self.engine, [clip for _, _, clip in bucket], self.options)
+            in_flight[future] = [(f, s) for f, s, _ in bucket]
+
+        def collect(block: bool) -> Iterator[Any]:
+            if not in_flight:
+                return
+            done, _ = wait(list(in_flight), timeout=None if block else 0,
+                           return_when=FIRST_COMPLETED)
+            for future in done:
+                owners = in_flight.pop(future)
+                try:
+                    results = future.result()
+                except Exception as e:
+                    results = [{"text": "", "error": str(e)}] * len(owners)
+                    for f in {f for f, _ in owners}:
+                        if not files[f].failed:
+                            print(f"Error transcribing {files[f].path}: {e}")
+                        files[f].failed = True
+                for (f, s), result in zip(owners, results):
+                    files[f].results[s] = result
+                    if files[f].done and not files[f].failed:
+                        yield self._analysis(files[f])
+
+        pool = self._executor()
+        try:
+            for path in paths:
+                try:
+                    state, clips = self._prepare(str(path))
+                except Exception as e:
+                    print(f"Error transcribing {path}: {e}")
+                    continue
+                files.append(state)
+                file_id = len(files) - 1
+                if not clips:
+                    yield self._analysis(state)  # no speech
+                    continue
+                for span_id, clip in enumerate(clips):
+                    bucket = buckets[min(bisect.bisect_left(BUCKETS, len(clip) / SAMPLE_RATE),
+                                         len(BUCKETS) - 1)]
+                    bucket.append((file_id, span_id, clip))
+                    if len(bucket) >= self.batch_size:
+                        submit(bucket[:])
+                        bucket.clear()
+                while len(in_flight) >= max_in_flight:
+                    yield from collect(block=True)
+                yield from collect(block=False)
+
+            for bucket in buckets:
+                if bucket:
+                    submit(bucket[:])
+                    bucket.clear()
+            while in_flight:
+                yield from collect(block=True)
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
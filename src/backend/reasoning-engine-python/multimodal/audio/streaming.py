@@ -0,0 +1,242 @@
+"""
+Streaming Transcription - Low-latency speech-to-text over PCM chunk streams
+Voice-gated sliding windows transcribed on a worker thread
+LOCAL PROCESSING - Privacy-first approach
+"""
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Callable, Deque, Dict, Iterable, Iterator, List, Optional, Union
+import asyncio
+
+import numpy as np
+
+from .audio_io import SAMPLE_RATE, Resampler, _pcm_to_float
+from .vad import NoiseFloor, to_db
+
+Chunk = Union[bytes, np.ndarray]
+
+
+@dataclass
+class TranscriptSegment:
+    """Partial or final transcript of a span of the stream"""
+    text: str
+    start: float  # seconds since stream start
+    end: float
+    final: bool
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"text": self.text, "start": self.start, "end": self.end, "final": self.final}
+
+
+@dataclass
+class _Job:
+    future: Future
+    start: int  # stream sample offsets
+    end: int
+    final: bool
+
+
+class StreamingTranscriber:
+    """
+    Incremental transcription of a live PCM stream
+
+    Speech is gated by frame energy against an adaptive noise floor (or a
+    fixed RMS energy_threshold). While an utterance is open a partial
+    transcript of its current window is requested every partial_interval_sec
+    (skipped while the previous partial is still running, so latency does
+    not build up). An utterance is finalized after silence_sec of silence;
+    utterances longer than window_sec are finalized window by window, each
+    new window starting overlap_sec before the previous one ended.
+    """
+
+    def __init__(self, transcribe: Callable[[np.ndarray, str], str], sample_rate: int = SAMPLE_RATE,
+                 window_sec: float = 8.0, overlap_sec: float = 1.0,
+                 partial_interval_sec: float = 0.5, silence_sec: float = 0.4,
+                 pre_roll_sec: float = 0.2, frame_sec: float = 0.03,
+                 energy_threshold: Optional[float] = None):
+        self.transcribe = transcribe
+        self.sample_rate = sample_rate
+        self.frame = int(frame_sec * SAMPLE_RATE)
+        self.window = int(window_sec * SAMPLE_RATE)
+        self.overlap = int(overlap_sec * SAMPLE_RATE)
+        self.partial_interval = int(partial_interval_sec * SAMPLE_RATE)
+        self.silence = int(silence_sec * SAMPLE_RATE)
+        self.pre_roll = int(pre_roll_sec * SAMPLE_RATE)
+        self.energy_threshold = energy_threshold
+        self.noise_floor = NoiseFloor()
+        # One resampler for the whole stream, so chunk edges stay seamless
+        self._resampler = Resampler(sample_rate) if sample_rate != SAMPLE_RATE else None
+
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="stt-stream")
+        self._jobs: Deque[_Job] = deque()
+        self._partial: Optional[Future] = None
+        self._prompt = ""  # last final text, given to the model as context
+        self._pending = np.zeros(0, dtype=np.float32)  # samples not yet framed
+        self._recent: Deque[np.ndarray] = deque()  # pre-roll frames before speech
+        self._utterance: List[np.ndarray] = []
+        self._utterance_len = 0
+        self._utterance_start = 0
+        self._since_partial = 0
+        self._silence_run = 0
+        self._position = 0  # stream samples framed so far
+
+    # Input
+
+    def _to_samples(self, chunk: Chunk) -> np.ndarray:
+        if isinstance(chunk, (bytes, bytearray, memoryview)):
+            samples = _pcm_to_float(bytes(chunk), 2, 1)
+        else:
+            samples = np.asarray(chunk)
+            if samples.dtype == np.int16:
+                samples = samples.astype(np.float32) / 32768.0
+            samples = samples.astype(np.float32, copy=False).ravel()
+        if self._resampler is not None:
+            samples = self._resampler.feed(samples)
+        return samples
+
+    def _voiced(self, frames: np.ndarray) -> np.ndarray:
+        rms = np.sqrt((frames.astype(np.float64) ** 2).mean(axis=1))
+        if self.energy_threshold is not None:
+            return rms > self.energy_threshold
+        energy = to_db(rms)
+        return energy > self.noise_floor.update(energy, frames.size / SAMPLE_RATE)
+
+    def feed(self, chunk: Chunk) -> None:
+        """Add a chunk of PCM (int16 bytes/array or float array) to the stream"""
+        samples = np.concatenate([self._pending, self._to_samples(chunk)])
+        n_frames = len(samples) // self.frame
+        self._pending = samples[n_frames * self.frame:]
+        if n_frames == 0:
+            return
+        frames = samples[:n_frames * self.frame].reshape(n_frames, self.frame)
+        for frame, voiced in zip(frames, self._voiced(frames)):
+            self._step(frame, bool(voiced))
+
+    def _step(self, frame: np.ndarray, voiced: bool) -> None:
+        start = self._position
+        self._position += len(frame)
+        if not self._utterance:
+            if not voiced:
+                self._recent.append(frame)
+                while len(self._recent) * self.frame > self.pre_roll:
+                    self._recent.popleft()
+                return
+            # Speech onset: open an utterance including the pre-roll
+            self._utterance = list(self._recent)
+            self._utterance_len = len(self._recent) * self.frame
+            self._utterance_start = start - self._utterance_len
+            self._recent.clear()
+            self._since_partial = 0
+            self._silence_run = 0
+
+        self._utterance.append(frame)
+        self._utterance_len += len(frame)
+        self._since_partial += len(frame)
+        self._silence_run = 0 if voiced else self._silence_run + len(frame)
+
+        if self._silence_run >= self.silence:
+            self._finalize(trim=self._silence_run)
+        elif self._utterance_len >= self.window:
+            self._finalize(carry=self.overlap)
+        elif voiced and self._since_partial >= self.partial_interval:
+            # Only on speech: a partial over trailing silence adds nothing
+            self._request_partial()
+
+    # Transcription jobs
+
+    def _request_partial(self) -> None:
+        if self._partial is not None and not self._partial.done():
+            return  # model still busy; skip rather than queue stale work
+        audio = np.concatenate(self._utterance)
+        self._partial = self._executor.submit(self.transcribe, audio, self._prompt)
+        self._jobs.append(_Job(self._partial, self._utterance_start,
+                               self._utterance_start + len(audio), False))
+        self._since_partial = 0
+
+    def _finalize(self, trim: int = 0, carry: int = 0) -> None:
+        audio = np.concatenate(self._utterance)
+        if trim:
+            audio = audio[:max(len(audio) - trim + self.frame, 0)]
+        start = self._utterance_start
+
+        def run(audio=audio):
+            text = self.transcribe(audio, self._prompt)
+            if text:
+                self._prompt = text
+            return text
+
+        self._jobs.append(_Job(self._executor.submit(run), start, start + len(audio), True))
+        if carry:
+            kept = np.concatenate(self._utterance)[-carry:]
+            self._utterance = [kept]
+            self._utterance_len = len(kept)
+            self._utterance_start = self._position - len(kept)
+        else:
+            self._utterance = []
+            self._utterance_len = 0
+        self._since_partial = 0
+        self._silence_run = 0
+
+    def _segment(self, job: _Job) -> Optional[TranscriptSegment]:
+        text = job.future.result().strip()
+        if not text:
+            return None
+        return TranscriptSegment(text, round(job.start / SAMPLE_RATE, 3),
+                                 round(job.end / SAMPLE_RATE, 3), job.final)
+
+    def poll(self) -> List[TranscriptSegment]:
+        """Segments that are ready, in stream order, without blocking"""
+        ready = []
+        while self._jobs and self._jobs[0].future.done():
+            segment = self._segment(self._jobs.popleft())
+            if segment is not None:
+                ready.append(segment)
+        return ready
+
+    def _close(self) -> None:
+        """Frame the leftover samples and finalize any open utterance"""
+        if self._resampler is not None:
+            self._pending = np.concatenate([self._pending, self._resampler.flush()])
+        if len(self._pending):
+            self._step(self._pending, bool(self._voiced(self._pending[None, :])[0]))
+            self._pending = np.zeros(0, dtype=np.float32)
+        if self._utterance:
+            self._finalize(trim=self._silence_run)
+
+    def finish(self) -> Iterator[TranscriptSegment]:
+        """Close the stream and wait for the remaining segments"""
+        self._close()
+        try:
+            while self._jobs:
+                segment = self._segment(self._jobs.popleft())
+                if segment is not None:
+                    yield segment
+        finally:
+            self._executor.shutdown(wait=True)
+
+    # Drivers
+
+    def stream(self, chunks: Iterable[Chunk]) -> Iterator[TranscriptSegment]:
+        """Transcribe a synchronous chunk iterator, yielding segments as they complete"""
+        for chunk in chunks:
+            self.feed(chunk)
+            yield from self.poll()
+        yield from self.finish()
+
+    async def astream(self, chunks: AsyncIterator[Chunk]) -> AsyncIterator[TranscriptSegment]:
+        """Transcribe an async chunk iterator without blocking the event loop"""
+        async for chunk in chunks:
+            self.feed(chunk)
+            for segment in self.poll():
+                yield segment
+        self._close()
+        try:
+            while self._jobs:
+                job = self._jobs.popleft()
+                await asyncio.wrap_future(job.future)
+                segment = self._segment(job)
+                if segment is not None:
+                    yield segment
+        finally:
+            self._executor.shutdown(wait=False)
@@ -0,0 +1,165 @@
+"""
+Voice Activity Detection - Vectorized energy VAD with an adaptive noise floor
+Works on whole recordings or on chunk streams with state carried across chunks
+LOCAL PROCESSING - Privacy-first approach
+"""
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .audio_io import SAMPLE_RATE
+
+_EPS = 1e-10
+
+
+def to_db(rms: np.ndarray) -> np.ndarray:
+    """RMS amplitude -> dBFS"""
+    return 20.0 * np.log10(np.asarray(rms, dtype=np.float64) + _EPS)
+
+
+class NoiseFloor:
+    """
+    Running noise-floor estimate in dBFS
+
+    Each update takes a low percentile of the new frames' energy. The
+    floor follows drops immediately and rises over adapt_sec, so speech
+    does not drag it up. The first estimate is capped at initial_floor_db,
+    so a stream that opens with sustained sound (a tone, unbroken speech)
+    is not taken for background; louder backgrounds are learned by the
+    gradual rise. Frames are voiced when they exceed the floor by snr_db,
+    and never below min_threshold_db (digital silence)
+    """
+
+    def __init__(self, snr_db: float = 10.0, adapt_sec: float = 5.0,
+                 percentile: float = 10.0, min_threshold_db: float = -55.0,
+                 initial_floor_db: float = -30.0):
+        self.snr_db = snr_db
+        self.adapt_sec = adapt_sec
+        self.percentile = percentile
+        self.min_threshold_db = min_threshold_db
+        self.initial_floor_db = initial_floor_db
+        self.floor_db: Optional[float] = None
+
+    def update(self, energy_db: np.ndarray, duration: float) -> float:
+        """Fold in a block of frame energies; returns the voicing threshold in dBFS"""
+        if len(energy_db):
+            low = float(np.percentile(energy_db, self.percentile))
+            if self.floor_db is None:
+                self.floor_db = min(low, self.initial_floor_db)
+            elif low < self.floor_db:
+                self.floor_db = low
+            else:
+                self.floor_db += min(1.0, duration / self.adapt_sec) * (low - self.floor_db)
+        return self.threshold_db
+
+    @property
+    def threshold_db(self) -> float:
+        if self.floor_db is None:
+            return self.min_threshold_db
+        return max(self.floor_db + self.snr_db, self.min_threshold_db)
+
+
+def mask_to_runs(mask: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """(starts, ends) of True runs in a boolean mask; ends are exclusive"""
+    edges = np.diff(np.concatenate([[0], np.asarray(mask, dtype=np.int8), [0]]))
+    return np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+
+
+def bridge_runs(starts: np.ndarray, ends: np.ndarray, max_gap: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Merge runs separated by at most max_gap frames"""
+    if len(starts) < 2:
+        return starts, ends
+    keep = (starts[1:] - ends[:-1]) > max_gap
+    return starts[np.concatenate([[True], keep])], ends[np.concatenate([keep, [True]])]
+
+
+class StreamingVAD:
+    """
+    Energy VAD over a stream of 16 kHz float32 chunks
+
+    Frames of frame_sec every hop_sec are compared with an adaptive noise
+    floor. Per chunk, voiced runs come from edges of the thresholded mask.
+    Pauses up to hangover_sec are bridged and runs shorter than
+    min_speech_sec are dropped. A run still open at the end of a chunk is
+    carried into the next one, so segments can span chunk boundaries.
+    """
+
+    def __init__(self, sample_rate: int = SAMPLE_RATE, frame_sec: float = 0.025,
+                 hop_sec: float = 0.010, hangover_sec: float = 0.2,
+                 min_speech_sec: float = 0.1, noise_floor: Optional[NoiseFloor] = None):
+        self.sample_rate = sample_rate
+        self.frame_length = int(frame_sec * sample_rate)
+        self.hop_length = int(hop_sec * sample_rate)
+        self.hangover = int(round(hangover_sec / hop_sec))
+        self.min_frames = int(round(min_speech_sec / hop_sec))
+        self.noise_floor = noise_floor or NoiseFloor()
+        self._tail = np.zeros(0, dtype=np.float32)  # samples not yet fully framed
+        self._frames = 0  # frames emitted so far
+        self._open: Optional[Tuple[int, int]] = None  # voiced run that may still grow
+
+    def _frame_energy(self, samples: np.ndarray) -> np.ndarray:
+        """dBFS energy of every complete frame; keeps the remainder for the next chunk"""
+        buf = np.concatenate([self._tail, np.asarray(samples, dtype=np.float32).ravel()])
+        if len(buf) < self.frame_length:
+            self._tail = buf
+            return np.zeros(0)
+        n = 1 + (len(buf) - self.frame_length) // self.hop_length
+        squares = np.concatenate([[0.0], np.cumsum(buf.astype(np.float64) ** 2)])
+        starts = np.arange(n) * self.hop_length
+        rms = np.sqrt(np.maximum(squares[starts + self.frame_length] - squares[starts], 0.0)
+                      / self.frame_length)
+        self._tail = buf[n * self.hop_length:]
+        return to_db(rms)
+
+    def _segment(self, start: int, end: int) -> Dict[str, float]:
+        hop = self.hop_length / self.sample_rate
+        return {"start": round(start * hop, 3), "end": round(end * hop, 3)}
+
+    def _close(self, starts: np.ndarray, ends: np.ndarray) -> List[Dict[str, float]]:
+        keep = (ends - starts) >= self.min_frames
+        return [self._segment(int(s), int(e)) for s, e in zip(starts[keep], ends[keep])]
+
+    def feed(self, samples: np.ndarray) -> List[Dict[str, float]]:
+        """Process a chunk; returns segments that can no longer change"""
+        energy = self._frame_energy(samples)
+        if not len(energy):
+            return []
+        threshold = self.noise_floor.update(energy, len(energy) * self.hop_length / self.sample_rate)
+        starts, ends = mask_to_runs(energy > threshold)
+        base, self._frames = self._frames, self._frames + len(energy)
+        starts, ends = starts + base, ends + base
+        if self._open is not None:
+            starts = np.concatenate([[self._open[0]], starts])
+            ends = np.concatenate([[self._open[1]], ends])
+        starts, ends = bridge_runs(starts, ends, self.hangover)
+
+        # The last run stays open while a continuation could still bridge to it
+        self._open = None
+        if len(starts) and self._frames - ends[-1] <= self.hangover:
+            self._open = (int(starts[-1]), int(ends[-1]))
+            starts, ends = starts[:-1], ends[:-1]
+        return self._close(starts, ends)
+
+    def flush(self) -> List[Dict[str, float]]:
+        """End of stream: close any open segment"""
+        if self._open is None:
+            return []
+        start, end = self._open
+        self._open = None
+        return self._close(np.array([start]), np.array([end]))
+
+
+def detect_segments(samples: np.ndarray, sample_rate: int = SAMPLE_RATE, block_sec: float = 10.0,
+                    **options) -> List[Dict[str, float]]:
+    """
+    Voice segments of a whole recording
+    Runs the streaming detector over blocks so the noise floor adapts over
+    time and memory-mapped audio is read in pieces
+    """
+    vad = StreamingVAD(sample_rate, **options)
+    block = int(block_sec * sample_rate)
+    segments = []
+    for start in range(0, len(samples), block):
+        segments.extend(vad.feed(samples[start:start + block]))
+    segments.extend(vad.flush())
+    return segments
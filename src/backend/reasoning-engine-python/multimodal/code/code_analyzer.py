@@ -147,7 +147,7 @@ class CodeAnalyzer:
             })
         
         # Extract imports
-        import_pattern = r'import\s+.*?from\s+['"]([^'"]+)['"]'
+        import_pattern = r"""import\s+.*?from\s+['"]([^'"]+)['"]"""
         imports = [match.group(1) for match in re.finditer(import_pattern, code)]
         
         loc = len([line for line in code.split('\n') if line.strip()])
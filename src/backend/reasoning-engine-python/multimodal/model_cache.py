@@ -0,0 +1,46 @@
+"""
+Model Cache - Process-wide cache for local models
+Loads each model once and shares it across analyzer and engine instances
+LOCAL PROCESSING - Privacy-first approach
+"""
+import threading
+from typing import Any, Callable, Dict, Hashable, List
+
+_models: Dict[Hashable, Any] = {}
+_locks: Dict[Hashable, threading.Lock] = {}
+_registry_lock = threading.Lock()
+
+
+def get_model(key: Hashable, loader: Callable[[], Any]) -> Any:
+    """
+    Return the cached model for key, loading it on first use
+    Concurrent callers for the same key wait for a single load
+    """
+    try:
+        return _models[key]
+    except KeyError:
+        pass
+
+    with _registry_lock:
+        lock = _locks.setdefault(key, threading.Lock())
+    with lock:
+        if key not in _models:
+            _models[key] = loader()
+        return _models[key]
+
+
+def is_loaded(key: Hashable) -> bool:
+    """Check whether a model is already resident"""
+    return key in _models
+
+
+def cached_models() -> List[Hashable]:
+    """Keys of all resident models"""
+    return list(_models)
+
+
+def clear_model_cache() -> None:
+    """Drop all cached models (e.g. to free memory)"""
+    with _registry_lock:
+        _models.clear()
+        _locks.clear()
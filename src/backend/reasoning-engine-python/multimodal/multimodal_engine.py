@@ -3,17 +3,24 @@ Multi-Modal Reasoning Engine
 Unified interface for vision, audio, document, and code analysis
 LOCAL PROCESSING - Privacy-first approach
 """
-from dataclasses import dataclass
-from typing import List, Dict, Any, Optional, Union
+from dataclasses import dataclass, replace
+from typing import Callable, Iterable, Iterator, List, Dict, Any, Optional, Union
 from pathlib import Path
 from datetime import datetime
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait, FIRST_COMPLETED
 import json
+import multiprocessing
+import os
+import queue
+import threading
 
 # Import all modality analyzers
-from .vision.vision_analyzer import VisionAnalyzer, VisionAnalysis
+from .vision.vision_analyzer import VisionAnalyzer, ImageAnalysis as VisionAnalysis
 from .audio.audio_processor import AudioProcessor, AudioAnalysis
 from .documents.document_parser import DocumentParser, DocumentAnalysis
 from .code.code_analyzer import CodeAnalyzer, CodeAnalysis
+from .analysis_cache import AnalysisCache
+from learning.adaptive_profiler import profiled
 
 @dataclass
 class MultiModalAnalysis:
@@ -28,18 +35,58 @@ class MultiModalAnalysis:
     analysis_timestamp: datetime = None
     privacy_compliant: bool = True
 
+# Analyzer class per modality; instances are created on first use
+ANALYZER_FACTORIES = {
+    'vision': VisionAnalyzer,
+    'audio': AudioProcessor,
+    'document': DocumentParser,
+    'code': CodeAnalyzer,
+}
+
+# Bump when an analyzer's output changes to invalidate cached analyses
+ANALYZER_VERSIONS = {
+    'vision': '1',
+    'audio': '3',
+    'document': '1',
+    'code': '1',
+}
+
+# Modalities analyzed in worker processes by the directory pipeline;
+# audio stays in threads so Whisper weights are loaded once
+CPU_BOUND_MODALITIES = ('vision', 'document', 'code')
+
+# Progress callback: (completed, discovered so far, path just finished)
+ProgressCallback = Callable[[int, int, Path], None]
+
+_DISCOVERY_DONE = object()
+_worker_engine = None
+
+
+def _analyze_in_worker(file_path: Path) -> 'MultiModalAnalysis':
+    """Process-pool entry point; each worker keeps its own engine"""
+    global _worker_engine
+    if _worker_engine is None:
+        _worker_engine = MultiModalEngine()
+    return _worker_engine.analyze(file_path)
+
 class MultiModalEngine:
     """
     Unified Multi-Modal Reasoning Engine
     Processes vision, audio, documents, and code
     ALL processing stays LOCAL - NEVER sent externally
+    
+    Analyzers are created lazily per modality; their models live in the
+    process-wide model cache, so engine instances share loaded weights
     """
     
-    def __init__(self):
-        self.vision_analyzer = VisionAnalyzer()
-        self.audio_processor = AudioProcessor()
-        self.document_parser = DocumentParser()
-        self.code_analyzer = CodeAnalyzer()
+    def __init__(self, analysis_cache: Optional[AnalysisCache] = None):
+        """
+        analysis_cache: optional persistent cache (e.g. a DuckDB file next
+        to the LocalStorage database) for results of unchanged files
+        """
+        self.analysis_cache = analysis_cache
+        self._analyzers: Dict[str, Any] = {}
+        self._analyzer_lock = threading.Lock()
         
         self.supported_extensions = {
             'vision': ['.jpg', '.jpeg', '.png', '.bmp', '.gif', '.webp'],
@@ -48,10 +95,52 @@ class MultiModalEngine:
             'code': ['.py', '.js', '.ts', '.java', '.cpp', '.go', '.rs']
         }
     
-    def analyze(self, file_path: Union[str, Path]) -> MultiModalAnalysis:
+    def get_analyzer(self, modality: str) -> Any:
+        """Return the analyzer for a modality, creating it on first use"""
+        analyzer = self._analyzers.get(modality)
+        if analyzer is None:
+            if modality not in ANALYZER_FACTORIES:
+                raise ValueError(f"Unsupported modality: {modality}")
+            with self._analyzer_lock:
+                analyzer = self._analyzers.get(modality)
+                if analyzer is None:
+                    analyzer = self._analyzers[modality] = ANALYZER_FACTORIES[modality]()
+        return analyzer
+    
+    @property
+    def vision_analyzer(self) -> VisionAnalyzer:
+        return self.get_analyzer('vision')
+    
+    @property
+    def audio_processor(self) -> AudioProcessor:
+        return self.get_analyzer('audio')
+    
+    @property
+    def document_parser(self) -> DocumentParser:
+        return self.get_analyzer('document')
+    
+    @property
+    def code_analyzer(self) -> CodeAnalyzer:
+        return self.get_analyzer('code')
+    
+    def warmup(self, modalities: Optional[Iterable[str]] = None) -> Dict[str, bool]:
+        """
+        Preload analyzers and their models (all modalities by default)
+        Returns whether each requested modality is ready
+        """
+        status = {}
+        for modality in (modalities if modalities is not None else ANALYZER_FACTORIES):
+            analyzer = self.get_analyzer(modality)
+            warmup = getattr(analyzer, 'warmup', None)
+            status[modality] = warmup() if warmup is not None else True
+        return status
+    
+    @profiled("multimodal.analyze")
+    def analyze(self, file_path: Union[str, Path], use_cache: bool = True) -> MultiModalAnalysis:
         """
         Analyze any supported file type
         Automatically detects modality and processes accordingly
+        Unchanged files are served from the analysis cache when configured
         """
         file_path = Path(file_path)
         
@@ -61,6 +150,12 @@ class MultiModalEngine:
         file_ext = file_path.suffix.lower()
         modality = self._detect_modality(file_ext)
         
+        cache_key = None
+        if use_cache and self.analysis_cache is not None and modality != 'unknown':
+            cache_key, cached = self._lookup_cache(file_path, modality)
+            if cached is not None:
+                return cached
+        
         result = MultiModalAnalysis(
             input_type=modality,
             input_path=file_path,
@@ -69,9 +164,9 @@ class MultiModalEngine:
         )
         
         if modality == 'vision':
-            result.vision_analysis = self.vision_analyzer.analyze_image(file_path)
+            result.vision_analysis = self.vision_analyzer.analyze_image(str(file_path))
         elif modality == 'audio':
-            result.audio_analysis = self.audio_processor.process_audio(file_path)
+            result.audio_analysis = self.audio_processor.transcribe_audio(str(file_path))
         elif modality == 'document':
             result.document_analysis = self.document_parser.parse_document(file_path)
         elif modality == 'code':
@@ -82,8 +177,29 @@ class MultiModalEngine:
         # Generate cross-modal insights
         result.cross_modal_insights = self._generate_cross_modal_insights(result)
         
+        if cache_key is not None:
+            self.analysis_cache.put(cache_key, result)
         return result
     
+    def _cache_options(self, modality: str) -> Dict[str, Any]:
+        """Analyzer settings that change results for the same content"""
+        if modality == 'audio':
+            return {'model_size': self.audio_processor.model_size}
+        if modality == 'vision':
+            return {'ocr': self.vision_analyzer.ocr_available}
+        return {}
+    
+    def _lookup_cache(self, file_path: Path, modality: str):
+        """Return (cache key, cached analysis rebound to file_path or None)"""
+        cache_key = self.analysis_cache.key_for(
+            file_path, modality, ANALYZER_VERSIONS[modality], self._cache_options(modality)
+        )
+        cached = self.analysis_cache.get(cache_key)
+        if cached is not None and cached.input_path != file_path:
+            # Same content at another path
+            cached = replace(cached, input_path=file_path)
+        return cache_key, cached
+    
     def _detect_modality(self, file_ext: str) -> str:
         """Detect file modality from extension"""
         for modality, extensions in self.supported_extensions.items():
@@ -112,8 +228,8 @@ class MultiModalEngine:
             insights['confidence'] = analysis.audio_analysis.confidence
             insights['content_summary'] = f"Audio: {analysis.audio_analysis.transcription[:100]}..."
             insights['metadata'] = {
-                'duration': analysis.audio_analysis.duration_seconds,
-                'voice_detected': analysis.audio_analysis.voice_detected
+                'duration': analysis.audio_analysis.duration,
+                'voice_detected': bool(analysis.audio_analysis.transcription.strip())
             }
         
         elif analysis.document_analysis:
@@ -134,10 +250,23 @@ class MultiModalEngine:
         
         return insights
     
-    def analyze_directory(self, directory_path: Union[str, Path]) -> List[MultiModalAnalysis]:
-        """Analyze all supported files in a directory"""
+    @profiled("multimodal.analyze_directory")
+    def analyze_directory(self, directory_path: Union[str, Path], parallel: bool = False,
+                          batch_audio: bool = True, audio_options: Optional[Dict[str, Any]] = None,
+                          **pipeline_options) -> List[MultiModalAnalysis]:
+        """
+        Analyze all supported files in a directory
+        With parallel=True, runs iter_directory and returns results in completion order.
+        Otherwise audio files are transcribed together with analyze_audio_batch
+        after the other files, with audio_options passed to transcribe_many
+        (batch_audio=False analyzes them one by one)
+        """
+        if parallel:
+            return list(self.iter_directory(directory_path, **pipeline_options))
+        
         directory_path = Path(directory_path)
         results = []
+        audio_files = []
         
         if not directory_path.is_dir():
             raise ValueError(f"Not a directory: {directory_path}")
@@ -145,15 +274,190 @@ class MultiModalEngine:
         for file_path in directory_path.rglob('*'):
             if file_path.is_file():
                 file_ext = file_path.suffix.lower()
-                if self._detect_modality(file_ext) != 'unknown':
+                modality = self._detect_modality(file_ext)
+                if modality == 'audio' and batch_audio and self.audio_processor.stt_available:
+                    audio_files.append(file_path)
+                elif modality != 'unknown':
                     try:
                         analysis = self.analyze(file_path)
                         results.append(analysis)
                     except Exception as e:
                         print(f"Error analyzing {file_path}: {e}")
         
+        if audio_files:
+            results.extend(self.analyze_audio_batch(audio_files, **(audio_options or {})))
         return results
     
+    def analyze_audio_batch(self, paths: Iterable[Union[str, Path]],
+                            **transcribe_options) -> Iterator[MultiModalAnalysis]:
+        """
+        Transcribe many audio files through AudioProcessor.transcribe_many
+        Cached files are served first; the rest are yielded as they finish
+        """
+        pending: Dict[str, Any] = {}  # path -> cache key
+        for file_path in map(Path, paths):
+            cache_key = None
+            if self.analysis_cache is not None:
+                try:
+                    cache_key, cached = self._lookup_cache(file_path, 'audio')
+                except Exception as e:  # unreadable file, corrupt cache entry
+                    print(f"Error analyzing {file_path}: {e}")
+                    continue
+                if cached is not None:
+                    yield cached
+                    continue
+            pending[str(file_path)] = cache_key
+        if not pending:
+            return
+        
+        for audio_analysis in self.audio_processor.transcribe_many(list(pending), **transcribe_options):
+            file_path = Path(audio_analysis.audio_path)
+            result = MultiModalAnalysis(
+                input_type='audio',
+                input_path=file_path,
+                audio_analysis=audio_analysis,
+                analysis_timestamp=datetime.now(),
+                privacy_compliant=True
+            )
+            result.cross_modal_insights = self._generate_cross_modal_insights(result)
+            cache_key = pending.get(audio_analysis.audio_path)
+            if cache_key is not None:
+                try:
+                    self.analysis_cache.put(cache_key, result)
+                except Exception as e:
+                    print(f"Error caching {file_path}: {e}")
+            yield result
+    
+    def iter_directory(self, directory_path: Union[str, Path],
+                       max_workers: Optional[int] = None,
+                       max_in_flight: int = 64,
+                       progress: Optional[ProgressCallback] = None,
+                       use_processes: bool = True) -> Iterator[MultiModalAnalysis]:
+        """
+        Pipelined directory analysis, yielding results in completion order
+        
+        A discovery thread walks the tree into a queue; files are dispatched
+        to a process pool for CPU_BOUND_MODALITIES (when use_processes is
+        set) and a thread pool for the rest. The pools split one budget of
+        max_workers, the thread pool taking one modality's share. Cache
+        lookups (content hashing) run on their own threads ahead of
+        analysis. At most max_in_flight files are queued or running at once
+        """
+        directory_path = Path(directory_path)
+        if not directory_path.is_dir():
+            raise ValueError(f"Not a directory: {directory_path}")
+        
+        workers = max_workers or os.cpu_count() or 1
+        thread_workers = workers
+        if use_processes:
+            thread_workers = max(1, workers // (len(CPU_BOUND_MODALITIES) + 1))
+        process_workers = max(1, workers - thread_workers)
+        found: "queue.Queue" = queue.Queue()
+        # A slot is taken when a file is discovered and returned when it is done
+        slots = threading.BoundedSemaphore(max_in_flight)
+        stop = threading.Event()
+        counts = {'discovered': 0}
+        
+        def claim() -> bool:
+            while not stop.is_set():
+                if slots.acquire(timeout=0.1):
+                    return True
+            return False
+        
+        def discover() -> None:
+            try:
+                for file_path in directory_path.rglob('*'):
+                    if stop.is_set():
+                        return
+                    if file_path.is_file():
+                        modality = self._detect_modality(file_path.suffix.lower())
+                        if modality != 'unknown':
+                            if not claim():
+                                return
+                            counts['discovered'] += 1
+                            found.put((file_path, modality))
+            finally:
+                found.put(_DISCOVERY_DONE)
+        
+        pools: Dict[str, Executor] = {}
+        cache = self.analysis_cache
+        
+        def submit(file_path: Path, modality: str) -> Future:
+            if use_processes and modality in CPU_BOUND_MODALITIES:
+                if 'process' not in pools:
+                    pools['process'] = ProcessPoolExecutor(
+                        max_workers=process_workers, mp_context=multiprocessing.get_context("spawn")
+                    )
+                return pools['process'].submit(_analyze_in_worker, file_path)
+            if 'thread' not in pools:
+                pools['thread'] = ThreadPoolExecutor(max_workers=thread_workers, thread_name_prefix="mm-worker")
+            return pools['thread'].submit(self.analyze, file_path, use_cache=False)
+        
+        discoverer = threading.Thread(target=discover, name="mm-discovery", daemon=True)
+        discoverer.start()
+        in_flight: Dict[Future, Any] = {}  # future -> (path, modality if a lookup, cache key)
+        discovering = True
+        completed = 0
+        try:
+            while discovering or in_flight:
+                while discovering:
+                    try:
+                        item = found.get(block=not in_flight, timeout=None)
+                    except queue.Empty:
+                        break
+                    if item is _DISCOVERY_DONE:
+                        discovering = False
+                        break
+                    file_path, modality = item
+                    if cache is not None:
+                        if 'lookup' not in pools:
+                            pools['lookup'] = ThreadPoolExecutor(max_workers=workers,
+                                                                 thread_name_prefix="mm-lookup")
+                        lookup = pools['lookup'].submit(self._lookup_cache, file_path, modality)
+                        in_flight[lookup] = (file_path, modality, None)
+                    else:
+                        in_flight[submit(file_path, modality)] = (file_path, None, None)
+                if not in_flight:
+                    continue
+                
+                done, _ = wait(list(in_flight), timeout=0.05 if discovering else None,
+                               return_when=FIRST_COMPLETED)
+                for future in done:
+                    file_path, modality, cache_key = in_flight.pop(future)
+                    result, error = None, None
+                    if modality is not None:
+                        # Cache lookup finished: serve the hit or start the analysis
+                        try:
+                            cache_key, result = future.result()
+                        except Exception as e:  # unreadable file, corrupt cache entry
+                            error = e
+                        if result is None and error is None:
+                            in_flight[submit(file_path, modality)] = (file_path, None, cache_key)
+                            continue
+                    else:
+                        try:
+                            result = future.result()
+                        except Exception as e:
+                            error = e
+                        if error is None and cache_key is not None:
+                            try:
+                                cache.put(cache_key, result)
+                            except Exception as e:
+                                print(f"Error caching {file_path}: {e}")
+                    slots.release()
+                    completed += 1
+                    if progress is not None:
+                        progress(completed, counts['discovered'], file_path)
+                    if error is not None:
+                        print(f"Error analyzing {file_path}: {error}")
+                        continue
+                    yield result
+        finally:
+            stop.set()
+            for pool in pools.values():
+                pool.shutdown(wait=True, cancel_futures=True)
+            discoverer.join()
+    
     def generate_report(self, analysis: MultiModalAnalysis) -> str:
         """Generate human-readable report"""
         report = []
@@ -183,8 +487,8 @@ class MultiModalEngine:
         elif analysis.audio_analysis:
             report.append("AUDIO ANALYSIS:")
             a = analysis.audio_analysis
-            report.append(f"  Duration: {a.duration_seconds:.2f}s")
-            report.append(f"  Voice Detected: {a.voice_detected}")
+            report.append(f"  Duration: {a.duration:.2f}s")
+            report.append(f"  Voice Detected: {bool(a.transcription.strip())}")
             report.append(f"  Transcription: {a.transcription[:200]}...")
         
         elif analysis.document_analysis:
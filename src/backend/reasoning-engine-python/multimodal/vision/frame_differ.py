@@ -0,0 +1,136 @@
+"""
+Frame Differ - Incremental change detection for screenshot streams
+Finds which regions changed between consecutive frames
+LOCAL PROCESSING - Privacy-first approach
+"""
+from dataclasses import dataclass
+from typing import Any, List, Optional, Tuple
+
+import numpy as np
+
+Box = Tuple[int, int, int, int]  # x, y, width, height
+
+
+@dataclass
+class FrameDiff:
+    """Changes between a frame and its predecessor"""
+    boxes: List[Box]  # merged changed regions, in pixels
+    tile_mask: np.ndarray  # tiles_y x tiles_x, True where changed
+    changed_fraction: float  # share of tiles that changed
+    keyframe: bool  # no usable previous frame; everything is dirty
+
+    @property
+    def changed(self) -> bool:
+        return self.keyframe or bool(self.boxes)
+
+
+def boxes_intersect(a: Box, b: Box) -> bool:
+    """Check whether two (x, y, w, h) boxes overlap"""
+    return a[0] < b[0] + b[2] and b[0] < a[0] + a[2] and a[1] < b[1] + b[3] and b[1] < a[1] + a[3]
+
+
+def union_box(a: Box, b: Box) -> Box:
+    """Smallest box covering both boxes"""
+    x, y = min(a[0], b[0]), min(a[1], b[1])
+    return (x, y, max(a[0] + a[2], b[0] + b[2]) - x, max(a[1] + a[3], b[1] + b[3]) - y)
+
+
+def grow_boxes(boxes: List[Box], others: List[Box]) -> List[Box]:
+    """
+    Grow boxes until every other box they touch lies inside them
+    Boxes that come to overlap are merged, so the result is disjoint
+    """
+    grown: List[Box] = []
+    for box in boxes:
+        while True:
+            hits = [o for o in others if boxes_intersect(box, o) and union_box(box, o) != box]
+            hits += [g for g in grown if boxes_intersect(box, g)]
+            if not hits:
+                break
+            grown = [g for g in grown if g not in hits]
+            for other in hits:
+                box = union_box(box, other)
+        grown.append(box)
+    return grown
+
+
+def merge_tile_mask(mask: np.ndarray, tile_size: int, width: int, height: int) -> List[Box]:
+    """Pixel bounding boxes of 4-connected components of a tile mask"""
+    ts = tile_size
+    seen = np.zeros_like(mask)
+    boxes = []
+    for ty, tx in zip(*np.nonzero(mask)):
+        if seen[ty, tx]:
+            continue
+        seen[ty, tx] = True
+        stack = [(ty, tx)]
+        y0, y1, x0, x1 = ty, ty, tx, tx
+        while stack:
+            cy, cx = stack.pop()
+            y0, y1, x0, x1 = min(y0, cy), max(y1, cy), min(x0, cx), max(x1, cx)
+            for ny, nx in ((cy - 1, cx), (cy + 1, cx), (cy, cx - 1), (cy, cx + 1)):
+                if 0 <= ny < mask.shape[0] and 0 <= nx < mask.shape[1] \
+                        and mask[ny, nx] and not seen[ny, nx]:
+                    seen[ny, nx] = True
+                    stack.append((ny, nx))
+        x, y = int(x0 * ts), int(y0 * ts)
+        boxes.append((x, y, int(min((x1 + 1) * ts, width)) - x, int(min((y1 + 1) * ts, height)) - y))
+    return boxes
+
+
+class FrameDiffer:
+    """
+    Stateful tiled frame differ
+
+    Keeps the previous frame in memory. A tile is dirty when any of its
+    pixels changed by more than `threshold` in any channel; 4-connected
+    dirty tiles are merged into bounding boxes. Frames are diffed one row
+    of tiles at a time. The last analysis of the stream is kept alongside
+    so callers can reuse unchanged results.
+    """
+
+    def __init__(self, tile_size: int = 32, threshold: int = 12):
+        self.tile_size = tile_size
+        self.threshold = threshold
+        self.previous: Optional[np.ndarray] = None
+        self.last_analysis: Optional[Any] = None
+
+    def reset(self) -> None:
+        """Forget the previous frame; the next frame is a keyframe"""
+        self.previous = None
+        self.last_analysis = None
+
+    def _grid(self, shape: Tuple[int, ...]) -> Tuple[int, int]:
+        ts = self.tile_size
+        return -(-shape[0] // ts), -(-shape[1] // ts)
+
+    def update(self, frame: np.ndarray) -> FrameDiff:
+        """Diff a frame against the previous one and make it the new reference"""
+        frame = np.asarray(frame)
+        tiles_y, tiles_x = self._grid(frame.shape)
+        previous, self.previous = self.previous, frame.copy()
+
+        if previous is None or previous.shape != frame.shape:
+            self.last_analysis = None
+            h, w = frame.shape[:2]
+            return FrameDiff([(0, 0, w, h)], np.ones((tiles_y, tiles_x), dtype=bool), 1.0, True)
+
+        mask = self._changed_tiles(previous, frame, tiles_y, tiles_x)
+        boxes = merge_tile_mask(mask, self.tile_size, frame.shape[1], frame.shape[0])
+        return FrameDiff(boxes, mask, float(mask.mean()) if mask.size else 0.0, False)
+
+    def _changed_tiles(self, previous: np.ndarray, frame: np.ndarray,
+                       tiles_y: int, tiles_x: int) -> np.ndarray:
+        ts = self.tile_size
+        mask = np.zeros((tiles_y, tiles_x), dtype=bool)
+        columns = np.zeros(tiles_x * ts, dtype=bool)
+        for ty in range(tiles_y):
+            a, b = frame[ty * ts:(ty + 1) * ts], previous[ty * ts:(ty + 1) * ts]
+            if np.array_equal(a, b):
+                continue
+            diff = np.maximum(a, b) - np.minimum(a, b)  # |a - b| without widening
+            if diff.ndim == 3:
+                diff = diff.max(axis=2)
+            columns[:diff.shape[1]] = (diff > self.threshold).any(axis=0)
+            mask[ty] = columns.reshape(tiles_x, ts).any(axis=1)
+        return mask
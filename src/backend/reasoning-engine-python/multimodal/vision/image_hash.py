@@ -0,0 +1,192 @@
+"""
+Image Hash - Perceptual hashing and Hamming-distance lookup
+Deduplicates screenshots and finds previously seen page states
+LOCAL PROCESSING - Privacy-first approach
+"""
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+import json
+import os
+
+import numpy as np
+from PIL import Image
+
+
+def _gray_thumbnail(img_array: np.ndarray, width: int, height: int) -> np.ndarray:
+    """Box-filtered grayscale thumbnail as float64"""
+    img_array = np.asarray(img_array)
+    if img_array.ndim == 3:
+        img_array = img_array[:, :, :3].astype(np.float64) @ np.array([0.299, 0.587, 0.114])
+    img = Image.fromarray(np.clip(img_array, 0, 255).astype(np.uint8))
+    return np.asarray(img.resize((width, height), Image.BOX), dtype=np.float64)
+
+
+def _bits_to_int(bits: np.ndarray) -> int:
+    return int.from_bytes(np.packbits(bits.ravel()).tobytes(), 'big')
+
+
+def dhash(img_array: np.ndarray) -> int:
+    """64-bit difference hash: horizontal gradient signs of a 9x8 thumbnail"""
+    small = _gray_thumbnail(img_array, 9, 8)
+    # A one-level margin keeps flat screenshot areas from flipping on noise
+    return _bits_to_int(small[:, 1:] > small[:, :-1] + 1.0)
+
+
+def _dct_matrix(n: int) -> np.ndarray:
+    k = np.arange(n)[:, None]
+    m = np.cos(np.pi * (2 * np.arange(n)[None, :] + 1) * k / (2 * n))
+    m[0] *= 1 / np.sqrt(2)
+    return m * np.sqrt(2 / n)
+
+
+_DCT32 = _dct_matrix(32)
+
+
+def phash(img_array: np.ndarray) -> int:
+    """64-bit perceptual hash: low-frequency DCT signs of a 32x32 thumbnail"""
+    small = _gray_thumbnail(img_array, 32, 32)
+    low = (_DCT32 @ small @ _DCT32.T)[:8, :8]
+    median = np.median(low.ravel()[1:])  # exclude the DC term
+    return _bits_to_int(low > median)
+
+
+def hamming(a: int, b: int) -> int:
+    """Number of differing bits"""
+    return bin(a ^ b).count('1')
+
+
+class BKTree:
+    """
+    Burkhard-Keller tree over 64-bit hashes with Hamming distance
+
+    Each node holds one hash and every value added under it; children
+    are keyed by their distance to the parent. Nodes are stored flat in
+    creation order so the tree can be saved and reloaded without
+    recomputing distances.
+    """
+
+    def __init__(self):
+        self.hashes: List[int] = []
+        self.values: List[List[Any]] = []
+        self.children: List[Dict[int, int]] = []
+        self._parents: List[Tuple[int, int]] = []  # (parent node, distance); root is (-1, 0)
+
+    def __len__(self) -> int:
+        return len(self.hashes)
+
+    def _new_node(self, h: int, value: Any, parent: int, distance: int) -> int:
+        self.hashes.append(h)
+        self.values.append([value])
+        self.children.append({})
+        self._parents.append((parent, distance))
+        if parent >= 0:
+            self.children[parent][distance] = len(self.hashes) - 1
+        return len(self.hashes) - 1
+
+    def add(self, h: int, value: Any = None) -> None:
+        """Insert a hash; identical hashes share one node"""
+        if not self.hashes:
+            self._new_node(h, value, -1, 0)
+            return
+        node = 0
+        while True:
+            d = hamming(h, self.hashes[node])
+            if d == 0:
+                self.values[node].append(value)
+                return
+            child = self.children[node].get(d)
+            if child is None:
+                self._new_node(h, value, node, d)
+                return
+            node = child
+
+    def query(self, h: int, max_distance: int) -> List[Tuple[int, int, Any]]:
+        """All (distance, hash, value) within max_distance, nearest first"""
+        if not self.hashes:
+            return []
+        found = []
+        stack = [0]
+        while stack:
+            node = stack.pop()
+            d = hamming(h, self.hashes[node])
+            if d <= max_distance:
+                found.extend((d, self.hashes[node], value) for value in self.values[node])
+            # Triangle inequality: only children at distance d +/- max_distance can match
+            for edge, child in self.children[node].items():
+                if d - max_distance <= edge <= d + max_distance:
+                    stack.append(child)
+        found.sort(key=lambda item: (item[0], item[1]))
+        return found
+
+    def save(self, path: Union[str, Path]) -> None:
+        """Persist the tree as JSON (values must be JSON-serializable)"""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        data = {
+            'nodes': [
+                [format(h, '016x'), parent, distance, values]
+                for h, (parent, distance), values in zip(self.hashes, self._parents, self.values)
+            ]
+        }
+        tmp = path.with_suffix(path.suffix + '.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(data, f)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> 'BKTree':
+        """Restore a tree saved with save()"""
+        tree = cls()
+        with open(path) as f:
+            data = json.load(f)
+        for h, parent, distance, values in data['nodes']:
+            node = tree._new_node(int(h, 16), None, parent, distance)
+            tree.values[node] = values
+        return tree
+
+
+class ScreenshotIndex:
+    """
+    Perceptual-hash index of screenshots for dedup and "seen before" lookup
+    Stores only hashes and caller-provided values - NEVER image data
+    """
+
+    METHODS = {'phash': phash, 'dhash': dhash}
+
+    def __init__(self, path: Optional[Union[str, Path]] = None, method: str = 'phash',
+                 max_distance: int = 6):
+        if method not in self.METHODS:
+            raise ValueError(f"Unknown hash method: {method}")
+        self.path = Path(path) if path else None
+        self.method = method
+        self.max_distance = max_distance
+        self.tree = BKTree.load(self.path) if self.path and self.path.exists() else BKTree()
+
+    def hash(self, img_array: np.ndarray) -> int:
+        return self.METHODS[self.method](img_array)
+
+    def add(self, img_array: np.ndarray, value: Any = None) -> int:
+        """Index a screenshot; returns its hash"""
+        h = self.hash(img_array)
+        self.tree.add(h, value)
+        return h
+
+    def lookup(self, img_array: np.ndarray,
+               max_distance: Optional[int] = None) -> List[Tuple[int, int, Any]]:
+        """Previously indexed screenshots similar to this one, nearest first"""
+        limit = self.max_distance if max_distance is None else max_distance
+        return self.tree.query(self.hash(img_array), limit)
+
+    def add_if_new(self, img_array: np.ndarray, value: Any = None) -> Optional[Tuple[int, int, Any]]:
+        """Return the nearest near-duplicate, or index the screenshot and return None"""
+        h = self.hash(img_array)
+        matches = self.tree.query(h, self.max_distance)
+        if matches:
+            return matches[0]
+        self.tree.add(h, value)
+        return None
+
+    def save(self) -> None:
+        if self.path is None:
+            raise ValueError("ScreenshotIndex has no path to save to")
+        self.tree.save(self.path)
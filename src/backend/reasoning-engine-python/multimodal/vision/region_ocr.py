@@ -0,0 +1,148 @@
+"""
+Region OCR - Batched, region-scoped text extraction with a tile cache
+Finds text-like regions and OCRs only those, in a reusable process pool
+LOCAL PROCESSING - Privacy-first approach
+"""
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, List, Optional, Sequence, Tuple
+import hashlib
+import multiprocessing
+import threading
+
+import numpy as np
+
+from .frame_differ import Box, merge_tile_mask
+
+TextRegion = Tuple[Box, str]
+
+
+def tesseract_ocr(crop: np.ndarray, config: str = "") -> str:
+    """Default OCR engine (local Tesseract); runs inside pool workers"""
+    import pytesseract
+    from PIL import Image
+    return pytesseract.image_to_string(Image.fromarray(crop), config=config).strip()
+
+
+def _run_engine(args) -> str:
+    engine, crop, config = args
+    return engine(crop, config)
+
+
+def detect_text_regions(img_array: np.ndarray, block: int = 16, edge_threshold: int = 40,
+                        density: float = 0.08, padding: int = 4) -> List[Box]:
+    """
+    Text-like regions from horizontal edge density
+    Blocks dense in strong horizontal gradients (glyph strokes) are merged
+    into boxes; flat areas and smooth images are skipped
+    """
+    img_array = np.asarray(img_array)
+    gray = img_array[:, :, :3].mean(axis=2) if img_array.ndim == 3 else img_array.astype(np.float64)
+    h, w = gray.shape
+    edges = np.zeros((h, w), dtype=bool)
+    edges[:, 1:] = np.abs(np.diff(gray, axis=1)) > edge_threshold
+
+    tiles_y, tiles_x = -(-h // block), -(-w // block)
+    padded = np.zeros((tiles_y * block, tiles_x * block), dtype=bool)
+    padded[:h, :w] = edges
+    mask = padded.reshape(tiles_y, block, tiles_x, block).mean(axis=(1, 3)) > density
+
+    boxes = []
+    for x, y, bw, bh in merge_tile_mask(mask, block, w, h):
+        x0, y0 = max(x - padding, 0), max(y - padding, 0)
+        boxes.append((x0, y0, min(x + bw + padding, w) - x0, min(y + bh + padding, h) - y0))
+    return boxes
+
+
+def _tile_key(crop: np.ndarray, config: str) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f"{crop.shape}{crop.dtype}{config}".encode())
+    digest.update(np.ascontiguousarray(crop).data)
+    return digest.hexdigest()
+
+
+class RegionOCR:
+    """
+    OCR over image regions, batched through one long-lived process pool
+
+    Results are cached by a hash of the region's pixels, so unchanged
+    tiles of near-identical screenshots are never OCRed twice.
+    """
+
+    def __init__(self, engine: Callable[[np.ndarray, str], str] = tesseract_ocr,
+                 config: str = "", max_workers: Optional[int] = None,
+                 use_processes: bool = True, cache_size: int = 4096):
+        self.engine = engine
+        self.config = config
+        self.max_workers = max_workers
+        self.use_processes = use_processes
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self.hits = 0
+        self.misses = 0
+
+    def _executor(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._pool
+
+    def ocr_crops(self, crops: Sequence[np.ndarray]) -> List[str]:
+        """OCR many crops in one batch; cached tiles are skipped"""
+        keys = [_tile_key(crop, self.config) for crop in crops]
+        texts: List[Optional[str]] = [None] * len(crops)
+        pending = {}  # tile key -> crop index, deduplicated within the batch
+        with self._lock:
+            for i, key in enumerate(keys):
+                if key in self._cache:
+                    self._cache.move_to_end(key)
+                    texts[i] = self._cache[key]
+                    self.hits += 1
+                elif key not in pending:
+                    pending[key] = i
+                    self.misses += 1
+
+        if pending:
+            jobs = [(self.engine, crops[i], self.config) for i in pending.values()]
+            if self.use_processes and len(jobs) > 1:
+                results = list(self._executor().map(_run_engine, jobs,
+                                                    chunksize=max(1, len(jobs) // 16)))
+            else:
+                results = [_run_engine(job) for job in jobs]
+            with self._lock:
+                for key, text in zip(pending, results):
+                    self._cache[key] = text
+                    if len(self._cache) > self.cache_size:
+                        self._cache.popitem(last=False)
+            fresh = dict(zip(pending, results))
+            texts = [text if text is not None else fresh[key] for text, key in zip(texts, keys)]
+        return texts
+
+    def ocr_regions(self, img_array: np.ndarray,
+                    boxes: Optional[Sequence[Box]] = None) -> List[TextRegion]:
+        """OCR the given boxes (or detected text regions) of one image"""
+        return self.ocr_batch([(img_array, boxes)])[0]
+
+    def ocr_batch(self, images: Sequence[Tuple[np.ndarray, Optional[Sequence[Box]]]]) -> List[List[TextRegion]]:
+        """OCR regions of many images in a single pool round-trip"""
+        all_boxes = [list(boxes) if boxes is not None else detect_text_regions(img)
+                     for img, boxes in images]
+        crops = [img[y:y + h, x:x + w] for (img, _), boxes in zip(images, all_boxes)
+                 for x, y, w, h in boxes]
+        texts = iter(self.ocr_crops(crops))
+        return [[(box, next(texts)) for box in boxes] for boxes in all_boxes]
+
+    def close(self) -> None:
+        """Shut down the worker pool"""
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+
+
+def join_regions(regions: Sequence[TextRegion]) -> str:
+    """Region texts in reading order (top-to-bottom, left-to-right)"""
+    ordered = sorted(regions, key=lambda region: (region[0][1], region[0][0]))
+    return "\n".join(text for _, text in ordered if text)
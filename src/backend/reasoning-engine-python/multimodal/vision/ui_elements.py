@@ -0,0 +1,186 @@
+"""
+UI Elements - Box detection, non-maximum suppression and spatial lookup
+Finds button-like boxes on a downscaled pyramid and indexes them for click targeting
+LOCAL PROCESSING - Privacy-first approach
+"""
+from typing import Any, Dict, Iterator, List, Sequence, Tuple
+
+import numpy as np
+
+from .frame_differ import Box, boxes_intersect, merge_tile_mask
+
+try:
+    import cv2
+except ImportError:
+    cv2 = None
+
+
+def _downscale(gray: np.ndarray, factor: int) -> np.ndarray:
+    """Box-filter downscale by an integer factor (edges are cropped)"""
+    if factor == 1:
+        return gray
+    h, w = gray.shape[0] // factor, gray.shape[1] // factor
+    return gray[:h * factor, :w * factor].reshape(h, factor, w, factor).mean(axis=(1, 3))
+
+
+def _edge_cells(gray: np.ndarray, edge_threshold: float, cell: int) -> np.ndarray:
+    """cells_y x cells_x mask of cells containing a strong gradient"""
+    edges = np.zeros(gray.shape, dtype=bool)
+    edges[:, 1:] |= np.abs(np.diff(gray, axis=1)) > edge_threshold
+    edges[1:, :] |= np.abs(np.diff(gray, axis=0)) > edge_threshold
+    cells_y, cells_x = -(-gray.shape[0] // cell), -(-gray.shape[1] // cell)
+    padded = np.zeros((cells_y * cell, cells_x * cell), dtype=bool)
+    padded[:gray.shape[0], :gray.shape[1]] = edges
+    return padded.reshape(cells_y, cell, cells_x, cell).any(axis=(1, 3))
+
+
+def _component_boxes(mask: np.ndarray, cell: int, width: int, height: int) -> np.ndarray:
+    """
+    Pixel (x, y, w, h) boxes of 4-connected components of a cell mask
+    Labelled in C by OpenCV; without it, falls back to the flood fill
+    FrameDiffer uses on its much smaller tile masks
+    """
+    if cv2 is None:
+        return np.array(merge_tile_mask(mask, cell, width, height), dtype=np.int64).reshape(-1, 4)
+    _, _, stats, _ = cv2.connectedComponentsWithStats(mask.astype(np.uint8), connectivity=4)
+    cells = stats[1:, :4].astype(np.int64)  # label 0 is the background
+    x, y = cells[:, 0] * cell, cells[:, 1] * cell
+    w = np.minimum((cells[:, 0] + cells[:, 2]) * cell, width) - x
+    h = np.minimum((cells[:, 1] + cells[:, 3]) * cell, height) - y
+    return np.stack([x, y, w, h], axis=1)
+
+
+def _border_coverage(mask: np.ndarray, boxes: np.ndarray) -> np.ndarray:
+    """Share of each (x0, y0, x1, y1) cell box's outline that is set in mask"""
+    rows = np.pad(np.cumsum(mask, axis=1), ((0, 0), (1, 0)))
+    cols = np.pad(np.cumsum(mask, axis=0), ((1, 0), (0, 0)))
+    x0, y0, x1, y1 = boxes.T
+    top = rows[y0, x1 + 1] - rows[y0, x0]
+    bottom = rows[y1, x1 + 1] - rows[y1, x0]
+    left = cols[y1 + 1, x0] - cols[y0, x0]
+    right = cols[y1 + 1, x1] - cols[y0, x1]
+    perimeter = 2 * (x1 - x0 + 1) + 2 * (y1 - y0 + 1)
+    return (top + bottom + left + right) / perimeter
+
+
+def detect_boxes(gray: np.ndarray, levels: Sequence[int] = (2, 4), cell: int = 2,
+                 edge_threshold: float = 40.0, min_size: Tuple[int, int] = (20, 10),
+                 max_size: Tuple[int, int] = (300, 100)) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Candidate element boxes over an image pyramid
+    Returns full-resolution (x, y, w, h) boxes and scores in [0.5, 1.0];
+    boxes with a closed outline (a rectangle border) score highest
+    """
+    gray = np.asarray(gray, dtype=np.float64)
+    height, width = gray.shape
+    all_boxes, all_scores = [], []
+    for factor in levels:
+        level = _downscale(gray, factor)
+        if min(level.shape) < cell:
+            continue
+        mask = _edge_cells(level, edge_threshold, cell)
+        boxes = _component_boxes(mask, cell, level.shape[1], level.shape[0])
+        if not len(boxes):
+            continue
+        in_cells = np.stack([
+            boxes[:, 0] // cell, boxes[:, 1] // cell,
+            (boxes[:, 0] + boxes[:, 2] - 1) // cell, (boxes[:, 1] + boxes[:, 3] - 1) // cell
+        ], axis=1)
+        scores = 0.5 + 0.5 * _border_coverage(mask, in_cells)
+
+        boxes *= factor
+        boxes[:, 2] = np.minimum(boxes[:, 0] + boxes[:, 2], width) - boxes[:, 0]
+        boxes[:, 3] = np.minimum(boxes[:, 1] + boxes[:, 3], height) - boxes[:, 1]
+        keep = ((boxes[:, 2] > min_size[0]) & (boxes[:, 2] < max_size[0])
+                & (boxes[:, 3] > min_size[1]) & (boxes[:, 3] < max_size[1]))
+        all_boxes.append(boxes[keep])
+        all_scores.append(scores[keep])
+
+    if not all_boxes:
+        return np.zeros((0, 4), dtype=np.int64), np.zeros(0)
+    return np.concatenate(all_boxes), np.concatenate(all_scores)
+
+
+def nms(boxes: np.ndarray, scores: np.ndarray, iou_threshold: float = 0.5) -> np.ndarray:
+    """
+    Greedy non-maximum suppression over (x, y, w, h) boxes
+    Returns indices of kept boxes, highest score first
+    """
+    boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+    if len(boxes) == 0:
+        return np.zeros(0, dtype=np.int64)
+    x0, y0 = boxes[:, 0], boxes[:, 1]
+    x1, y1 = x0 + boxes[:, 2], y0 + boxes[:, 3]
+    areas = boxes[:, 2] * boxes[:, 3]
+    # Ties go to the tighter box, then by position, so the output does not
+    # depend on input order
+    order = np.lexsort((x0, y0, areas, -np.asarray(scores, dtype=np.float64)))
+    keep = []
+    while order.size:
+        i, rest = order[0], order[1:]
+        keep.append(i)
+        iw = np.clip(np.minimum(x1[i], x1[rest]) - np.maximum(x0[i], x0[rest]), 0, None)
+        ih = np.clip(np.minimum(y1[i], y1[rest]) - np.maximum(y0[i], y0[rest]), 0, None)
+        inter = iw * ih
+        iou = inter / (areas[i] + areas[rest] - inter)
+        order = rest[iou <= iou_threshold]
+    return np.array(keep, dtype=np.int64)
+
+
+class ElementIndex:
+    """
+    Uniform-grid spatial index over elements with (x, y, w, h) coordinates
+
+    Iterates in reading order (top-to-bottom, left-to-right). Point and
+    rectangle queries only inspect the grid cells they touch.
+    """
+
+    def __init__(self, elements: Sequence[Any], cell_size: int = 64):
+        self.cell_size = cell_size
+        self._elements = sorted(elements, key=lambda e: (e.coordinates[1], e.coordinates[0],
+                                                         -e.confidence))
+        self._cells: Dict[Tuple[int, int], List[int]] = {}
+        for i, element in enumerate(self._elements):
+            for key in self._cells_for(element.coordinates):
+                self._cells.setdefault(key, []).append(i)
+
+    def _cells_for(self, rect: Box) -> Iterator[Tuple[int, int]]:
+        x, y, w, h = rect
+        cs = self.cell_size
+        for cy in range(y // cs, (y + max(h, 1) - 1) // cs + 1):
+            for cx in range(x // cs, (x + max(w, 1) - 1) // cs + 1):
+                yield cx, cy
+
+    def __len__(self) -> int:
+        return len(self._elements)
+
+    def __iter__(self) -> Iterator[Any]:
+        return iter(self._elements)
+
+    def __getitem__(self, item):
+        return self._elements[item]
+
+    def elements_at(self, x: int, y: int) -> List[Any]:
+        """Elements containing the point, innermost (smallest) first"""
+        cs = self.cell_size
+        hits = [i for i in self._cells.get((x // cs, y // cs), [])
+                if self._contains(self._elements[i].coordinates, x, y)]
+        hits.sort(key=lambda i: (self._elements[i].coordinates[2] * self._elements[i].coordinates[3], i))
+        return [self._elements[i] for i in hits]
+
+    def elements_in(self, rect: Box, partial: bool = False) -> List[Any]:
+        """Elements inside rect (or overlapping it when partial), in reading order"""
+        candidates = set()
+        for key in self._cells_for(rect):
+            candidates.update(self._cells.get(key, ()))
+        test = boxes_intersect if partial else self._inside
+        return [self._elements[i] for i in sorted(candidates) if test(self._elements[i].coordinates, rect)]
+
+    @staticmethod
+    def _contains(box: Box, x: int, y: int) -> bool:
+        return box[0] <= x < box[0] + box[2] and box[1] <= y < box[1] + box[3]
+
+    @staticmethod
+    def _inside(box: Box, rect: Box) -> bool:
+        return (rect[0] <= box[0] and rect[1] <= box[1]
+                and box[0] + box[2] <= rect[0] + rect[2] and box[1] + box[3] <= rect[1] + rect[3])
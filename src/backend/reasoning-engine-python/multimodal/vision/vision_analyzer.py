@@ -3,14 +3,22 @@ Vision Analyzer - Multi-Modal Reasoning for Images
 Analyzes screenshots, images, and visual content
 LOCAL PROCESSING - Privacy-first approach
 """
-from dataclasses import dataclass
-from typing import List, Dict, Any, Optional, Tuple
+from dataclasses import dataclass, replace
+from typing import List, Dict, Any, Optional, Tuple, Union
 from pathlib import Path
+from io import BytesIO
 import base64
 import hashlib
 from datetime import datetime
+import importlib.util
 import json
 
+from ..model_cache import get_model, is_loaded
+from .frame_differ import FrameDiffer, boxes_intersect, grow_boxes
+from .image_hash import dhash, phash
+from .region_ocr import RegionOCR, detect_text_regions, join_regions
+from .ui_elements import ElementIndex, detect_boxes, nms
+
 try:
     from PIL import Image
     import numpy as np
@@ -76,21 +84,38 @@ class VisionAnalyzer:
         self._init_models()
     
     def _init_models(self):
-        """Initialize local CV models"""
+        """Check local CV models; detectors are loaded on first use"""
         # Use local models only - OpenCV, PIL
         # For advanced: CLIP, SAM, YOLO (can run locally)
         self.ocr_available = self._check_ocr()
-        self.face_detection = self._init_face_detection()
-        print(f"✅ Vision Analyzer initialized (GPU: {self.use_gpu})")
+        self._region_ocr: Optional[RegionOCR] = None
+    
+    @property
+    def region_ocr(self) -> RegionOCR:
+        """Region OCR with its worker pool and tile cache, created on first use"""
+        if self._region_ocr is None:
+            self._region_ocr = RegionOCR()
+        return self._region_ocr
+    
+    @property
+    def face_detection(self):
+        """Face detector from the process-wide cache, loaded on first access"""
+        return get_model(("haar_face",), self._init_face_detection)
+    
+    def warmup(self) -> bool:
+        """Preload detectors; returns whether face detection is available"""
+        return self.face_detection is not None
+    
+    def is_warm(self) -> bool:
+        """Check whether the detectors are resident"""
+        return is_loaded(("haar_face",))
     
     def _check_ocr(self) -> bool:
         """Check if OCR is available"""
-        try:
-            import pytesseract
-            return True
-        except ImportError:
+        if importlib.util.find_spec("pytesseract") is None:
             print("⚠️  OCR unavailable. Install: pip install pytesseract")
             return False
+        return True
     
     def _init_face_detection(self):
         """Initialize local face detection"""
@@ -108,69 +133,184 @@ class VisionAnalyzer:
         NO external API calls - privacy guaranteed
         """
         img = Image.open(image_path)
-        img_array = np.array(img)
+        return self._analyze_decoded(
+            self._to_rgb_array(img), image_path,
+            {
+                "file_size": Path(image_path).stat().st_size,
+                "format": img.format,
+                "mode": img.mode
+            }
+        )
+    
+    def analyze_bytes(self, image_data: bytes, source: str = "<memory>") -> ImageAnalysis:
+        """
+        Analyze encoded image bytes (PNG, JPEG, ...) entirely in memory
+        Decodes once; never touches the filesystem
+        """
+        img = Image.open(BytesIO(image_data))
+        return self._analyze_decoded(
+            self._to_rgb_array(img), source,
+            {"file_size": len(image_data), "format": img.format, "mode": img.mode}
+        )
+    
+    def analyze_array(self, img_array: np.ndarray, source: str = "<array>",
+                      differ: Optional[FrameDiffer] = None) -> ImageAnalysis:
+        """
+        Analyze an already decoded image (H x W gray, RGB or RGBA uint8)
+        
+        With a FrameDiffer, consecutive frames of a stream are analyzed
+        incrementally: unchanged frames reuse the previous analysis and
+        element detection re-runs only inside changed regions
+        """
+        img_array = self._normalize_array(img_array)
+        metadata = {"file_size": None, "format": None, "mode": "RGB"}
+        if differ is None:
+            return self._analyze_decoded(img_array, source, metadata)
+        
+        diff = differ.update(img_array)
+        previous = differ.last_analysis
+        if diff.keyframe or previous is None:
+            result = self._analyze_decoded(img_array, source, metadata)
+        elif not diff.boxes:
+            result = replace(previous, image_path=source, timestamp=datetime.now().isoformat(),
+                             metadata=dict(previous.metadata))
+        else:
+            result = self._analyze_regions(img_array, source, metadata, previous, diff.boxes)
+        result.metadata["changed_regions"] = diff.boxes
+        differ.last_analysis = result
+        return result
+    
+    def analyze_screenshot(self, screenshot_data: bytes) -> ImageAnalysis:
+        """Analyze screenshot data"""
+        return self.analyze_bytes(screenshot_data, source="<screenshot>")
+    
+    @staticmethod
+    def _to_rgb_array(img: "Image.Image") -> np.ndarray:
+        """Decode a PIL image into an H x W x 3 uint8 array"""
+        if img.mode != "RGB":
+            img = img.convert("RGB")
+        return np.asarray(img)
+    
+    @staticmethod
+    def _normalize_array(img_array: np.ndarray) -> np.ndarray:
+        """Coerce gray / RGBA arrays to H x W x 3 uint8"""
+        img_array = np.asarray(img_array)
+        if img_array.ndim == 2:
+            img_array = np.repeat(img_array[:, :, None], 3, axis=2)
+        elif img_array.ndim == 3 and img_array.shape[2] == 4:
+            img_array = img_array[:, :, :3]
+        if img_array.ndim != 3 or img_array.shape[2] != 3:
+            raise ValueError(f"Unsupported image array shape: {img_array.shape}")
+        return img_array.astype(np.uint8, copy=False)
+    
+    def _analyze_regions(self, img_array: np.ndarray, source: str, metadata: Dict[str, Any],
+                         previous: ImageAnalysis, boxes: List[Tuple[int, int, int, int]]) -> ImageAnalysis:
+        """Update a previous analysis for changes confined to boxes"""
+        # Elements outside every changed region carry over. Crops grow to
+        # cover the elements they cut, so those are re-detected whole
+        crops = grow_boxes(boxes, [e.coordinates for e in previous.elements])
+        elements = [e for e in previous.elements
+                    if not any(boxes_intersect(e.coordinates, box) for box in crops)]
+        for x, y, w, h in crops:
+            for element in self._detect_elements(img_array[y:y + h, x:x + w]):
+                ex, ey, ew, eh = element.coordinates
+                element.coordinates = (ex + x, ey + y, ew, eh)
+                elements.append(element)
+        
+        # Text regions outside the changes carry over; only new ones are OCRed
+        text_regions = []
+        if self.ocr_available:
+            kept = [(tuple(r["box"]), r["text"]) for r in previous.metadata.get("text_regions", [])
+                    if not any(boxes_intersect(tuple(r["box"]), box) for box in boxes)]
+            fresh = [box for box in detect_text_regions(img_array)
+                     if any(boxes_intersect(box, changed) for changed in boxes)]
+            text_regions = kept + self._ocr_regions(img_array, fresh)
+        
+        # Whole-frame stages that are cheap or cannot be split by region
+        palette = self.extract_palette(img_array)
+        metadata = {**metadata, "palette": [{"color": c, "share": share} for c, share in palette]}
+        if self.ocr_available:
+            metadata["text_regions"] = [{"box": box, "text": text} for box, text in text_regions]
         
+        height, width = img_array.shape[:2]
+        return ImageAnalysis(
+            image_path=source,
+            timestamp=datetime.now().isoformat(),
+            dimensions=(width, height),
+            elements=elements,
+            dominant_colors=[color for color, _ in palette],
+            text_content=join_regions(text_regions),
+            scene_description=self._analyze_scene(img_array),
+            metadata=metadata
+        )
+    
+    def _analyze_decoded(self, img_array: np.ndarray, source: str,
+                         metadata: Dict[str, Any]) -> ImageAnalysis:
+        """Run every analysis on one decoded RGB array"""
         # Basic analysis
-        dimensions = img.size
-        dominant_colors = self._extract_dominant_colors(img_array)
+        height, width = img_array.shape[:2]
+        palette = self.extract_palette(img_array)
+        dominant_colors = [color for color, _ in palette]
+        metadata = {**metadata, "palette": [{"color": c, "share": share} for c, share in palette]}
         
         # Element detection
         elements = self._detect_elements(img_array)
         
-        # OCR text extraction
-        text_content = self._extract_text(img_array) if self.ocr_available else ""
+        # OCR text extraction, per text region
+        text_content = ""
+        if self.ocr_available:
+            text_regions = self._ocr_regions(img_array, detect_text_regions(img_array))
+            metadata["text_regions"] = [{"box": box, "text": text} for box, text in text_regions]
+            text_content = join_regions(text_regions)
         
         # Scene analysis
         scene_description = self._analyze_scene(img_array)
         
         return ImageAnalysis(
-            image_path=image_path,
+            image_path=source,
             timestamp=datetime.now().isoformat(),
-            dimensions=dimensions,
+            dimensions=(width, height),
             elements=elements,
             dominant_colors=dominant_colors,
             text_content=text_content,
             scene_description=scene_description,
-            metadata={
-                "file_size": Path(image_path).stat().st_size,
-                "format": img.format,
-                "mode": img.mode
-            }
+            metadata=metadata
         )
     
-    def analyze_screenshot(self, screenshot_data: bytes) -> ImageAnalysis:
-        """Analyze screenshot data"""
-        # Save temporarily for analysis
-        import tempfile
-        with tempfile.NamedTemporaryFile(suffix='.png', delete=False) as f:
-            f.write(screenshot_data)
-            temp_path = f.name
-        
-        result = self.analyze_image(temp_path)
-        Path(temp_path).unlink()  # Clean up
-        return result
-    
-    def detect_ui_elements(self, image_path: str) -> List[VisualElement]:
-        """Detect UI elements in screenshot"""
-        img = cv2.imread(image_path)
-        elements = []
-        
-        # Detect buttons (using contour detection)
-        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-        edges = cv2.Canny(gray, 50, 150)
-        contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    def detect_ui_elements(self, image: Union[str, Path, np.ndarray],
+                           levels: Tuple[int, ...] = (2, 4),
+                           iou_threshold: float = 0.5) -> ElementIndex:
+        """
+        Detect UI elements in a screenshot (file path or decoded array)
         
-        for contour in contours:
-            x, y, w, h = cv2.boundingRect(contour)
-            # Filter by size to find button-like elements
-            if 20 < w < 300 and 10 < h < 100:
-                elements.append(VisualElement(
-                    element_type="button_candidate",
-                    coordinates=(x, y, w, h),
-                    confidence=0.7
-                ))
+        Boxes are found on a downscaled pyramid and merged with NMS. All
+        elements are returned in a spatial index, in reading order, with
+        elements_at(x, y) / elements_in(rect) for click targeting
+        """
+        if isinstance(image, (str, Path)):
+            img_array = self._to_rgb_array(Image.open(image))
+        else:
+            img_array = self._normalize_array(image)
+        gray = img_array.astype(np.float64) @ np.array([0.299, 0.587, 0.114])
         
-        return elements[:50]  # Limit results
+        boxes, scores = detect_boxes(gray, levels=levels)
+        elements = [
+            VisualElement(
+                element_type="button_candidate",
+                coordinates=tuple(int(v) for v in boxes[i]),
+                confidence=round(float(scores[i]), 3)
+            )
+            for i in nms(boxes, scores, iou_threshold)
+        ]
+        return ElementIndex(elements)
+    
+    def perceptual_hash(self, img_array: np.ndarray, method: str = "phash") -> int:
+        """64-bit perceptual hash ("phash" or "dhash") for near-duplicate lookup"""
+        if method == "phash":
+            return phash(img_array)
+        if method == "dhash":
+            return dhash(img_array)
+        raise ValueError(f"Unknown hash method: {method}")
     
     def compare_images(self, image1_path: str, image2_path: str) -> Dict[str, Any]:
         """Compare two images for differences"""
@@ -198,22 +338,66 @@ class VisionAnalyzer:
         }
     
     def _extract_dominant_colors(self, img_array: np.ndarray, n_colors: int = 5) -> List[str]:
-        """Extract dominant colors"""
-        # Simple k-means clustering for color extraction
-        pixels = img_array.reshape(-1, 3)
+        """Extract dominant colors, most common first"""
+        return [color for color, _ in self.extract_palette(img_array, n_colors)]
+    
+    def extract_palette(self, img_array: np.ndarray, n_colors: int = 5,
+                        max_side: int = 256) -> List[Tuple[str, float]]:
+        """
+        Median-cut palette over a quantized color histogram
+        Returns up to n_colors distinct (hex color, pixel share) pairs,
+        largest share first; deterministic for a given image
+        """
+        img_array = self._normalize_array(img_array)
+        
+        # Strided thumbnail: no resampling cost, bounded pixel count
+        step = max(1, -(-max(img_array.shape[:2]) // max_side))
+        pixels = img_array[::step, ::step].reshape(-1, 3).astype(np.int64)
         
-        # Sample for performance
-        if len(pixels) > 10000:
-            indices = np.random.choice(len(pixels), 10000, replace=False)
-            pixels = pixels[indices]
+        # 5 bits per channel -> 32768 bins, with per-bin color sums
+        q = pixels >> 3
+        bins = (q[:, 0] << 10) | (q[:, 1] << 5) | q[:, 2]
+        counts = np.bincount(bins, minlength=32768)
+        sums = np.stack([np.bincount(bins, weights=pixels[:, c], minlength=32768) for c in range(3)], axis=1)
         
-        # Use simple binning instead of k-means for speed
-        colors = []
-        for i in range(n_colors):
-            mean_color = np.mean(pixels, axis=0).astype(int)
-            colors.append(f"#{mean_color[0]:02x}{mean_color[1]:02x}{mean_color[2]:02x}")
+        occupied = np.flatnonzero(counts)
+        coords = np.stack([occupied >> 10, (occupied >> 5) & 31, occupied & 31], axis=1)
+        weights = counts[occupied]
         
-        return colors
+        def make_box(members: np.ndarray) -> Tuple[int, int, np.ndarray]:
+            box_coords = coords[members]
+            spans = box_coords.max(axis=0) - box_coords.min(axis=0)
+            return int(weights[members].sum()), int(np.argmax(spans)) if spans.max() > 0 else -1, members
+        
+        # Repeatedly split the most populous box that still spans a range,
+        # along its widest axis at the weighted median
+        boxes = [make_box(np.arange(len(occupied)))]
+        while len(boxes) < n_colors:
+            splittable = [i for i, box in enumerate(boxes) if box[1] >= 0]
+            if not splittable:
+                break
+            _, axis, members = boxes.pop(max(splittable, key=lambda i: boxes[i][0]))
+            members = members[np.argsort(coords[members, axis], kind='stable')]
+            values = coords[members, axis]
+            cumulative = np.cumsum(weights[members])
+            # Cut between distinct values closest to the weighted median
+            median_value = values[np.searchsorted(cumulative, cumulative[-1] / 2)]
+            cut = int(np.searchsorted(values, median_value, side='right'))
+            if cut == len(members):
+                cut = int(np.searchsorted(values, median_value, side='left'))
+            boxes.extend([make_box(members[:cut]), make_box(members[cut:])])
+        boxes = [box[2] for box in boxes]
+        
+        total = weights.sum()
+        palette: Dict[str, float] = {}
+        for box in boxes:
+            bin_ids = occupied[box]
+            n = counts[bin_ids].sum()
+            mean = sums[bin_ids].sum(axis=0) / n
+            r, g, b = (int(round(v)) for v in mean)
+            color = f"#{r:02x}{g:02x}{b:02x}"
+            palette[color] = palette.get(color, 0.0) + float(n / total)
+        return sorted(palette.items(), key=lambda item: (-item[1], item[0]))
     
     def _detect_elements(self, img_array: np.ndarray) -> List[VisualElement]:
         """Detect visual elements"""
@@ -234,17 +418,36 @@ class VisionAnalyzer:
         return elements
     
     def _extract_text(self, img_array: np.ndarray) -> str:
-        """Extract text using OCR"""
+        """Extract text using OCR over detected text regions"""
         if not self.ocr_available:
             return ""
-        
+        return join_regions(self._ocr_regions(img_array, detect_text_regions(img_array)))
+    
+    def _ocr_regions(self, img_array: np.ndarray,
+                     boxes: List[Tuple[int, int, int, int]]) -> List[Tuple[Tuple[int, int, int, int], str]]:
+        """OCR boxes of one image; failures yield no text rather than an error"""
+        if not boxes:
+            return []
         try:
-            import pytesseract
-            text = pytesseract.image_to_string(Image.fromarray(img_array))
-            return text.strip()
+            return self.region_ocr.ocr_regions(img_array, boxes)
         except Exception as e:
             print(f"OCR error: {e}")
-            return ""
+            return []
+    
+    def extract_text_batch(self, images: List[np.ndarray]) -> List[str]:
+        """
+        OCR many images in one call
+        Text regions of all images share a single pool round-trip and the tile cache
+        """
+        if not self.ocr_available:
+            return ["" for _ in images]
+        arrays = [self._normalize_array(img) for img in images]
+        try:
+            batches = self.region_ocr.ocr_batch([(arr, None) for arr in arrays])
+        except Exception as e:
+            print(f"OCR error: {e}")
+            return ["" for _ in images]
+        return [join_regions(regions) for regions in batches]
     
     def _analyze_scene(self, img_array: np.ndarray) -> str:
         """Basic scene analysis"""
@@ -1,5 +1,13 @@
 """Storage interfaces for learning data."""
 
-from .learning_storage import LearningStorage, InMemoryStorage
+from .learning_storage import LearningStorage, InMemoryStorage, SQLiteStorage
 
-__all__ = ['LearningStorage', 'InMemoryStorage']
+__all__ = ['LearningStorage', 'InMemoryStorage', 'SQLiteStorage', 'ShardedProfileStore']
+
+
+def __getattr__(name):
+    # ShardedProfileStore needs duckdb; import it only when asked for
+    if name == 'ShardedProfileStore':
+        from .profile_store import ShardedProfileStore
+        return ShardedProfileStore
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
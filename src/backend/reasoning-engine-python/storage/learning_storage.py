@@ -1,7 +1,14 @@
 """Storage backend for learning data."""
 
+import bisect
+import heapq
+import json
 import logging
-from typing import Dict, List, Any, Optional, Protocol
+import math
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Any, Optional, Protocol, Set, Tuple
 from abc import abstractmethod
 
 logger = logging.getLogger(__name__)
@@ -29,15 +36,40 @@ class LearningStorage(Protocol):
         """List keys with optional prefix."""
         ...
 
+def _prefix_upper_bound(prefix: str) -> Optional[str]:
+    """Smallest string greater than every string starting with prefix."""
+    for i in range(len(prefix) - 1, -1, -1):
+        if ord(prefix[i]) < 0x10FFFF:
+            return prefix[:i] + chr(ord(prefix[i]) + 1)
+    return None
+
 class InMemoryStorage:
-    """In-memory storage implementation."""
+    """In-memory storage implementation.
+    
+    Keys are kept in a sorted array for O(log n + k) prefix listing. New
+    keys are buffered in a set and deleted indexed keys are tombstoned, so
+    store and delete are O(1). Listing filters the small buffer for the
+    prefix; the buffer is merged into the array only once it outgrows
+    sqrt(n) keys, so bulk loads and alternating store/list workloads do
+    not pay a linear merge per call.
+    """
+    
+    _MIN_BUFFER = 1024  # Buffered keys and tombstones tolerated before a merge
     
     def __init__(self):
         self._storage: Dict[str, Any] = {}
+        self._sorted_keys: List[str] = []
+        self._pending_keys: Set[str] = set()
+        self._deleted_keys: Set[str] = set()
         logger.info("InMemoryStorage initialized")
     
     def store(self, key: str, value: Any) -> None:
         """Store a value."""
+        if key not in self._storage:
+            if key in self._deleted_keys:
+                self._deleted_keys.discard(key)  # still in the sorted array
+            else:
+                self._pending_keys.add(key)
         self._storage[key] = value
         logger.debug(f"Stored key: {key}")
     
@@ -49,17 +81,171 @@ class InMemoryStorage:
         """Delete a value."""
         if key in self._storage:
             del self._storage[key]
+            if key in self._pending_keys:
+                self._pending_keys.discard(key)
+            else:
+                self._deleted_keys.add(key)
             logger.debug(f"Deleted key: {key}")
             return True
         return False
     
+    def _merge_pending(self) -> None:
+        if self._deleted_keys:
+            deleted = self._deleted_keys
+            self._sorted_keys = [k for k in self._sorted_keys if k not in deleted]
+            self._deleted_keys = set()
+        if self._pending_keys:
+            # Timsort merges the two sorted runs in linear time
+            self._sorted_keys.extend(sorted(self._pending_keys))
+            self._sorted_keys.sort()
+            self._pending_keys.clear()
+    
     def list_keys(self, prefix: str = "") -> List[str]:
-        """List keys with optional prefix."""
-        if prefix:
-            return [k for k in self._storage.keys() if k.startswith(prefix)]
-        return list(self._storage.keys())
+        """List keys with optional prefix, in key order."""
+        buffered = len(self._pending_keys) + len(self._deleted_keys)
+        if not prefix or buffered > max(self._MIN_BUFFER, math.isqrt(len(self._sorted_keys))):
+            self._merge_pending()
+        keys = self._sorted_keys
+        if not prefix:
+            return list(keys)
+        start = bisect.bisect_left(keys, prefix)
+        upper = _prefix_upper_bound(prefix)
+        if upper is None:
+            end = start
+            while end < len(keys) and keys[end].startswith(prefix):
+                end += 1
+        else:
+            end = bisect.bisect_left(keys, upper, start)
+        found = keys[start:end]
+        if self._deleted_keys:
+            found = [k for k in found if k not in self._deleted_keys]
+        pending = sorted(k for k in self._pending_keys if k.startswith(prefix))
+        return list(heapq.merge(found, pending)) if pending else found
     
     def clear(self) -> None:
         """Clear all data."""
         self._storage.clear()
+        self._sorted_keys.clear()
+        self._pending_keys.clear()
+        self._deleted_keys.clear()
+        logger.info("Storage cleared")
+
+class SQLiteStorage:
+    """Durable key-value storage on SQLite in WAL mode.
+    
+    Keys live in a WITHOUT ROWID table, i.e. a B-tree ordered by key, so
+    prefix listing is a range scan. Values are stored as JSON; values JSON
+    cannot represent raise TypeError instead of being coerced. Reads go
+    through an LRU cache of the stored JSON, decoded on every read so
+    callers never share (or mutate) a cached object.
+    """
+    
+    _BATCH = 500  # Host parameters per IN (...) lookup
+    
+    def __init__(self, path: str, cache_size: int = 4096):
+        """Initialize storage.
+        
+        Args:
+            path: Database file path (":memory:" for a transient store)
+            cache_size: Number of encoded values kept in the read cache
+        """
+        self.path = path
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS kv (key TEXT PRIMARY KEY, value TEXT NOT NULL) WITHOUT ROWID"
+        )
+        logger.info(f"SQLiteStorage initialized at {path}")
+    
+    def _cache_put(self, key: str, raw: str) -> None:
+        if self.cache_size <= 0:
+            return
+        self._cache[key] = raw
+        self._cache.move_to_end(key)
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+    
+    def store(self, key: str, value: Any) -> None:
+        """Store a value."""
+        self.store_many([(key, value)])
+        logger.debug(f"Stored key: {key}")
+    
+    def store_many(self, items: Iterable[Tuple[str, Any]]) -> None:
+        """Store many values in a single transaction."""
+        items = list(items)
+        params = [(key, json.dumps(value)) for key, value in items]
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany("INSERT OR REPLACE INTO kv VALUES (?, ?)", params)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            for key, raw in params:
+                self._cache_put(key, raw)
+    
+    def retrieve(self, key: str) -> Optional[Any]:
+        """Retrieve a value."""
+        return self.retrieve_many([key]).get(key)
+    
+    def retrieve_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        """Retrieve many values; missing keys are left out of the result."""
+        found: Dict[str, Any] = {}
+        missing: List[str] = []
+        with self._lock:
+            for key in keys:
+                if key in self._cache:
+                    self._cache.move_to_end(key)
+                    found[key] = json.loads(self._cache[key])
+                else:
+                    missing.append(key)
+            for start in range(0, len(missing), self._BATCH):
+                chunk = missing[start:start + self._BATCH]
+                rows = self._conn.execute(
+                    f"SELECT key, value FROM kv WHERE key IN ({','.join('?' * len(chunk))})", chunk
+                ).fetchall()
+                for key, raw in rows:
+                    found[key] = json.loads(raw)
+                    self._cache_put(key, raw)
+        return found
+    
+    def delete(self, key: str) -> bool:
+        """Delete a value."""
+        with self._lock:
+            self._cache.pop(key, None)
+            deleted = self._conn.execute("DELETE FROM kv WHERE key = ?", (key,)).rowcount > 0
+        if deleted:
+            logger.debug(f"Deleted key: {key}")
+        return deleted
+    
+    def list_keys(self, prefix: str = "") -> List[str]:
+        """List keys with optional prefix, in key order."""
+        upper = _prefix_upper_bound(prefix) if prefix else None
+        with self._lock:
+            if upper is not None:
+                rows = self._conn.execute(
+                    "SELECT key FROM kv WHERE key >= ? AND key < ? ORDER BY key", (prefix, upper)
+                ).fetchall()
+            else:
+                rows = self._conn.execute(
+                    "SELECT key FROM kv WHERE key >= ? ORDER BY key", (prefix,)
+                ).fetchall()
+                rows = [row for row in rows if row[0].startswith(prefix)]
+        return [row[0] for row in rows]
+    
+    def clear(self) -> None:
+        """Clear all data."""
+        with self._lock:
+            self._conn.execute("DELETE FROM kv")
+            self._cache.clear()
         logger.info("Storage cleared")
+    
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,122 @@
+"""Sharded DuckDB store for preference profiles."""
+
+import json
+import logging
+import threading
+import zlib
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Tuple
+
+import duckdb
+
+logger = logging.getLogger(__name__)
+
+# (user_id, key, value, confidence, frequency, last_seen)
+SignalRow = Tuple[str, str, Any, float, int, datetime]
+
+class ShardedProfileStore:
+    """Durable per-user preference signals, sharded by user_id.
+
+    Each shard is its own DuckDB file, so writers for different users
+    rarely contend and a shard can be backed up or moved independently.
+    Values are stored as JSON; a value JSON cannot represent fails the
+    whole write with TypeError before any shard is touched.
+    """
+
+    def __init__(self, root_dir: str, n_shards: int = 16):
+        """Initialize the store.
+
+        Args:
+            root_dir: Directory holding the shard files
+            n_shards: Number of shards (fixed for the lifetime of the data)
+        """
+        self.root_dir = Path(root_dir)
+        self.root_dir.mkdir(parents=True, exist_ok=True)
+        self.n_shards = n_shards
+        self._conns: Dict[int, duckdb.DuckDBPyConnection] = {}
+        self._locks = [threading.Lock() for _ in range(n_shards)]
+        logger.info(f"ShardedProfileStore initialized at {root_dir} with {n_shards} shards")
+
+    def shard_for(self, user_id: str) -> int:
+        """Stable shard index for a user."""
+        return zlib.crc32(user_id.encode()) % self.n_shards
+
+    def _conn(self, shard: int) -> duckdb.DuckDBPyConnection:
+        conn = self._conns.get(shard)
+        if conn is None:
+            conn = duckdb.connect(str(self.root_dir / f"profiles_{shard:03d}.duckdb"))
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS signals (
+                    user_id VARCHAR,
+                    key VARCHAR,
+                    value JSON,
+                    confidence DOUBLE,
+                    frequency BIGINT,
+                    last_seen TIMESTAMP,
+                    PRIMARY KEY (user_id, key)
+                )
+            """)
+            self._conns[shard] = conn
+        return conn
+
+    def load_profile(self, user_id: str) -> List[SignalRow]:
+        """Load all signals of a user."""
+        shard = self.shard_for(user_id)
+        with self._locks[shard]:
+            rows = self._conn(shard).execute("""
+                SELECT user_id, key, value, confidence, frequency, last_seen
+                FROM signals WHERE user_id = ?
+            """, [user_id]).fetchall()
+        return [(u, k, json.loads(v), c, f, ts) for u, k, v, c, f, ts in rows]
+
+    def has_user(self, user_id: str) -> bool:
+        """Check whether any signal is stored for a user."""
+        shard = self.shard_for(user_id)
+        with self._locks[shard]:
+            row = self._conn(shard).execute(
+                "SELECT 1 FROM signals WHERE user_id = ? LIMIT 1", [user_id]
+            ).fetchone()
+        return row is not None
+
+    def write_signals(self, rows: Iterable[SignalRow]) -> int:
+        """Upsert signals, one batched statement per shard.
+
+        Returns:
+            Number of rows written
+        """
+        by_shard: Dict[int, List[list]] = {}
+        for user_id, key, value, confidence, frequency, last_seen in rows:
+            by_shard.setdefault(self.shard_for(user_id), []).append(
+                [user_id, key, json.dumps(value), confidence, frequency, last_seen]
+            )
+        for shard, params in by_shard.items():
+            with self._locks[shard]:
+                self._conn(shard).executemany(
+                    "INSERT OR REPLACE INTO signals VALUES (?, ?, ?, ?, ?, ?)", params
+                )
+        written = sum(len(p) for p in by_shard.values())
+        logger.debug(f"Wrote {written} signals across {len(by_shard)} shards")
+        return written
+
+    def delete_user(self, user_id: str) -> None:
+        """Remove all signals of a user."""
+        shard = self.shard_for(user_id)
+        with self._locks[shard]:
+            self._conn(shard).execute("DELETE FROM signals WHERE user_id = ?", [user_id])
+
+    def export_to_parquet(self, output_dir: str) -> None:
+        """Export every shard to Parquet for LOCAL backup."""
+        output = Path(output_dir)
+        output.mkdir(parents=True, exist_ok=True)
+        for shard in range(self.n_shards):
+            with self._locks[shard]:
+                path = output / f"profiles_{shard:03d}.parquet"
+                self._conn(shard).execute(f"COPY signals TO '{path}' (FORMAT PARQUET)")
+
+    def close(self) -> None:
+        """Close all shard connections."""
+        for shard, conn in list(self._conns.items()):
+            with self._locks[shard]:
+                conn.close()
+        self._conns.clear()
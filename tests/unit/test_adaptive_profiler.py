@@ -0,0 +1,233 @@
+"""
+Unit tests for adaptive_profiler.py - runtime metrics and adaptive hints
+"""
+import pytest
+import re
+import sys
+import os
+import threading
+import asyncio
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'src', 'backend', 'reasoning-engine-python'))
+from learning.adaptive_profiler import AdaptiveProfiler, profiled
+from learning.metrics_exporter import OpenMetricsExporter
+
+@pytest.mark.unit
+@pytest.mark.observability
+class TestAdaptiveProfiler:
+    def test_observe_and_snapshot(self):
+        """Test observations are visible in the next snapshot"""
+        profiler = AdaptiveProfiler(window_size=10)
+        for v in range(5):
+            profiler.observe("latency_ms", float(v))
+        stats = profiler.snapshot()
+        assert stats["latency_ms"]["count"] == 5
+        assert stats["latency_ms"]["max"] == 4.0
+
+    def test_window_is_bounded(self):
+        """Test each metric keeps only the last window_size values"""
+        profiler = AdaptiveProfiler(window_size=10)
+        for v in range(100):
+            profiler.observe("latency_ms", float(v))
+        stats = profiler.snapshot()
+        assert stats["latency_ms"]["count"] == 10
+        assert stats["latency_ms"]["min"] == 90.0
+
+    def test_multithreaded_observations_are_merged(self):
+        """Test per-thread buffers are merged and dead threads released"""
+        profiler = AdaptiveProfiler(window_size=100000)
+
+        def worker():
+            for v in range(1000):
+                profiler.observe("latency_ms", float(v))
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        stats = profiler.snapshot()
+        assert stats["latency_ms"]["count"] == 8000
+        assert profiler._buffers == []
+
+    def test_full_buffers_are_merged_not_dropped(self):
+        """Test a thread outrunning the emitter loses no observations"""
+        profiler = AdaptiveProfiler(window_size=100000, buffer_size=64)
+        received = []
+        profiler.add_sink(received.extend)
+
+        def worker():
+            for v in range(1000):
+                profiler.observe("latency_ms", float(v))
+
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert len(received) >= 4 * (1000 // 64) * 64  # merged by the writers themselves
+        assert profiler.snapshot()["latency_ms"]["count"] == 4000
+        assert len(received) == 4000
+
+    def test_adaptive_hints(self):
+        """Test hints are derived from merged metrics"""
+        profiler = AdaptiveProfiler()
+        for _ in range(10):
+            profiler.observe("latency_ms", 1000.0)
+            profiler.observe("success_rate", 0.5)
+        hints = profiler.snapshot()["adaptive_hints"]
+        assert hints["reduce_batch_size"] is True
+        assert hints["increase_exploration"] is True
+
+@pytest.mark.unit
+@pytest.mark.observability
+class TestProfilingSpans:
+    def test_span_records_wall_and_cpu(self):
+        """Test span records wall and CPU time metrics"""
+        profiler = AdaptiveProfiler()
+        with profiler.span("work"):
+            sum(range(10000))
+        stats = profiler.snapshot()
+        assert stats["work.wall_ms"]["count"] == 1
+        assert stats["work.cpu_ms"]["count"] == 1
+        assert "work.alloc_kb" not in stats
+
+    def test_span_tracks_allocations_when_tracing(self):
+        """Test allocation deltas are recorded while tracemalloc is tracing"""
+        profiler = AdaptiveProfiler()
+        tracemalloc.start()
+        try:
+            with profiler.span("alloc", track_alloc=True):
+                data = [0] * 100000
+        finally:
+            tracemalloc.stop()
+        stats = profiler.snapshot()
+        assert stats["alloc.alloc_kb"]["max"] > 100
+        del data
+
+    def test_disabled_profiler_records_nothing(self):
+        """Test disabled profiler skips all recording"""
+        profiler = AdaptiveProfiler(enabled=False)
+
+        @profiled("fn", profiler=profiler)
+        def fn():
+            return 42
+
+        with profiler.span("work"):
+            pass
+        assert fn() == 42
+        assert set(profiler.snapshot()) == {"tags", "adaptive_hints"}
+
+    def test_profiled_sync_and_async(self):
+        """Test decorator supports sync and async callables"""
+        profiler = AdaptiveProfiler()
+
+        @profiled("sync_fn", profiler=profiler)
+        def sync_fn(x):
+            return x * 2
+
+        @profiled("async_fn", profiler=profiler)
+        async def async_fn(x):
+            await asyncio.sleep(0)
+            return x + 1
+
+        assert sync_fn(2) == 4
+        assert asyncio.run(async_fn(2)) == 3
+        assert sync_fn.__name__ == "sync_fn"
+        stats = profiler.snapshot()
+        assert stats["sync_fn.wall_ms"]["count"] == 1
+        assert stats["async_fn.wall_ms"]["count"] == 1
+
+@pytest.mark.unit
+@pytest.mark.observability
+class TestOpenMetricsExporter:
+    def test_render_is_precomputed(self):
+        """Test payload only changes on refresh, not on scrape"""
+        profiler = AdaptiveProfiler()
+        exporter = OpenMetricsExporter(profiler)
+        assert exporter.render() == b"# EOF\n"
+        profiler.observe("latency_ms", 3.0)
+        assert exporter.render() == b"# EOF\n"
+        payload = exporter.refresh().decode()
+        assert '# TYPE agentic_latency_ms histogram' in payload
+        assert 'agentic_latency_ms_bucket{le="5.0"} 1' in payload
+        assert 'agentic_latency_ms_count 1' in payload
+        assert payload.endswith("# EOF\n")
+
+    def test_histograms_are_cumulative_beyond_window(self):
+        """Test histogram counts keep growing after the window is full"""
+        profiler = AdaptiveProfiler(window_size=5)
+        exporter = OpenMetricsExporter(profiler)
+        for _ in range(20):
+            profiler.observe("api.call.wall_ms", 2000.0)
+        payload = exporter.refresh().decode()
+        assert 'agentic_api_call_wall_ms_count 20' in payload
+        assert 'agentic_api_call_wall_ms_bucket{le="1000.0"} 0' in payload
+        assert 'agentic_profiler_observations_total 20' in payload
+
+    def test_hints_and_tags_exported(self):
+        """Test adaptive hints and tags are rendered"""
+        profiler = AdaptiveProfiler()
+        exporter = OpenMetricsExporter(profiler)
+        profiler.set_tag("node", "worker-1")
+        profiler.observe("success_rate", 0.2)
+        payload = exporter.refresh().decode()
+        assert 'agentic_adaptive_hint{hint="increase_exploration"} 1.0' in payload
+        assert 'agentic_profiler_tags_info{node="worker-1"} 1' in payload
+
+    def test_allocation_deltas_are_split_counters(self):
+        """Test signed allocation deltas never produce a negative histogram sum"""
+        profiler = AdaptiveProfiler()
+        exporter = OpenMetricsExporter(profiler)
+        for value in (12.0, -30.0, 4.0):
+            profiler.observe("api.call.alloc_kb", value)
+        payload = exporter.refresh().decode()
+        assert "alloc_kb_sum" not in payload
+        assert '# TYPE agentic_api_call_allocated_kb counter' in payload
+        assert 'agentic_api_call_allocated_kb_total 16.0' in payload
+        assert 'agentic_api_call_freed_kb_total 30.0' in payload
+
+    def test_colliding_names_are_disambiguated(self):
+        """Test names that sanitize alike get distinct families"""
+        profiler = AdaptiveProfiler()
+        exporter = OpenMetricsExporter(profiler)
+        profiler.observe("a.b", 1.0)
+        profiler.observe("a_b", 2.0)
+        profiler.observe("profiler.window", 3.0)
+        payload = exporter.refresh().decode()
+        families = [line.split()[2] for line in payload.splitlines() if line.startswith("# TYPE")]
+        assert len(families) == len(set(families))
+        assert "agentic_a_b" in families
+        assert exporter.refresh().decode() == payload
+
+    def test_sample_names_do_not_clash(self):
+        """Test a family never reuses another family's _count/_sum/_total sample name"""
+        profiler = AdaptiveProfiler()
+        exporter = OpenMetricsExporter(profiler)
+        profiler.observe("foo", 1.0)
+        profiler.observe("foo.count", 2.0)
+        profiler.observe("profiler.observations.total", 3.0)
+        payload = exporter.refresh().decode()
+        owners = {}
+        for line in payload.splitlines():
+            if line.startswith("# TYPE"):
+                family = line.split()[2]
+            elif not line.startswith("#"):
+                sample = line.split("{")[0].split()[0]
+                assert owners.setdefault(sample, family) == family
+        assert "agentic_foo_count 1" in payload
+        assert "agentic_foo_count_bucket" not in payload
+
+    def test_tag_keys_are_valid_label_names(self):
+        """Test tag keys are sanitized to unique [a-zA-Z_][a-zA-Z0-9_]* label names"""
+        profiler = AdaptiveProfiler()
+        exporter = OpenMetricsExporter(profiler)
+        profiler.set_tag("9zone", "eu")
+        profiler.set_tag("a.b", "1")
+        profiler.set_tag("a-b", "2")
+        payload = exporter.refresh().decode()
+        line = next(l for l in payload.splitlines() if l.startswith("agentic_profiler_tags_info"))
+        labels = [pair.split("=")[0] for pair in line[line.index("{") + 1:line.index("}")].split(",")]
+        assert all(re.fullmatch(r"[a-zA-Z_][a-zA-Z0-9_]*", label) for label in labels)
+        assert len(set(labels)) == 3 and "_9zone" in labels
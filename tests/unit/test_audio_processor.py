@@ -0,0 +1,445 @@
+"""
+Unit tests for audio_processor.py - local audio decoding and analysis
+"""
+import pytest
+import sys
+import os
+import tempfile
+import wave
+from pathlib import Path
+import asyncio
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'src', 'backend', 'reasoning-engine-python'))
+from multimodal.audio import audio_io, audio_processor
+from multimodal.audio.audio_processor import AudioProcessor
+from multimodal.audio.audio_io import SAMPLE_RATE, decode_audio, decode_to_memmap
+from multimodal.audio.streaming import StreamingTranscriber
+from multimodal.audio.vad import StreamingVAD, detect_segments
+from multimodal.audio.batch import BUCKETS, plan_spans
+from multimodal.multimodal_engine import MultiModalEngine
+
+def _write_wav(path, samples, rate=SAMPLE_RATE, channels=1):
+    pcm = (np.clip(samples, -1, 1) * 32767).astype('<i2')
+    if channels > 1:
+        pcm = np.repeat(pcm[:, None], channels, axis=1)
+    with wave.open(str(path), 'wb') as f:
+        f.setnchannels(channels)
+        f.setsampwidth(2)
+        f.setframerate(rate)
+        f.writeframes(pcm.tobytes())
+    return path
+
+def _speech_like(rate=SAMPLE_RATE, pattern=((0.5, False), (1.0, True), (0.5, False), (0.8, True), (0.5, False))):
+    """Tone bursts separated by near-silence; returns (samples, voiced (start, end) list)"""
+    rng = np.random.default_rng(0)
+    parts, voiced, t = [], [], 0.0
+    for seconds, voice in pattern:
+        n = int(seconds * rate)
+        tone = 0.4 * np.sin(2 * np.pi * 220 * np.arange(n) / rate) if voice else 0.0
+        parts.append(tone + 0.002 * rng.standard_normal(n))
+        if voice:
+            voiced.append((t, t + seconds))
+        t += seconds
+    return np.concatenate(parts), voiced
+
+class _FakeWhisper:
+    def __init__(self):
+        self.inputs = []
+
+    def transcribe(self, audio, language=None, fp16=True):
+        self.inputs.append(audio)
+        return {"text": "hello", "language": "en", "segments": [{"avg_logprob": -0.1}]}
+
+@pytest.mark.unit
+class TestSingleDecode:
+    def test_resampled_stereo_matches_duration(self, tmp_path):
+        """Test 44.1 kHz stereo decodes to 16 kHz mono of the same duration"""
+        samples, _ = _speech_like(rate=44100)
+        path = _write_wav(tmp_path / "a.wav", samples, rate=44100, channels=2)
+        audio = decode_audio(path)
+        assert audio.samples.dtype == np.float32
+        assert audio.source_rate == 44100 and audio.channels == 2
+        assert abs(audio.duration - len(samples) / 44100) < 0.001
+
+    def test_chunked_decode_matches_whole(self, tmp_path, monkeypatch):
+        """Test block-wise resampling equals resampling the whole file"""
+        samples, _ = _speech_like(rate=22050)
+        path = _write_wav(tmp_path / "a.wav", samples, rate=22050)
+        whole = decode_audio(path).samples
+        monkeypatch.setattr(audio_io, "_CHUNK_FRAMES", 4099)
+        chunked = decode_audio(path).samples
+        assert len(chunked) == len(whole)
+        assert np.abs(chunked - whole).max() < 1e-5
+
+    def test_memmap_path_matches_and_is_reused(self, tmp_path):
+        """Test the memory-mapped decode equals the in-memory one and is cached"""
+        samples, _ = _speech_like()
+        path = _write_wav(tmp_path / "a.wav", samples)
+        mapped = decode_to_memmap(path, tmp_path / "cache")
+        assert mapped.memory_mapped
+        assert np.array_equal(np.asarray(mapped.samples), decode_audio(path).samples)
+        files = sorted(p.name for p in (tmp_path / "cache").iterdir())
+        decode_to_memmap(path, tmp_path / "cache")
+        assert sorted(p.name for p in (tmp_path / "cache").iterdir()) == files
+
+    def test_resampling_rejects_aliases(self):
+        """Test tones above 8 kHz are filtered out instead of folding down"""
+        for rate in (44100, 48000):
+            t = np.arange(rate) / rate
+            for freq, expect_kept in ((1000, True), (11000, False), (14000, False)):
+                tone = np.sin(2 * np.pi * freq * t).astype(np.float32)
+                out = audio_io._resample(tone, rate)[1000:-1000]
+                gain = np.sqrt(np.mean(out ** 2)) / np.sqrt(0.5)
+                assert (abs(gain - 1) < 0.01) if expect_kept else (gain < 0.01)
+
+    def test_memmap_cache_is_capped(self, tmp_path):
+        """Test old decodes are evicted once the cache exceeds its size cap"""
+        samples, _ = _speech_like()
+        paths = [_write_wav(tmp_path / f"{i}.wav", samples) for i in range(3)]
+        one_file = len(decode_audio(paths[0]).samples) * 4
+        for path in paths:
+            mapped = decode_to_memmap(path, tmp_path / "cache", max_cache_bytes=2 * one_file)
+        assert len(list((tmp_path / "cache").glob("*.f32"))) == 2
+        assert len(list((tmp_path / "cache").glob("*.json"))) == 2
+        assert np.array_equal(np.asarray(mapped.samples), decode_audio(paths[-1]).samples)
+
+    def test_default_memmap_cache_is_private(self, tmp_path):
+        """Test decodes without a cache_dir go to a per-process 0700 directory"""
+        samples, _ = _speech_like()
+        mapped = decode_to_memmap(_write_wav(tmp_path / "a.wav", samples))
+        cache_dir = Path(mapped.samples.filename).parent
+        assert cache_dir == audio_io._session_cache_dir()
+        assert cache_dir.parent == Path(tempfile.gettempdir())
+        if os.name == 'posix':
+            assert cache_dir.stat().st_mode & 0o777 == 0o700
+
+    @pytest.mark.skipif(os.name != 'posix', reason="POSIX permissions")
+    def test_shared_memmap_cache_is_refused(self, tmp_path):
+        """Test a cache_dir other users can access is rejected"""
+        samples, _ = _speech_like()
+        path = _write_wav(tmp_path / "a.wav", samples)
+        shared = tmp_path / "shared"
+        shared.mkdir()
+        shared.chmod(0o777)
+        with pytest.raises(PermissionError):
+            decode_to_memmap(path, shared)
+        assert list(shared.iterdir()) == []
+
+    def test_failed_decode_leaves_no_temp_file(self, tmp_path, monkeypatch):
+        """Test a decode error removes the partial output"""
+        samples, _ = _speech_like()
+        path = _write_wav(tmp_path / "a.wav", samples)
+
+        def broken(_):
+            def chunks():
+                yield np.zeros(16, dtype=np.float32)
+                raise ValueError("corrupt stream")
+            return SAMPLE_RATE, 1, chunks()
+
+        monkeypatch.setattr(audio_io, "iter_audio", broken)
+        with pytest.raises(ValueError):
+            decode_to_memmap(path, tmp_path / "cache")
+        assert list((tmp_path / "cache").iterdir()) == []
+
+    def test_transcription_decodes_once(self, tmp_path, monkeypatch):
+        """Test Whisper, features and VAD share one decoded buffer"""
+        samples, _ = _speech_like(rate=44100)
+        path = _write_wav(tmp_path / "a.wav", samples, rate=44100)
+        decodes = []
+        real_decode = audio_processor.decode_audio
+
+        def counting_decode(p):
+            decodes.append(p)
+            return real_decode(p)
+
+        monkeypatch.setattr(audio_processor, "decode_audio", counting_decode)
+        fake = _FakeWhisper()
+        monkeypatch.setattr(AudioProcessor, "whisper_model", property(lambda self: fake))
+        processor = AudioProcessor()
+        processor.stt_available = True
+
+        audio = processor.load_audio(str(path))
+        result = processor.transcribe_audio(audio)
+        processor.detect_voice_activity(audio)
+        assert len(decodes) == 1
+        assert isinstance(fake.inputs[0], np.ndarray) and fake.inputs[0].dtype == np.float32
+        assert result.sample_rate == 44100
+        assert abs(result.duration - len(samples) / 44100) < 0.001
+
+    def test_large_files_are_memory_mapped(self, tmp_path):
+        """Test files above the threshold take the memory-mapped path"""
+        samples, _ = _speech_like()
+        path = _write_wav(tmp_path / "a.wav", samples)
+        processor = AudioProcessor(mmap_threshold_bytes=1024, mmap_dir=str(tmp_path / "cache"))
+        assert processor.load_audio(str(path)).memory_mapped
+        assert not processor.load_audio(str(path), mmap=False).memory_mapped
+
+
+def _replay(path, chunk_sec=0.1):
+    """Replay a WAV file as a local stream of raw int16 chunks"""
+    with wave.open(str(path), 'rb') as f:
+        frames = int(chunk_sec * f.getframerate())
+        while True:
+            raw = f.readframes(frames)
+            if not raw:
+                return
+            yield raw
+
+def _describe(samples, prompt):
+    """Stand-in model: reports the window length in milliseconds"""
+    return f"{len(samples) * 1000 // SAMPLE_RATE}ms"
+
+@pytest.mark.unit
+class TestStreamingTranscription:
+    def test_wav_replay_yields_partials_then_finals(self, tmp_path):
+        """Test each utterance gets partials and one final aligned to the speech"""
+        samples, voiced = _speech_like()
+        path = _write_wav(tmp_path / "a.wav", samples)
+        segments = list(StreamingTranscriber(_describe).stream(_replay(path)))
+
+        finals = [s for s in segments if s.final]
+        assert len(finals) == len(voiced)
+        for segment, (start, end) in zip(finals, voiced):
+            assert abs(segment.start - start) < 0.25 and abs(segment.end - end) < 0.1
+        assert any(not s.final for s in segments)
+        ends = [s.end for s in segments]
+        assert ends == sorted(ends)
+
+    def test_first_partial_latency(self, tmp_path):
+        """Test the first partial covers less than a second of speech"""
+        samples, voiced = _speech_like()
+        path = _write_wav(tmp_path / "a.wav", samples)
+        first = next(StreamingTranscriber(_describe).stream(_replay(path)))
+        assert not first.final
+        assert first.end - voiced[0][0] < 1.0
+
+    def test_long_utterance_uses_overlapping_windows(self):
+        """Test speech longer than the window is finalized in overlapping pieces"""
+        samples, _ = _speech_like(pattern=((0.3, False), (5.0, True), (0.6, False)))
+        chunks = np.array_split(samples, 50)
+        transcriber = StreamingTranscriber(_describe, window_sec=2.0, overlap_sec=0.5)
+        finals = [s for s in transcriber.stream(chunks) if s.final]
+        assert len(finals) >= 3
+        for a, b in zip(finals, finals[1:]):
+            assert b.start < a.end
+            assert a.end - a.start <= 2.0 + 0.03  # one frame of slack
+
+    def test_busy_model_skips_partials(self):
+        """Test partials are dropped while the model is busy, never queued"""
+        samples, voiced = _speech_like(pattern=((0.2, False), (3.0, True), (0.6, False)))
+        calls = []
+
+        def slow(samples, prompt):
+            calls.append(len(samples))
+            time.sleep(0.05)
+            return "x"
+
+        chunks = np.array_split(samples, 100)
+        segments = list(StreamingTranscriber(slow, partial_interval_sec=0.06).stream(chunks))
+        # One partial per interval would be ~50 calls; a busy model gets far fewer
+        assert len(calls) < 40
+        assert segments[-1].final
+
+    def test_resampled_stream_is_seamless(self):
+        """Test a 44.1 kHz stream in small chunks resamples like the whole signal"""
+        rate = 44100
+        t = np.arange(10 * rate) / rate
+        tone = (0.5 * np.sin(2 * np.pi * 440 * t)).astype(np.float32)
+        whole = audio_io._resample(tone, rate)
+        transcriber = StreamingTranscriber(_describe, sample_rate=rate)
+        streamed = np.concatenate([transcriber._to_samples(tone[i:i + 1024])
+                                   for i in range(0, len(tone), 1024)]
+                                  + [transcriber._resampler.flush()])
+        assert len(streamed) == len(whole) == 160000
+        assert np.abs(streamed - whole).max() < 1e-5
+
+        samples, voiced = _speech_like(rate=rate)
+        finals = [s for s in StreamingTranscriber(_describe, sample_rate=rate).stream(
+            samples[i:i + 1024] for i in range(0, len(samples), 1024)) if s.final]
+        assert len(finals) == len(voiced)
+        assert abs(finals[-1].end - voiced[-1][1]) < 0.1
+
+    def test_async_stream_and_prompt_context(self):
+        """Test async chunk sources and that finals prime the next window"""
+        samples, voiced = _speech_like()
+        prompts = []
+
+        def model(audio, prompt):
+            prompts.append(prompt)
+            return f"utterance{len(prompts)}"
+
+        async def source():
+            for chunk in np.array_split((samples * 32767).astype(np.int16), 40):
+                yield chunk
+                await asyncio.sleep(0)
+
+        async def collect():
+            return [s async for s in StreamingTranscriber(model).astream(source())]
+
+        segments = asyncio.run(collect())
+        assert sum(s.final for s in segments) == len(voiced)
+        assert prompts[-1].startswith("utterance")
+
+    def test_processor_requires_local_model(self, monkeypatch):
+        """Test realtime transcription runs through the cached Whisper model"""
+        processor = AudioProcessor()
+        processor.stt_available = False
+        with pytest.raises(RuntimeError):
+            processor.transcribe_realtime(iter([]))
+
+        class Model:
+            def transcribe(self, audio, **kwargs):
+                return {"text": f" {kwargs['language']} "}
+
+        monkeypatch.setattr(AudioProcessor, "whisper_model", property(lambda self: Model()))
+        processor.stt_available = True
+        samples, voiced = _speech_like(rate=8000)
+        chunks = np.array_split(samples.astype(np.float32), 30)
+        segments = list(processor.transcribe_realtime(chunks, sample_rate=8000, language="en"))
+        assert segments and all(s.text == "en" for s in segments)
+        assert sum(s.final for s in segments) == len(voiced)
+
+
+@pytest.mark.unit
+class TestVoiceActivity:
+    def _assert_matches(self, segments, voiced, tolerance=0.05):
+        assert len(segments) == len(voiced)
+        for segment, (start, end) in zip(segments, voiced):
+            assert abs(segment["start"] - start) < tolerance
+            assert abs(segment["end"] - end) < tolerance
+
+    def test_segments_follow_speech(self):
+        """Test tone bursts are found with tight boundaries"""
+        samples, voiced = _speech_like()
+        self._assert_matches(detect_segments(samples), voiced)
+
+    def test_adapts_to_loud_background(self):
+        """Test a noisy floor is not mistaken for speech"""
+        samples, voiced = _speech_like()
+        noise = 0.05 * np.random.default_rng(1).standard_normal(len(samples))
+        self._assert_matches(detect_segments(samples + noise), voiced)
+
+    def test_continuous_tone_is_voiced(self):
+        """Test audio that opens with sustained sound is not taken for the floor"""
+        samples, voiced = _speech_like(pattern=((3.0, True),))
+        self._assert_matches(detect_segments(samples), voiced)
+        vad = StreamingVAD()
+        streamed = [s for start in range(0, len(samples), 1600) for s in vad.feed(samples[start:start + 1600])]
+        streamed += vad.flush()
+        self._assert_matches(streamed, voiced)
+
+    def test_hangover_and_minimum_length(self):
+        """Test short pauses are bridged and short blips dropped"""
+        samples, _ = _speech_like(pattern=((0.5, False), (0.6, True), (0.1, False), (0.6, True),
+                                           (0.5, False), (0.05, True), (0.5, False)))
+        segments = detect_segments(samples)
+        assert len(segments) == 1
+        assert abs(segments[0]["start"] - 0.5) < 0.05 and abs(segments[0]["end"] - 1.8) < 0.05
+        assert len(detect_segments(samples, hangover_sec=0.05)) == 2
+
+    def test_streaming_matches_whole_recording(self):
+        """Test chunked feeding carries open segments across chunk boundaries"""
+        samples, voiced = _speech_like()
+        vad = StreamingVAD()
+        streamed = []
+        rng = np.random.default_rng(2)
+        position = 0
+        while position < len(samples):
+            size = int(rng.integers(50, 3000))
+            streamed.extend(vad.feed(samples[position:position + size]))
+            position += size
+        streamed.extend(vad.flush())
+        self._assert_matches(streamed, voiced)
+
+    def test_processor_uses_shared_buffer(self, tmp_path):
+        """Test detect_voice_activity runs on a decoded file"""
+        samples, voiced = _speech_like(rate=44100)
+        path = _write_wav(tmp_path / "a.wav", samples, rate=44100)
+        self._assert_matches(AudioProcessor().detect_voice_activity(str(path)), voiced)
+
+    @pytest.mark.slow
+    def test_hour_of_audio_is_fast(self):
+        """Test an hour of 16 kHz audio is segmented in seconds"""
+        samples, _ = _speech_like()
+        hour = np.tile(samples.astype(np.float32), int(3600 / (len(samples) / SAMPLE_RATE)))
+        start = time.perf_counter()
+        segments = detect_segments(hour)
+        assert time.perf_counter() - start < 10.0
+        assert len(segments) > 2000
+
+
+def _fake_batch(segments, options):
+    """Stand-in batch model (module level so worker processes can import it)"""
+    lengths = [len(segment) / SAMPLE_RATE for segment in segments]
+    return [{"text": f"{length:.1f}s|" + ",".join(f"{l:.0f}" for l in lengths),
+             "avg_logprob": -0.1, "language": "en"} for length in lengths]
+
+def _bucket(seconds):
+    return next(i for i, bound in enumerate(BUCKETS) if seconds <= bound + 0.25)
+
+@pytest.mark.unit
+class TestBatchTranscription:
+    def _corpus(self, tmp_path):
+        patterns = {
+            "short.wav": ((0.3, False), (0.6, True), (0.4, False), (0.7, True), (0.3, False)),
+            "long.wav": ((0.3, False), (6.0, True), (0.5, False), (1.0, True), (0.3, False)),
+            "silent.wav": ((2.0, False),),
+        }
+        paths = []
+        for name, pattern in patterns.items():
+            samples, _ = _speech_like(pattern=pattern)
+            paths.append(str(_write_wav(tmp_path / name, samples)))
+        return paths
+
+    def test_plan_merges_and_splits(self):
+        """Test nearby segments share a span, distant ones do not, and long ones are split"""
+        voiced = [{"start": 1.0, "end": 2.0}, {"start": 3.0, "end": 4.0}, {"start": 10.0, "end": 75.0}]
+        spans = plan_spans(voiced, duration=80.0, max_span_sec=30.0)
+        assert spans[0] == (0.9, 4.1)
+        assert len(spans) == 4
+        assert all(b - a <= 30.0 + 1e-9 for a, b in spans)
+        assert spans[-1][1] == pytest.approx(75.1)
+        far_apart = plan_spans([{"start": 1.0, "end": 2.0}, {"start": 6.0, "end": 7.0}], duration=10.0)
+        assert far_apart == [(0.9, 2.1), (5.9, 7.1)]
+
+    def test_batches_are_length_bucketed(self, tmp_path):
+        """Test every batch holds similar-length segments from any file"""
+        processor = AudioProcessor()
+        results = {Path(r.audio_path).name: r for r in processor.transcribe_many(
+            self._corpus(tmp_path), batch_size=2, use_processes=False, engine=_fake_batch)}
+        assert set(results) == {"short.wav", "long.wav", "silent.wav"}
+        assert results["silent.wav"].transcription == ""
+        for result in results.values():
+            for segment in result.audio_features["segments"]:
+                batch = [float(l) for l in segment["text"].split("|")[1].split(",")]
+                assert len({_bucket(l) for l in batch}) == 1
+        long_segments = results["long.wav"].audio_features["segments"]
+        assert [s["start"] for s in long_segments] == sorted(s["start"] for s in long_segments)
+        assert results["long.wav"].language == "en"
+        assert results["long.wav"].sample_rate == SAMPLE_RATE
+
+    def test_worker_processes(self, tmp_path):
+        """Test batches run on worker processes and stream back per file"""
+        paths = self._corpus(tmp_path)
+        results = list(AudioProcessor().transcribe_many(paths, workers=2, engine=_fake_batch))
+        assert sorted(Path(r.audio_path).name for r in results) == ["long.wav", "short.wav", "silent.wav"]
+
+    def test_engine_batches_audio_in_directories(self, tmp_path):
+        """Test analyze_directory routes audio files through the batch scheduler"""
+        self._corpus(tmp_path)
+        engine = MultiModalEngine()
+        engine.audio_processor.stt_available = True
+        results = engine.analyze_directory(tmp_path, audio_options={"engine": _fake_batch, "use_processes": False})
+        assert sorted(r.input_path.name for r in results) == ["long.wav", "short.wav", "silent.wav"]
+        assert all(r.input_type == "audio" and r.audio_analysis for r in results)
+
+    def test_directory_ignores_pipeline_options(self, tmp_path):
+        """Test pipeline options meant for iter_directory do not reach the VAD"""
+        self._corpus(tmp_path)
+        engine = MultiModalEngine()
+        engine.audio_processor.stt_available = True
+        results = engine.analyze_directory(tmp_path, max_workers=2,
+                                           audio_options={"engine": _fake_batch, "use_processes": False})
+        assert len(results) == 3
@@ -0,0 +1,65 @@
+"""
+Unit tests for context_adapter.py - context detection and adaptation
+"""
+import pytest
+import sys
+import os
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'src', 'backend', 'reasoning-engine-python'))
+from learning.context_adapter import ContextAdapter, Context, AdaptationStrategy
+
+@pytest.mark.unit
+class TestContextHistory:
+    def test_history_is_bounded(self):
+        """Test history keeps at most history_size contexts"""
+        adapter = ContextAdapter(history_size=5)
+        for i in range(20):
+            adapter.detect_context({"device": "mobile" if i % 2 else "desktop"})
+        stats = adapter.get_context_statistics()
+        assert len(adapter.context_history) == 5
+        assert stats['total_contexts'] == 5
+        assert sum(stats['device_type'].values()) == 5
+        assert stats['device_type'] == {"desktop": 2, "mobile": 3}
+
+    def test_history_is_time_windowed(self):
+        """Test contexts older than the window are expired with their counts"""
+        adapter = ContextAdapter(history_window_sec=60)
+        old = datetime.now() - timedelta(minutes=5)
+        adapter._record(Context(device_type="tv", timestamp=old))
+        adapter.detect_context({"device": "mobile"})
+        stats = adapter.get_context_statistics()
+        assert stats['total_contexts'] == 1
+        assert "tv" not in stats['device_type']
+
+    def test_detected_timestamp_matches_time_category(self):
+        """Test one clock reading drives both timestamp and time of day"""
+        adapter = ContextAdapter()
+        context = adapter.detect_context()
+        assert context.time_of_day == adapter._get_time_category(context.timestamp)
+
+@pytest.mark.unit
+class TestStrategySelection:
+    def test_strategy_rules(self):
+        """Test strategy rules are applied in priority order"""
+        adapter = ContextAdapter()
+        assert adapter.select_strategy("t", Context(device_type="mobile", time_of_day="night")) \
+            == AdaptationStrategy.CONCISE
+        assert adapter.select_strategy("t", Context(device_type="desktop", time_of_day="night")) \
+            == AdaptationStrategy.CAUTIOUS
+        assert adapter.select_strategy("t", Context(time_of_day="morning", user_sentiment="frustrated")) \
+            == AdaptationStrategy.REACTIVE
+        assert adapter.select_strategy("t", Context(time_of_day="morning", task_complexity="high")) \
+            == AdaptationStrategy.VERBOSE
+        assert adapter.select_strategy("t", Context(time_of_day="morning")) \
+            == AdaptationStrategy.CONFIDENT
+
+    def test_adapt_many_matches_single(self):
+        """Test batch adaptation equals per-action adaptation"""
+        adapter = ContextAdapter()
+        context = Context(device_type="mobile")
+        actions = [{"task": "search", "max_tokens": 400}, {"task": "summarize"}, {}]
+        strategy = adapter.select_strategy("search", context)
+        expected = [adapter.apply_adaptation(a, strategy) for a in actions]
+        assert adapter.adapt_many(actions, context) == expected
+        assert actions[0]["max_tokens"] == 400
@@ -0,0 +1,161 @@
+"""
+Unit tests for learning_storage.py - key-value backends for learning data
+"""
+import pytest
+import sys
+import os
+import logging
+import random
+import subprocess
+from datetime import datetime
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'src', 'backend', 'reasoning-engine-python'))
+from storage.learning_storage import InMemoryStorage, SQLiteStorage
+
+@pytest.mark.unit
+class TestPackage:
+    def test_duckdb_is_imported_lazily(self):
+        """Test importing the storage package does not load duckdb"""
+        code = ("import sys, storage; assert 'duckdb' not in sys.modules; "
+                "storage.ShardedProfileStore; assert 'duckdb' in sys.modules")
+        root = os.path.join(os.path.dirname(__file__), '..', '..', 'src', 'backend', 'reasoning-engine-python')
+        subprocess.run([sys.executable, "-c", code], cwd=root, check=True)
+
+@pytest.mark.unit
+class TestInMemoryStorage:
+    def test_prefix_listing_matches_scan(self):
+        """Test indexed prefix listing equals a filtered scan under churn"""
+        rng = random.Random(4)
+        storage = InMemoryStorage()
+        live = set()
+        for i in range(5000):
+            key = f"pref:u{rng.randrange(50)}:k{rng.randrange(40)}"
+            if rng.random() < 0.3:
+                assert storage.delete(key) == (key in live)
+                live.discard(key)
+            else:
+                storage.store(key, i)
+                live.add(key)
+            if i % 500 == 0:
+                prefix = f"pref:u{rng.randrange(50)}:"
+                assert storage.list_keys(prefix) == sorted(k for k in live if k.startswith(prefix))
+        assert storage.list_keys() == sorted(live)
+        assert storage.list_keys("pref:u1") == sorted(k for k in live if k.startswith("pref:u1"))
+
+    def test_store_list_alternation_does_not_rebuild_index(self):
+        """Test interleaved stores, deletes and listings stay correct without re-sorting"""
+        storage = InMemoryStorage()
+        live = {f"pref:u{i % 100}:k{i}" for i in range(10000)}
+        for key in live:
+            storage.store(key, 1)
+        storage.list_keys("pref:u0:")
+        index = storage._sorted_keys
+        for i in range(500):
+            added, removed = f"pref:u{i % 100}:new{i}", f"pref:u{i % 100}:k{i}"
+            storage.store(added, 2)
+            storage.delete(removed)
+            live.add(added)
+            live.discard(removed)
+            prefix = f"pref:u{i % 100}:"
+            assert storage.list_keys(prefix) == sorted(k for k in live if k.startswith(prefix))
+        assert storage._sorted_keys is index
+        assert storage.list_keys() == sorted(live)
+
+    def test_clear_resets_index(self):
+        """Test clear drops indexed and pending keys"""
+        storage = InMemoryStorage()
+        storage.store("a", 1)
+        storage.list_keys()
+        storage.store("b", 2)
+        storage.clear()
+        assert storage.list_keys() == []
+
+    @pytest.mark.slow
+    def test_prefix_listing_is_logarithmic(self):
+        """Test per-user listing over 1M keys probes O(log n) keys, not a scan"""
+        logging.getLogger("storage.learning_storage").setLevel(logging.WARNING)
+
+        class ProbeCounter(list):
+            probes = 0
+
+            def __getitem__(self, index):
+                if not isinstance(index, slice):
+                    ProbeCounter.probes += 1
+                return super().__getitem__(index)
+
+        storage = InMemoryStorage()
+        for i in range(1000000):
+            storage.store(f"pref:user_{i % 20000}:key_{i // 20000}", i)
+        storage.list_keys("pref:user_0:")  # merge the bulk load
+        storage._sorted_keys = ProbeCounter(storage._sorted_keys)
+        for u in range(1000):
+            keys = storage.list_keys(f"pref:user_{u}:")
+            assert len(keys) == 50
+        # Two binary searches of ~20 probes each per call
+        assert ProbeCounter.probes / 1000 <= 2 * 21
+
+@pytest.mark.unit
+class TestSQLiteStorage:
+    def test_non_json_values_are_rejected(self, tmp_path):
+        """Test values JSON cannot round-trip fail the write instead of becoming strings"""
+        storage = SQLiteStorage(str(tmp_path / "kv.db"))
+        for value in (datetime(2024, 1, 1), {1, 2}, np.float32(0.5)):
+            with pytest.raises(TypeError):
+                storage.store_many([("ok", 1), ("bad", value)])
+        assert storage.list_keys() == []
+
+    def test_store_retrieve_delete(self, tmp_path):
+        """Test basic operations and JSON value round-trip"""
+        storage = SQLiteStorage(str(tmp_path / "kv.db"))
+        storage.store("pref:u1:theme", {"mode": "dark", "size": 12})
+        assert storage.retrieve("pref:u1:theme") == {"mode": "dark", "size": 12}
+        assert storage.retrieve("missing") is None
+        assert storage.delete("pref:u1:theme") is True
+        assert storage.delete("pref:u1:theme") is False
+        assert storage.retrieve("pref:u1:theme") is None
+        storage.close()
+
+    def test_values_survive_restart(self, tmp_path):
+        """Test data is durable across connections"""
+        path = str(tmp_path / "kv.db")
+        storage = SQLiteStorage(path)
+        storage.store_many([(f"k{i}", i) for i in range(100)])
+        storage.close()
+        reopened = SQLiteStorage(path, cache_size=0)
+        assert reopened.retrieve("k42") == 42
+        assert len(reopened.list_keys()) == 100
+        reopened.close()
+
+    def test_prefix_scan_is_sorted_and_exact(self, tmp_path):
+        """Test prefix listing returns only matching keys in order"""
+        storage = SQLiteStorage(str(tmp_path / "kv.db"))
+        storage.store_many([("pref:u2:b", 1), ("pref:u1:z", 1), ("pref:u1:a", 1),
+                            ("pref:u10:a", 1), ("pref:u1", 1), ("q", 1)])
+        assert storage.list_keys("pref:u1:") == ["pref:u1:a", "pref:u1:z"]
+        assert storage.list_keys("pref:u1") == ["pref:u1", "pref:u10:a", "pref:u1:a", "pref:u1:z"]
+        assert storage.list_keys() == sorted(storage.list_keys())
+        storage.close()
+
+    def test_retrieve_many_and_cache_bound(self, tmp_path):
+        """Test batched lookups mix cached and stored values"""
+        storage = SQLiteStorage(str(tmp_path / "kv.db"), cache_size=10)
+        storage.store_many([(f"k{i:04d}", i) for i in range(1200)])
+        assert len(storage._cache) == 10
+        result = storage.retrieve_many([f"k{i:04d}" for i in range(0, 1200, 2)] + ["nope"])
+        assert len(result) == 600
+        assert result["k1198"] == 1198
+        assert len(storage._cache) == 10
+        storage.close()
+
+    def test_cached_values_are_not_shared(self, tmp_path):
+        """Test cache hits return the stored JSON, not the caller's object"""
+        storage = SQLiteStorage(str(tmp_path / "kv.db"))
+        value = {"tags": ("a", "b")}
+        storage.store("k", value)
+        value["tags"] = ("c",)
+        first = storage.retrieve("k")
+        assert first == {"tags": ["a", "b"]}
+        first["tags"].append("x")
+        assert storage.retrieve("k") == {"tags": ["a", "b"]}
+        storage.close()
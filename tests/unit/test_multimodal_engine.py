@@ -0,0 +1,288 @@
+"""
+Unit tests for multimodal_engine.py - lazy analyzers and model cache
+"""
+import pytest
+import sys
+import os
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'src', 'backend', 'reasoning-engine-python'))
+from multimodal.multimodal_engine import MultiModalEngine
+from multimodal.analysis_cache import AnalysisCache
+from multimodal import analysis_cache, model_cache
+
+@pytest.mark.unit
+class TestLazyAnalyzers:
+    def test_no_analyzers_at_init(self):
+        """Test engine construction creates no analyzers"""
+        engine = MultiModalEngine()
+        assert engine._analyzers == {}
+
+    def test_only_used_modality_is_created(self, tmp_path):
+        """Test analyzing code instantiates only the code analyzer"""
+        source = tmp_path / "sample.py"
+        source.write_text("def f():\n    return 1\n")
+        engine = MultiModalEngine()
+        result = engine.analyze(source)
+        assert result.input_type == "code"
+        assert set(engine._analyzers) == {"code"}
+        assert engine.code_analyzer is engine.get_analyzer("code")
+
+    def test_warmup_selected_modalities(self):
+        """Test warmup creates requested analyzers and reports readiness"""
+        engine = MultiModalEngine()
+        status = engine.warmup(modalities=["code", "document"])
+        assert status == {"code": True, "document": True}
+        assert set(engine._analyzers) == {"code", "document"}
+        with pytest.raises(ValueError):
+            engine.warmup(modalities=["smell"])
+
+@pytest.mark.unit
+class TestModelCache:
+    def test_model_shared_across_callers(self):
+        """Test a model is loaded once and shared"""
+        model_cache.clear_model_cache()
+        loads = []
+
+        def loader():
+            loads.append(1)
+            return object()
+
+        first = model_cache.get_model(("test", 1), loader)
+        assert model_cache.get_model(("test", 1), loader) is first
+        assert loads == [1]
+        assert model_cache.is_loaded(("test", 1))
+        model_cache.clear_model_cache()
+        assert not model_cache.is_loaded(("test", 1))
+
+    def test_concurrent_first_use_loads_once(self):
+        """Test concurrent callers wait for a single load"""
+        model_cache.clear_model_cache()
+        loads = []
+
+        def loader():
+            loads.append(1)
+            time.sleep(0.05)
+            return "model"
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(model_cache.get_model("slow", loader)))
+                   for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert results == ["model"] * 8
+        assert loads == [1]
+        model_cache.clear_model_cache()
+
+def _make_tree(root, n_files=12):
+    for i in range(n_files):
+        sub = root / f"dir_{i % 3}"
+        sub.mkdir(exist_ok=True)
+        if i % 2:
+            (sub / f"mod_{i}.py").write_text(f"def f{i}():\n    return {i}\n")
+        else:
+            (sub / f"note_{i}.txt").write_text(f"Note number {i}. It has words.\n")
+    (root / "skip.bin").write_bytes(b"\x00")
+    (root / "broken.py").write_text("def broken(:\n")
+
+@pytest.mark.unit
+class TestDirectoryPipeline:
+    def test_pipeline_matches_serial(self, tmp_path):
+        """Test pipelined analysis covers the same files as the serial walk"""
+        _make_tree(tmp_path)
+        engine = MultiModalEngine()
+        serial = {r.input_path for r in engine.analyze_directory(tmp_path)}
+        events = []
+        piped = list(engine.iter_directory(tmp_path, max_workers=2, max_in_flight=3,
+                                           use_processes=False,
+                                           progress=lambda done, seen, path: events.append((done, seen))))
+        assert {r.input_path for r in piped} == serial
+        assert len(serial) == 12
+        # Progress fires once per file, including the one that failed
+        assert [done for done, _ in events] == list(range(1, 14))
+        assert all(seen >= done for done, seen in events)
+
+    def test_early_close_stops_pipeline(self, tmp_path):
+        """Test closing the generator shuts down discovery and workers"""
+        _make_tree(tmp_path, n_files=30)
+        engine = MultiModalEngine()
+        stream = engine.iter_directory(tmp_path, max_in_flight=2, use_processes=False)
+        next(stream)
+        stream.close()
+        assert not any(t.name == "mm-discovery" for t in threading.enumerate())
+
+    def test_in_flight_bound_holds(self, tmp_path):
+        """Test discovered-but-unfinished files never exceed max_in_flight"""
+        _make_tree(tmp_path, n_files=30)
+        engine = MultiModalEngine()
+        analyze = engine.analyze
+
+        def slow(file_path, use_cache=True):
+            time.sleep(0.005)
+            return analyze(file_path, use_cache=use_cache)
+
+        engine.analyze = slow
+        backlog = []
+        results = list(engine.iter_directory(tmp_path, max_workers=2, max_in_flight=3, use_processes=False,
+                                             progress=lambda done, seen, path: backlog.append(seen - done)))
+        assert len(results) == 30
+        assert max(backlog) <= 3
+
+    @pytest.mark.slow
+    def test_process_workers(self, tmp_path):
+        """Test CPU-bound modalities run in worker processes"""
+        _make_tree(tmp_path, n_files=6)
+        engine = MultiModalEngine()
+        results = engine.analyze_directory(tmp_path, parallel=True, max_workers=2)
+        assert {r.input_type for r in results} == {"code", "document"}
+        assert len(results) == 6
+
+@pytest.mark.unit
+class TestAnalysisCache:
+    def test_unchanged_file_is_served_from_cache(self, tmp_path, monkeypatch):
+        """Test repeated analysis neither re-hashes nor re-analyzes the file"""
+        source = tmp_path / "sample.py"
+        source.write_text("def f():\n    return 1\n")
+        cache = AnalysisCache(tmp_path / "cache.duckdb")
+        engine = MultiModalEngine(analysis_cache=cache)
+        calls = {"hash": 0, "analyze": 0}
+        real_hash, real_analyze = analysis_cache.content_hash, engine.code_analyzer.analyze_code
+
+        def counting_hash(path):
+            calls["hash"] += 1
+            return real_hash(path)
+
+        def counting_analyze(path):
+            calls["analyze"] += 1
+            return real_analyze(path)
+
+        monkeypatch.setattr(analysis_cache, "content_hash", counting_hash)
+        monkeypatch.setattr(engine.code_analyzer, "analyze_code", counting_analyze)
+        first = engine.analyze(source)
+        for _ in range(100):
+            again = engine.analyze(source)
+        assert again.cross_modal_insights == first.cross_modal_insights
+        assert cache.get_stats()["hits"] == 100
+        assert calls == {"hash": 1, "analyze": 1}
+        cache.close()
+
+    def test_hits_are_copies(self, tmp_path):
+        """Test mutating a returned analysis does not change the cached one"""
+        source = tmp_path / "sample.py"
+        source.write_text("def f():\n    return 1\n")
+        cache = AnalysisCache(tmp_path / "cache.duckdb")
+        engine = MultiModalEngine(analysis_cache=cache)
+        engine.analyze(source).cross_modal_insights["edited"] = True
+        hit = engine.analyze(source)
+        assert "edited" not in hit.cross_modal_insights
+        hit.cross_modal_insights["edited"] = True
+        assert "edited" not in engine.analyze(source).cross_modal_insights
+        cache.close()
+
+    def test_changed_file_is_reanalyzed(self, tmp_path):
+        """Test content changes invalidate through the mtime/size check"""
+        source = tmp_path / "sample.py"
+        source.write_text("def f():\n    return 1\n")
+        cache = AnalysisCache(tmp_path / "cache.duckdb")
+        engine = MultiModalEngine(analysis_cache=cache)
+        engine.analyze(source)
+        source.write_text("def f():\n    return 1\n\ndef g():\n    return 2\n")
+        assert len(engine.analyze(source).code_analysis.functions) == 2
+        assert cache.get_stats()["entries"] == 2
+        cache.close()
+
+    def test_cache_persists_and_rebinds_path(self, tmp_path):
+        """Test a new cache instance serves identical content at another path"""
+        first_path = tmp_path / "a.txt"
+        first_path.write_text("Persistent words here.")
+        cache = AnalysisCache(tmp_path / "cache.duckdb")
+        MultiModalEngine(analysis_cache=cache).analyze(first_path)
+        cache.close()
+        copy = tmp_path / "b.txt"
+        copy.write_text("Persistent words here.")
+        reopened = AnalysisCache(tmp_path / "cache.duckdb")
+        result = MultiModalEngine(analysis_cache=reopened).analyze(copy)
+        assert result.input_path == copy
+        assert reopened.get_stats()["hits"] == 1
+        reopened.close()
+
+    def test_lru_eviction(self, tmp_path):
+        """Test entries beyond max_entries are evicted oldest first"""
+        cache = AnalysisCache(tmp_path / "cache.duckdb", max_entries=3)
+        engine = MultiModalEngine(analysis_cache=cache)
+        paths = []
+        for i in range(5):
+            path = tmp_path / f"f{i}.py"
+            path.write_text(f"x = {i}\n")
+            paths.append(path)
+            engine.analyze(path)
+            if i == 2:
+                engine.analyze(paths[0])  # keep f0 recent
+        assert cache.get_stats()["entries"] == 3
+        assert cache.get_stats()["bytes"] == cache.conn.execute("SELECT sum(size) FROM analyses").fetchone()[0]
+        hits = cache.hits
+        engine.analyze(paths[0])
+        assert cache.hits == hits + 1
+        engine.analyze(paths[1])
+        assert cache.hits == hits + 1
+        cache.close()
+
+    def test_eviction_frees_to_low_water_mark(self, tmp_path):
+        """Test a full cache evicts oldest entries down to 90% of its limits"""
+        cache = AnalysisCache(tmp_path / "cache.duckdb", max_entries=20, max_bytes=10 ** 6)
+        sizes = []
+        for i in range(24):
+            cache.put(f"k{i}", {"i": i})
+            sizes.append(cache.get_stats()["entries"])
+        assert sizes[19:] == [20, 18, 19, 20, 18]
+        assert {k for (k,) in cache.conn.execute("SELECT cache_key FROM analyses").fetchall()} \
+            == {f"k{i}" for i in range(6, 24)}
+
+        cache.max_bytes = cache.get_stats()["bytes"] - 1
+        cache.put("big", {"pad": "x" * 100})
+        stats = cache.get_stats()
+        assert stats["bytes"] <= 0.9 * cache.max_bytes
+        assert stats["bytes"] == cache.conn.execute("SELECT sum(size) FROM analyses").fetchone()[0]
+        cache.close()
+
+    def test_pipeline_uses_cache(self, tmp_path, monkeypatch):
+        """Test files are hashed on lookup threads and a second pass hits the cache"""
+        (tmp_path / "tree").mkdir()
+        _make_tree(tmp_path / "tree")
+        cache = AnalysisCache(tmp_path / "cache.duckdb")
+        engine = MultiModalEngine(analysis_cache=cache)
+        hashed_on = set()
+        real_hash = analysis_cache.content_hash
+
+        def tracing_hash(path):
+            hashed_on.add(threading.current_thread().name)
+            return real_hash(path)
+
+        monkeypatch.setattr(analysis_cache, "content_hash", tracing_hash)
+        first = list(engine.iter_directory(tmp_path / "tree", use_processes=False))
+        assert hashed_on and all(name.startswith("mm-lookup") for name in hashed_on)
+        hits = cache.hits
+        second = list(engine.iter_directory(tmp_path / "tree", use_processes=False))
+        assert len(second) == len(first) == 12
+        assert cache.hits - hits == 12
+        cache.close()
+
+    def test_corrupt_cache_entry_skips_only_that_file(self, tmp_path):
+        """Test a failing cache lookup is logged per file and the walk continues"""
+        (tmp_path / "tree").mkdir()
+        _make_tree(tmp_path / "tree")
+        cache = AnalysisCache(tmp_path / "cache.duckdb")
+        engine = MultiModalEngine(analysis_cache=cache)
+        list(engine.iter_directory(tmp_path / "tree", use_processes=False))
+        victim = cache.conn.execute("SELECT cache_key FROM analyses LIMIT 1").fetchone()[0]
+        cache.conn.execute("UPDATE analyses SET payload = ? WHERE cache_key = ?", [b"not a pickle", victim])
+        cache._memory.clear()
+        events = []
+        second = list(engine.iter_directory(tmp_path / "tree", use_processes=False,
+                                            progress=lambda done, seen, path: events.append(done)))
+        assert len(second) == 11
+        assert events == list(range(1, 14))
+        cache.close()
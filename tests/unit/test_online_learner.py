@@ -0,0 +1,178 @@
+"""
+Unit tests for online_learner.py - feedback ingestion and learning state
+"""
+import pytest
+import sys
+import os
+import time
+import logging
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'src', 'backend', 'reasoning-engine-python'))
+from learning.online_learner import OnlineLearner, ActionResult, UserFeedback, FeedbackType
+from learning.contextual_bandit import ContextualBandit
+
+def _event(i, action_type="search", positive=True, rating=0.5, correction=None):
+    action = ActionResult(
+        action_id=f"a{i}",
+        action_type=action_type,
+        parameters={"timeout": 10},
+        outcome="ok",
+        success=positive
+    )
+    feedback = UserFeedback(
+        action_id=f"a{i}",
+        feedback_type=FeedbackType.POSITIVE if positive else FeedbackType.NEGATIVE,
+        rating=rating,
+        correction=correction
+    )
+    return action, feedback
+
+@pytest.mark.unit
+class TestOnlineLearnerHistory:
+    def test_history_is_bounded(self):
+        """Test interaction history keeps only the last memory_size events"""
+        learner = OnlineLearner(memory_size=10)
+        for i in range(25):
+            learner.update_from_feedback(*_event(i))
+        assert len(learner.interaction_history) == 10
+        assert learner.interaction_history[0][0].action_id == "a15"
+
+    def test_import_resizes_history(self):
+        """Test importing state applies the imported memory_size"""
+        learner = OnlineLearner(memory_size=10)
+        for i in range(10):
+            learner.update_from_feedback(*_event(i))
+        other = OnlineLearner(memory_size=4)
+        learner.import_learning_state(other.export_learning_state())
+        assert learner.interaction_history.maxlen == 4
+        assert len(learner.interaction_history) == 4
+
+@pytest.mark.unit
+class TestOnlineLearnerBatch:
+    def test_batch_matches_sequential(self):
+        """Test batched ingestion yields the same statistics as sequential"""
+        events = [
+            _event(i, action_type=("search" if i % 3 else "click"),
+                   positive=(i % 2 == 0), rating=(None if i % 5 == 0 else (i % 10) / 10),
+                   correction=({"timeout": i} if i % 7 == 0 else None))
+            for i in range(200)
+        ]
+        sequential = OnlineLearner(learning_rate=0.1)
+        for action, feedback in events:
+            sequential.update_from_feedback(action, feedback)
+        batched = OnlineLearner(learning_rate=0.1)
+        batched.update_from_feedback_many(events[:50])
+        batched.update_from_feedback_many(events[50:])
+
+        for action_type in ("search", "click"):
+            a = sequential.get_statistics(action_type)
+            b = batched.get_statistics(action_type)
+            assert a["total_attempts"] == b["total_attempts"]
+            assert a["success_rate"] == pytest.approx(b["success_rate"])
+            assert a["average_rating"] == pytest.approx(b["average_rating"])
+            assert a["learned_parameters"] == pytest.approx(b["learned_parameters"])
+        assert len(batched.interaction_history) == len(sequential.interaction_history)
+
+    def test_batch_unrated_events_keep_average(self):
+        """Test unrated events do not pull the average rating down"""
+        learner = OnlineLearner()
+        learner.update_from_feedback_many([_event(0, rating=0.8), _event(1, rating=None)])
+        assert learner.get_statistics("search")["average_rating"] == pytest.approx(0.8)
+
+    @pytest.mark.slow
+    def test_batch_ingestion_is_vectorized(self, monkeypatch):
+        """Test 100k events are aggregated per action type, never per event"""
+        learner = OnlineLearner(memory_size=100000)
+        action_types = ["search", "click", "type", "scroll", "navigate"]
+        events = [
+            _event(i, action_type=action_types[i % 5], positive=(i % 3 != 0), rating=0.7)
+            for i in range(100000)
+        ]
+        logging.getLogger("learning.online_learner").setLevel(logging.WARNING)
+        monkeypatch.setattr(learner, "update_from_feedback",
+                            lambda *args, **kwargs: pytest.fail("per-event path used"))
+        for i in range(0, len(events), 10000):
+            learner.update_from_feedback_many(events[i:i + 10000])
+        assert learner.get_statistics()["total_interactions"] == 100000
+        for action_type in action_types:
+            stats = learner.get_statistics(action_type)
+            assert stats["total_attempts"] == 20000
+            assert stats["average_rating"] == pytest.approx(0.7)
+
+    @pytest.mark.slow
+    def test_batch_throughput(self):
+        """Benchmark: batched ingestion sustains 100k events/sec (best of 3)"""
+        events = [_event(i, action_type=f"type_{i % 5}", rating=0.7) for i in range(100000)]
+        logging.getLogger("learning.online_learner").setLevel(logging.WARNING)
+        best = float("inf")
+        for _ in range(3):
+            learner = OnlineLearner(memory_size=100000)
+            start = time.perf_counter()
+            for i in range(0, len(events), 10000):
+                learner.update_from_feedback_many(events[i:i + 10000])
+            best = min(best, time.perf_counter() - start)
+        assert len(events) / best >= 100000
+
+@pytest.mark.unit
+class TestContextualBandit:
+    def test_update_matches_direct_inverse(self):
+        """Test Sherman-Morrison update equals the explicit ridge inverse"""
+        bandit = ContextualBandit(n_features=6)
+        contexts = [{"device": "mobile"}, {"device": "desktop", "network": "slow"}, {}]
+        for i, ctx in enumerate(contexts * 5):
+            bandit.update("search", 2, ctx, reward=float(i % 2))
+        X = np.array([bandit.featurize(ctx) for ctx in contexts * 5])
+        expected = np.linalg.inv(np.eye(6) + X.T @ X)
+        assert np.allclose(bandit.models["search"].A_inv[2], expected)
+
+    def test_invalid_arms_are_skipped(self):
+        """Test out-of-range arms neither raise nor update another arm"""
+        learner = OnlineLearner()
+        events = []
+        for i, arm in enumerate([-1, 5, 2.5, "1", None, 1]):
+            action, feedback = _event(i)
+            action.context = {"bandit_arm": arm}
+            events.append((action, feedback))
+        learner.update_from_feedback_many(events[:3])
+        for action, feedback in events[3:]:
+            learner.update_from_feedback(action, feedback)
+        assert learner.bandit.get_statistics("search")["pulls"] == [0, 1, 0, 0, 0]
+        assert learner.get_statistics("search")["total_attempts"] == 6
+        with pytest.raises(ValueError):
+            learner.bandit.update("search", -1, {}, 1.0)
+
+    @pytest.mark.parametrize("strategy", ["linucb", "thompson"])
+    def test_retries_converge_to_best_variant(self, strategy):
+        """Test exploration concentrates on the variant that succeeds"""
+        learner = OnlineLearner(bandit=ContextualBandit(strategy=strategy, seed=7))
+        rng = np.random.default_rng(0)
+        failed = ActionResult(action_id="f", action_type="click",
+                              parameters={"timeout": 10.0}, outcome="timeout", success=False)
+        for i in range(300):
+            strategy_info = learner.get_retry_strategy(failed)
+            arm = strategy_info["bandit_arm"]
+            # Only the doubled timeout reliably succeeds
+            success = rng.random() < (0.9 if strategy_info["parameters"]["timeout"] == 20.0 else 0.2)
+            retried = ActionResult(action_id=f"r{i}", action_type="click",
+                                   parameters=strategy_info["parameters"], outcome="ok",
+                                   success=success, context={"bandit_arm": arm})
+            feedback = UserFeedback(action_id=f"r{i}",
+                                    feedback_type=FeedbackType.POSITIVE if success else FeedbackType.NEGATIVE)
+            learner.update_from_feedback(retried, feedback)
+        pulls = learner.bandit.get_statistics("click")["pulls"]
+        assert pulls[learner.bandit.arms.index(2.0)] > 0.6 * sum(pulls)
+        assert learner.optimize_action("click", {"timeout": 10.0})["timeout"] == 20.0
+
+    def test_bandit_state_persists(self):
+        """Test bandit state round-trips through export/import"""
+        learner = OnlineLearner()
+        learner.update_from_feedback(
+            ActionResult(action_id="a", action_type="search", parameters={}, outcome="ok",
+                         success=True, context={"bandit_arm": 1, "device": "mobile"}),
+            UserFeedback(action_id="a", feedback_type=FeedbackType.POSITIVE, rating=0.9)
+        )
+        restored = OnlineLearner()
+        restored.import_learning_state(learner.export_learning_state())
+        assert restored.bandit.get_statistics("search") == learner.bandit.get_statistics("search")
+        assert restored.bandit.best_arm("search") == 1
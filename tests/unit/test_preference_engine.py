@@ -0,0 +1,272 @@
+"""
+Unit tests for preference_engine.py - preference learning and prediction
+"""
+import pytest
+import sys
+import os
+import math
+import random
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'src', 'backend', 'reasoning-engine-python'))
+from learning.preference_engine import PreferenceEngine
+from storage.profile_store import ShardedProfileStore
+
+def _brute_force(engine, user_id, context):
+    """Reference scoring: decay every signal, substring context match, full sort"""
+    now = datetime.now()
+    scored = []
+    for signal in engine.user_profiles[user_id].values():
+        confidence = signal.confidence * engine.decay_factor ** max((now - signal.last_seen).days, 0)
+        boost = sum(0.2 for k, v in context.items() if signal.key.startswith("context:")
+                    and signal.key == f"context:{k}:{v}")
+        score = min(confidence + min(math.log(signal.frequency + 1) / 5, 0.5) + boost, 1.0)
+        if score > 0.3:
+            scored.append((score, signal.key))
+    scored.sort(reverse=True)
+    return scored[:10]
+
+@pytest.mark.unit
+class TestPreferencePrediction:
+    def test_prediction_is_idempotent(self):
+        """Test repeated predictions do not decay stored confidence"""
+        engine = PreferenceEngine(decay_factor=0.5)
+        engine.observe_interaction("u", "search", "ok", {"device": "mobile"}, satisfaction=0.9)
+        for signal in engine.user_profiles["u"].values():
+            signal.last_seen -= timedelta(days=2)
+        first = engine.predict_preferences("u", {"device": "mobile"})
+        second = engine.predict_preferences("u", {"device": "mobile"})
+        assert first == second
+        action = next(p for p in first if p["key"] == "action:search")
+        assert action["confidence"] == pytest.approx(0.9 * 0.25)
+        assert engine.user_profiles["u"]["action:search"].confidence == pytest.approx(0.9)
+
+    def test_decay_is_folded_on_update(self):
+        """Test re-observing a signal applies elapsed decay exactly once"""
+        engine = PreferenceEngine(decay_factor=0.5)
+        engine.observe_interaction("u", "search", "ok", satisfaction=1.0)
+        engine.user_profiles["u"]["action:search"].last_seen -= timedelta(days=1)
+        engine.observe_interaction("u", "search", "ok", satisfaction=1.0)
+        assert engine.user_profiles["u"]["action:search"].confidence == pytest.approx(0.7 * 0.5 + 0.3)
+
+    def test_context_match_boosts_score(self):
+        """Test matching context signals are boosted through the index"""
+        engine = PreferenceEngine()
+        engine.observe_interaction("u", "search", "ok", {"device": "mobile", "network": "slow"})
+        engine.observe_interaction("u", "search", "ok", {"device": "desktop"})
+        preds = {p["key"]: p["score"] for p in engine.predict_preferences("u", {"device": "mobile"})}
+        assert preds["context:device:mobile"] > preds["context:device:desktop"]
+
+    def test_top_k_matches_brute_force(self):
+        """Test pruned heap selection equals a full scan and sort"""
+        rng = random.Random(3)
+        engine = PreferenceEngine(decay_factor=0.9)
+        for i in range(500):
+            engine.observe_interaction(
+                "u", f"action_{rng.randrange(40)}", "ok",
+                {"device": rng.choice(["mobile", "desktop", "tablet"]), "tab": rng.randrange(30)},
+                satisfaction=rng.random()
+            )
+        for signal in engine.user_profiles["u"].values():
+            signal.last_seen -= timedelta(days=rng.randrange(20))
+        engine._reindex_user("u")
+        for context in ({}, {"device": "mobile"}, {"device": "tablet", "tab": 7}):
+            preds = engine.predict_preferences("u", context)
+            expected = _brute_force(engine, "u", context)
+            assert [(p["score"], p["key"]) for p in preds] == pytest.approx(expected)
+
+    def test_import_rebuilds_index(self):
+        """Test imported profiles are indexed for context matching"""
+        engine = PreferenceEngine()
+        engine.observe_interaction("u", "search", "ok", {"device": "mobile"})
+        other = PreferenceEngine()
+        other.import_profile("u", engine.export_profile("u"))
+        assert other.predict_preferences("u", {"device": "mobile"}) == \
+            engine.predict_preferences("u", {"device": "mobile"})
+
+@pytest.mark.unit
+class TestBatchPrediction:
+    def _engine(self, n_users=20):
+        rng = random.Random(11)
+        engine = PreferenceEngine(decay_factor=0.9)
+        for i in range(2000):
+            engine.observe_interaction(
+                f"user_{rng.randrange(n_users)}", f"action_{rng.randrange(25)}", "ok",
+                {"device": rng.choice(["mobile", "desktop"]), "tab": rng.randrange(10)},
+                satisfaction=rng.random()
+            )
+        engine.save_preference("theme", "dark", "user_0")
+        return engine
+
+    def test_batch_matches_single_predictions(self):
+        """Test batched scoring equals per-user predict_preferences"""
+        engine = self._engine()
+        user_ids = [f"user_{i}" for i in range(20)] + ["user_3", "missing"]
+        contexts = [{"device": "mobile", "tab": i % 10} for i in range(20)] + [{}, {"device": "mobile"}]
+        batch = engine.predict_preferences_batch(user_ids, contexts)
+        assert len(batch) == len(user_ids)
+        for user_id, context, preds in zip(user_ids, contexts, batch):
+            single = engine.predict_preferences(user_id, context)
+            assert [p["key"] for p in preds] == [p["key"] for p in single]
+            assert [p["score"] for p in preds] == pytest.approx([p["score"] for p in single])
+
+    def test_batch_decay_matches_single(self):
+        """Test both paths count whole days of decay the same way"""
+        engine = PreferenceEngine(decay_factor=0.5)
+        now = datetime.now()
+        for i, (days, seconds) in enumerate((d, s) for d in range(4) for s in (-30, 30)):
+            engine.save_preference(f"k{i}", "v", "user_1")
+            signal = engine.user_profiles["user_1"][f"explicit:k{i}"]
+            signal.last_seen = now - timedelta(days=days, seconds=seconds)
+            engine._index_signal("user_1", signal, dirty=False)
+        single = {p["key"]: p["confidence"] for p in engine.predict_preferences("user_1")}
+        batch = {p["key"]: p["confidence"] for p in engine.predict_preferences_batch(["user_1"], top_k=20)[0]}
+        assert batch == pytest.approx(single)
+        assert len(single) > 2
+
+    def test_batch_tracks_updates_and_imports(self):
+        """Test columnar store follows observations and profile imports"""
+        engine = PreferenceEngine()
+        engine.observe_interaction("user_1", "search", "ok", {"device": "desktop"}, satisfaction=0.2)
+        engine.observe_interaction("user_1", "search", "ok", {"device": "tv"})
+        engine.import_profile("user_2", engine.export_profile("user_1"))
+        batch = engine.predict_preferences_batch(["user_1", "user_2"], [{"device": "tv"}] * 2)
+        assert batch[0] == batch[1]
+        assert "context:device:tv" in [p["key"] for p in batch[0]]
+
+    def test_batch_top_k(self):
+        """Test top_k limits results per request"""
+        engine = self._engine(n_users=2)
+        batch = engine.predict_preferences_batch(["user_0", "user_1"], top_k=3)
+        assert [len(preds) for preds in batch] == [3, 3]
+
+@pytest.mark.unit
+class TestProfileStore:
+    def _observe(self, engine, n_users=6):
+        rng = random.Random(5)
+        for i in range(300):
+            engine.observe_interaction(
+                f"user_{i % n_users}", f"action_{rng.randrange(8)}", "ok",
+                {"device": rng.choice(["mobile", "desktop"])}, satisfaction=rng.random()
+            )
+
+    def test_profiles_survive_restart(self, tmp_path):
+        """Test flushed profiles are lazily loaded by a new engine"""
+        store = ShardedProfileStore(str(tmp_path), n_shards=4)
+        engine = PreferenceEngine(profile_store=store)
+        self._observe(engine)
+        engine.save_preference("theme", "dark", "user_1")
+        expected = engine.predict_preferences("user_1", {"device": "mobile"})
+        engine.flush()
+        
+        restarted = PreferenceEngine(profile_store=store)
+        assert len(restarted.user_profiles) == 0
+        assert "user_1" in restarted.user_profiles
+        assert restarted.predict_preferences("user_1", {"device": "mobile"}) == expected
+        assert "nobody" not in restarted.user_profiles
+        store.close()
+
+    def test_cold_users_are_evicted_and_written_back(self, tmp_path):
+        """Test LRU eviction bounds residency without losing signals"""
+        store = ShardedProfileStore(str(tmp_path), n_shards=4)
+        reference = PreferenceEngine()
+        engine = PreferenceEngine(profile_store=store, max_resident_users=2, flush_batch_size=10 ** 6)
+        self._observe(reference)
+        self._observe(engine)
+        assert len(engine.user_profiles) == 2
+        assert engine._pending < 10 ** 6
+        for i in range(6):
+            user_id = f"user_{i}"
+            assert engine.predict_preferences(user_id) == reference.predict_preferences(user_id)
+        assert len(engine.user_profiles) == 2
+        store.close()
+
+    def test_eviction_frees_interned_ids(self, tmp_path):
+        """Test user, key and context ids do not grow with users seen"""
+        store = ShardedProfileStore(str(tmp_path), n_shards=2)
+        engine = PreferenceEngine(profile_store=store, max_resident_users=2)
+        for i in range(200):
+            engine.observe_interaction(f"user_{i}", f"action_{i}", "ok", {"page": f"p{i}"})
+        assert len(engine._users) <= 3
+        assert len(engine._keys.ids) < 20 and len(engine._keys) < 20
+        assert len(engine._pairs) <= 3
+        batch = engine.predict_preferences_batch(["user_5", "user_199"], [{"page": "p5"}, {"page": "p199"}])
+        assert batch == [engine.predict_preferences("user_5", {"page": "p5"}),
+                         engine.predict_preferences("user_199", {"page": "p199"})]
+        store.close()
+
+    def test_batch_prediction_loads_evicted_users(self, tmp_path):
+        """Test batch scoring covers more users than are resident"""
+        store = ShardedProfileStore(str(tmp_path), n_shards=4)
+        reference = PreferenceEngine()
+        engine = PreferenceEngine(profile_store=store, max_resident_users=2)
+        self._observe(reference)
+        self._observe(engine)
+        user_ids = [f"user_{i}" for i in range(6)]
+        assert engine.predict_preferences_batch(user_ids) == reference.predict_preferences_batch(user_ids)
+        assert len(engine.user_profiles) == 2
+        store.close()
+
+    def test_write_behind_batches_and_history_bound(self, tmp_path):
+        """Test signals are written in batches and history is bounded"""
+        store = ShardedProfileStore(str(tmp_path), n_shards=2)
+        engine = PreferenceEngine(profile_store=store, flush_batch_size=5, history_size=50)
+        engine.observe_interaction("user_1", "search", "ok", {"device": "tv"})
+        assert not store.has_user("user_1")
+        for i in range(10):
+            engine.observe_interaction("user_1", f"action_{i}", "ok")
+        assert store.has_user("user_1")
+        self._observe(engine)
+        assert len(engine.interaction_history) == 50
+        store.close()
+
+    def test_import_replaces_stored_profile(self, tmp_path):
+        """Test importing a profile drops previously stored signals"""
+        store = ShardedProfileStore(str(tmp_path), n_shards=2)
+        engine = PreferenceEngine(profile_store=store)
+        engine.observe_interaction("user_1", "search", "ok", {"device": "tv"})
+        engine.flush()
+        engine.import_profile("user_1", PreferenceEngine().export_profile("user_1"))
+        engine.flush()
+        assert store.load_profile("user_1") == []
+        store.close()
+
+    def test_import_is_written_immediately(self, tmp_path):
+        """Test an imported profile is stored without waiting for a flush"""
+        store = ShardedProfileStore(str(tmp_path), n_shards=2)
+        engine = PreferenceEngine(profile_store=store)
+        engine.observe_interaction("user_1", "search", "ok", {"device": "tv"})
+        engine.flush()
+        source = PreferenceEngine()
+        source.save_preference("theme", "dark", "user_1")
+        engine.import_profile("user_1", source.export_profile("user_1"))
+        assert engine._pending == 0
+        assert [row[1] for row in store.load_profile("user_1")] == ["explicit:theme"]
+        store.close()
+
+    def test_close_flushes_pending_signals(self, tmp_path):
+        """Test close writes a batch smaller than flush_batch_size"""
+        store = ShardedProfileStore(str(tmp_path), n_shards=2)
+        engine = PreferenceEngine(profile_store=store)
+        engine.save_preference("theme", "dark", "user_1")
+        assert not store.has_user("user_1")
+        engine.close()
+        reopened = ShardedProfileStore(str(tmp_path), n_shards=2)
+        assert reopened.has_user("user_1")
+        reopened.close()
+
+    def test_failed_flush_keeps_pending_signals(self, tmp_path):
+        """Test a value JSON cannot store raises and is kept for a later flush"""
+        store = ShardedProfileStore(str(tmp_path), n_shards=2)
+        engine = PreferenceEngine(profile_store=store)
+        engine.save_preference("theme", "dark", "user_1")
+        engine.save_preference("tags", {"a", "b"}, "user_1")
+        with pytest.raises(TypeError):
+            engine.flush()
+        assert not store.has_user("user_1")
+        assert engine._pending == 2
+        engine.save_preference("tags", ["a", "b"], "user_1")
+        assert engine.flush() == 2
+        assert {row[1]: row[2] for row in store.load_profile("user_1")} == \
+            {"explicit:theme": "dark", "explicit:tags": ["a", "b"]}
+        store.close()
@@ -0,0 +1,128 @@
+"""
+Unit tests for skill_acquisition.py - module catalog and learning paths
+"""
+import pytest
+import sys
+import os
+import random
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'src', 'backend', 'reasoning-engine-python'))
+from learning.skill_acquisition import SkillAcquisitionEngine, SkillGap, LearningModule
+
+def _gap(skill, target):
+    return SkillGap(skill_name=skill, current_level=0.0, target_level=target, severity=1.0)
+
+def _module(module_id, skill, difficulty, prerequisites=()):
+    return LearningModule(id=module_id, skill=skill, difficulty=difficulty,
+                          content=None, prerequisites=list(prerequisites))
+
+@pytest.mark.unit
+class TestLearningPath:
+    def test_path_matches_linear_scan(self):
+        """Test indexed path equals the scan-and-sort reference without prerequisites"""
+        rng = random.Random(3)
+        engine = SkillAcquisitionEngine()
+        for i in range(500):
+            engine.learning_modules.append(
+                _module(f"m{i}", f"skill_{rng.randrange(5)}", round(rng.random(), 1))
+            )
+        gaps = [_gap("skill_2", 0.6), _gap("skill_0", 0.3), _gap("missing", 1.0)]
+        expected = []
+        for gap in gaps:
+            modules = sorted((m for m in engine.learning_modules if m.skill == gap.skill_name),
+                             key=lambda m: m.difficulty)
+            expected.extend(m for m in modules if m.difficulty <= gap.target_level)
+        assert engine.create_learning_path(gaps) == expected
+
+    def test_prerequisites_across_gaps(self):
+        """Test prerequisites are pulled in and ordered before dependents"""
+        engine = SkillAcquisitionEngine()
+        engine.add_modules([
+            _module("js1", "javascript", 0.1, ["py2"]),
+            _module("py1", "python", 0.1),
+            _module("py2", "python", 0.5, ["py1"]),
+            _module("py3", "python", 0.9),
+        ])
+        path = [m.id for m in engine.create_learning_path([_gap("javascript", 0.5)])]
+        assert path == ["py1", "py2", "js1"]
+        path = [m.id for m in engine.create_learning_path([_gap("javascript", 0.5), _gap("python", 0.2)])]
+        assert path == ["py1", "py2", "js1"]
+
+    def test_mastered_prerequisites_are_skipped(self):
+        """Test plans depend on mastery and are invalidated by progress"""
+        engine = SkillAcquisitionEngine()
+        engine.add_modules([_module("py1", "python", 0.05), _module("js1", "javascript", 0.1, ["py1"])])
+        gaps = [_gap("javascript", 0.5)]
+        assert [m.id for m in engine.create_learning_path(gaps, user_id="u1")] == ["py1", "js1"]
+        for _ in range(3):
+            engine.track_progress("u1", "python", success=True)
+        assert [m.id for m in engine.create_learning_path(gaps, user_id="u1")] == ["js1"]
+
+    def test_plan_cache_invalidated_by_catalog(self):
+        """Test appended modules show up in later plans"""
+        engine = SkillAcquisitionEngine()
+        engine.add_module(_module("a", "python", 0.2))
+        gaps = [_gap("python", 0.5)]
+        first = engine.create_learning_path(gaps)
+        first.clear()
+        assert len(engine.create_learning_path(gaps)) == 1
+        engine.learning_modules.append(_module("b", "python", 0.1))
+        assert [m.id for m in engine.create_learning_path(gaps)] == ["b", "a"]
+
+    def test_replacement_and_removal_reindex(self):
+        """Test replaced, removed and reassigned modules reach later plans"""
+        engine = SkillAcquisitionEngine()
+        engine.add_modules([_module("a", "python", 0.2), _module("b", "python", 0.4)])
+        gaps = [_gap("python", 0.5)]
+        assert [m.id for m in engine.create_learning_path(gaps)] == ["a", "b"]
+        assert engine.replace_module(_module("a", "python", 0.9))
+        assert [m.id for m in engine.create_learning_path(gaps)] == ["b"]
+        assert engine.get_module("a").difficulty == 0.9
+        assert engine.remove_module("b") and not engine.remove_module("b")
+        assert engine.create_learning_path(gaps) == []
+        engine.learning_modules = [_module("c", "python", 0.1)]
+        assert [m.id for m in engine.create_learning_path(gaps)] == ["c"]
+        engine.learning_modules[0] = _module("d", "python", 0.3)
+        engine.invalidate_catalog()
+        assert [m.id for m in engine.create_learning_path(gaps)] == ["d"]
+
+    def test_cycle_does_not_drop_modules(self):
+        """Test cyclic prerequisites are still included in the path"""
+        engine = SkillAcquisitionEngine()
+        engine.add_modules([_module("a", "python", 0.1, ["b"]), _module("b", "python", 0.2, ["a"])])
+        assert {m.id for m in engine.create_learning_path([_gap("python", 1.0)])} == {"a", "b"}
+
+    def test_adaptive_content_nearest_difficulty(self):
+        """Test adaptive lookup picks the nearest difficulty within range"""
+        engine = SkillAcquisitionEngine()
+        engine.add_modules([_module("easy", "python", 0.0), _module("mid", "python", 0.45),
+                            _module("hard", "python", 0.9)])
+        assert engine.get_adaptive_content("u1", "python").id == "easy"
+        engine.track_progress("u1", "python", success=True)  # mastery 0.3
+        assert engine.get_adaptive_content("u1", "python").id == "mid"
+        assert engine.get_adaptive_content("u1", "rust") is None
+
+    @pytest.mark.slow
+    def test_large_catalog_path_uses_index(self):
+        """Test path generation over 100k modules never rescans the catalog"""
+        rng = random.Random(1)
+        engine = SkillAcquisitionEngine()
+        engine.add_modules([
+            _module(f"m{i}", f"skill_{i % 200}", rng.random(),
+                    [f"m{i - 200}"] if i >= 200 and i % 7 == 0 else [])
+            for i in range(100000)
+        ])
+        gaps = [_gap(f"skill_{i}", 0.3) for i in range(0, 200, 20)]
+        engine.get_module("m0")  # index once
+
+        class NoScan(list):
+            def __iter__(self):
+                raise AssertionError("catalog scanned")
+
+        engine._modules = NoScan(engine._modules)
+        path = engine.create_learning_path(gaps)
+        seen = set()
+        for module in path:
+            assert all(p in seen for p in module.prerequisites)
+            seen.add(module.id)
+        assert len(path) > 100
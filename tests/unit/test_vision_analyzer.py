@@ -0,0 +1,397 @@
+"""
+Unit tests for vision_analyzer.py - local image analysis
+"""
+import pytest
+import sys
+import os
+import io
+import pathlib
+import tempfile
+import time
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'src', 'backend', 'reasoning-engine-python'))
+from multimodal.vision.vision_analyzer import VisionAnalyzer, VisualElement
+from multimodal.vision.frame_differ import FrameDiffer, grow_boxes
+from multimodal.vision.image_hash import BKTree, ScreenshotIndex, hamming
+from multimodal.vision.region_ocr import RegionOCR, detect_text_regions
+from multimodal.vision import ui_elements
+from multimodal.vision.ui_elements import nms
+
+def _png_bytes(img):
+    buf = io.BytesIO()
+    img.save(buf, format="PNG")
+    return buf.getvalue()
+
+def _screenshot(width=320, height=200):
+    arr = np.zeros((height, width, 3), dtype=np.uint8)
+    arr[:, :width // 2] = (200, 30, 30)
+    arr[:, width // 2:] = (20, 40, 220)
+    return arr
+
+@pytest.mark.unit
+class TestInMemoryAnalysis:
+    def test_bytes_path_never_touches_filesystem(self, monkeypatch):
+        """Test screenshot analysis decodes from memory only"""
+        analyzer = VisionAnalyzer()
+        data = _png_bytes(Image.fromarray(_screenshot()))
+
+        def forbidden(*args, **kwargs):
+            raise AssertionError("filesystem access")
+
+        monkeypatch.setattr(tempfile, "NamedTemporaryFile", forbidden)
+        monkeypatch.setattr(pathlib.Path, "stat", forbidden)
+        result = analyzer.analyze_screenshot(data)
+        assert result.dimensions == (320, 200)
+        assert result.metadata["format"] == "PNG"
+        assert result.metadata["file_size"] == len(data)
+
+    def test_bytes_matches_file_analysis(self, tmp_path):
+        """Test in-memory and file analysis agree"""
+        analyzer = VisionAnalyzer()
+        img = Image.fromarray(_screenshot())
+        path = tmp_path / "shot.png"
+        img.save(path)
+        from_file = analyzer.analyze_image(str(path))
+        from_bytes = analyzer.analyze_bytes(path.read_bytes())
+        assert from_bytes.dimensions == from_file.dimensions
+        assert from_bytes.dominant_colors == from_file.dominant_colors
+        assert from_bytes.scene_description == from_file.scene_description
+
+    def test_array_inputs_are_normalized(self):
+        """Test gray and RGBA arrays are accepted"""
+        analyzer = VisionAnalyzer()
+        rgb = _screenshot()
+        rgba = np.concatenate([rgb, np.full(rgb.shape[:2] + (1,), 255, np.uint8)], axis=2)
+        assert analyzer.analyze_array(rgba).scene_description == analyzer.analyze_array(rgb).scene_description
+        assert analyzer.analyze_array(rgb[:, :, 0]).dimensions == (320, 200)
+        with pytest.raises(ValueError):
+            analyzer.analyze_array(np.zeros((4, 4, 2), np.uint8))
+
+    def test_rgba_png_is_decoded_to_rgb(self):
+        """Test images with alpha are analyzed as RGB"""
+        analyzer = VisionAnalyzer()
+        img = Image.fromarray(_screenshot()).convert("RGBA")
+        result = analyzer.analyze_bytes(_png_bytes(img))
+        assert result.metadata["mode"] == "RGBA"
+        assert len(result.dominant_colors) > 0
+
+@pytest.mark.unit
+class TestDominantColors:
+    def test_palette_finds_distinct_regions(self):
+        """Test each flat region becomes its own palette entry with its share"""
+        analyzer = VisionAnalyzer()
+        palette = analyzer.extract_palette(_screenshot())
+        assert palette == [("#1428dc", 0.5), ("#c81e1e", 0.5)]
+
+    def test_palette_is_deterministic_and_bounded(self):
+        """Test repeated runs agree and shares sum to one"""
+        analyzer = VisionAnalyzer()
+        img = np.random.default_rng(3).integers(0, 256, (600, 800, 3), dtype=np.uint8)
+        first = analyzer.extract_palette(img, n_colors=6)
+        assert first == analyzer.extract_palette(img, n_colors=6)
+        assert len(first) == 6
+        assert len({color for color, _ in first}) == 6
+        assert sum(share for _, share in first) == pytest.approx(1.0)
+        assert [share for _, share in first] == sorted((share for _, share in first), reverse=True)
+
+    def test_analysis_reports_palette_shares(self):
+        """Test analysis metadata carries the palette with shares"""
+        result = VisionAnalyzer().analyze_array(_screenshot())
+        assert result.dominant_colors == [entry["color"] for entry in result.metadata["palette"]]
+
+    @pytest.mark.slow
+    def test_4k_palette_is_fast(self):
+        """Benchmark: palette extraction on a 4K screenshot"""
+        analyzer = VisionAnalyzer()
+        img = np.zeros((2160, 3840, 3), dtype=np.uint8)
+        img[:, :1280] = (240, 240, 240)
+        img[:, 1280:] = (30, 30, 30)
+        img[500:900, 200:3000] = (20, 120, 250)
+        analyzer.extract_palette(img)
+        start = time.perf_counter()
+        for _ in range(10):
+            palette = analyzer.extract_palette(img)
+        assert (time.perf_counter() - start) / 10 < 0.05
+        assert len(palette) == 3
+
+@pytest.mark.unit
+class TestFrameDiffer:
+    def test_first_frame_is_keyframe(self):
+        """Test the first frame marks everything dirty"""
+        differ = FrameDiffer(tile_size=32)
+        diff = differ.update(_screenshot())
+        assert diff.keyframe
+        assert diff.boxes == [(0, 0, 320, 200)]
+
+    def test_changed_regions_are_boxed(self):
+        """Test separate edits produce separate tile-aligned boxes"""
+        differ = FrameDiffer(tile_size=32)
+        frame = _screenshot()
+        differ.update(frame)
+        edited = frame.copy()
+        edited[10:20, 10:50] = 255        # tiles (0,0)-(0,1)
+        edited[150:190, 290:320] = 0      # bottom-right edge tiles
+        edited[100, 100] = frame[100, 100] + 5  # below threshold
+        diff = differ.update(edited)
+        assert not diff.keyframe
+        assert sorted(diff.boxes) == [(0, 0, 64, 32), (288, 128, 32, 64)]
+        assert differ.update(edited).boxes == []
+
+    def test_size_change_resets(self):
+        """Test a resized frame is treated as a keyframe"""
+        differ = FrameDiffer()
+        differ.update(_screenshot())
+        assert differ.update(_screenshot(160, 100)).keyframe
+
+    def test_analyze_array_reruns_only_dirty_regions(self, monkeypatch):
+        """Test element detection runs on changed crops and reuses unchanged frames"""
+        analyzer = VisionAnalyzer()
+        differ = FrameDiffer(tile_size=32)
+        shapes = []
+        detect = analyzer._detect_elements
+
+        def spy(img_array):
+            shapes.append(img_array.shape[:2])
+            return detect(img_array)
+
+        monkeypatch.setattr(analyzer, "_detect_elements", spy)
+        frame = _screenshot()
+        first = analyzer.analyze_array(frame, differ=differ)
+        same = analyzer.analyze_array(frame.copy(), differ=differ)
+        edited = frame.copy()
+        edited[40:60, 40:60] = 0
+        changed = analyzer.analyze_array(edited, differ=differ)
+        assert shapes == [(200, 320), (32, 32)]
+        assert same.dominant_colors == first.dominant_colors
+        assert same.metadata["changed_regions"] == []
+        assert changed.metadata["changed_regions"] == [(32, 32, 32, 32)]
+        assert "#000000" in changed.dominant_colors
+
+    def test_tile_mask_matches_full_frame_diff(self):
+        """Test row-by-row diffing equals a whole-frame diff on ragged edges"""
+        rng = np.random.default_rng(3)
+        frame = rng.integers(0, 256, (203, 333, 3), dtype=np.uint8)
+        edited = frame.copy()
+        for _ in range(20):
+            y, x = rng.integers(0, 203), rng.integers(0, 333)
+            edited[y, x] = rng.integers(0, 256, 3)
+        differ = FrameDiffer(tile_size=32, threshold=12)
+        differ.update(frame)
+        mask = differ.update(edited).tile_mask
+        changed = (np.abs(edited.astype(np.int16) - frame.astype(np.int16)).max(axis=2) > 12)
+        padded = np.zeros((7 * 32, 11 * 32), dtype=bool)
+        padded[:203, :333] = changed
+        assert np.array_equal(mask, padded.reshape(7, 32, 11, 32).any(axis=(1, 3)))
+
+    def test_crops_grow_over_cut_elements(self, monkeypatch):
+        """Test elements partly inside a change are re-detected whole"""
+        assert grow_boxes([(64, 64, 32, 32)], [(20, 20, 60, 60), (200, 0, 10, 10)]) == [(20, 20, 76, 76)]
+        assert grow_boxes([(0, 0, 10, 10), (20, 0, 10, 10)], [(5, 0, 20, 5)]) == [(0, 0, 30, 10)]
+
+        analyzer = VisionAnalyzer()
+        differ = FrameDiffer(tile_size=32)
+        shapes = []
+
+        def detect(img_array):
+            shapes.append(img_array.shape[:2])
+            return [VisualElement("face", (20, 20, 60, 60), 0.8)] if len(shapes) == 1 else []
+
+        monkeypatch.setattr(analyzer, "_detect_elements", detect)
+        frame = _screenshot()
+        analyzer.analyze_array(frame, differ=differ)
+        edited = frame.copy()
+        edited[70:90, 70:90] = 0
+        changed = analyzer.analyze_array(edited, differ=differ)
+        assert shapes == [(200, 320), (76, 76)]
+        assert changed.elements == []
+
+
+def _page(seed, width=320, height=200):
+    rng = np.random.default_rng(seed)
+    arr = np.full((height, width, 3), 245, dtype=np.uint8)
+    for _ in range(12):
+        x, y = rng.integers(0, width - 60), rng.integers(0, height - 20)
+        arr[y:y + rng.integers(8, 20), x:x + rng.integers(20, 60)] = rng.integers(0, 200, 3)
+    return arr
+
+@pytest.mark.unit
+class TestPerceptualHash:
+    @pytest.mark.parametrize("method", ["phash", "dhash"])
+    def test_near_duplicates_are_close(self, method):
+        """Test small edits keep hashes close and different pages far apart"""
+        analyzer = VisionAnalyzer()
+        page = _page(1)
+        noisy = np.clip(page.astype(int) + np.random.default_rng(0).integers(-4, 5, page.shape), 0, 255)
+        h = analyzer.perceptual_hash(page, method)
+        assert hamming(h, analyzer.perceptual_hash(noisy.astype(np.uint8), method)) <= 4
+        assert hamming(h, analyzer.perceptual_hash(_page(2), method)) > 10
+        assert 0 <= h < 2 ** 64
+
+    def test_bk_tree_matches_linear_scan(self):
+        """Test BK-tree range queries equal brute force"""
+        rng = np.random.default_rng(5)
+        hashes = [int(v) for v in rng.integers(0, 2 ** 63, 2000, dtype=np.int64)]
+        tree = BKTree()
+        for i, h in enumerate(hashes):
+            tree.add(h, i)
+        for q in hashes[:20]:
+            expected = sorted((hamming(q, h), h, i) for i, h in enumerate(hashes) if hamming(q, h) <= 20)
+            assert sorted(tree.query(q, 20)) == expected
+
+    def test_index_dedup_and_persistence(self, tmp_path):
+        """Test near-duplicate frames are recognized after reload"""
+        path = tmp_path / "index.json"
+        index = ScreenshotIndex(path)
+        assert index.add_if_new(_page(1), "shot-1") is None
+        assert index.add_if_new(_page(2), "shot-2") is None
+        duplicate = _page(1)
+        duplicate[0:2, 0:2] = 0
+        assert index.add_if_new(duplicate, "shot-3")[2] == "shot-1"
+        index.save()
+        reloaded = ScreenshotIndex(path)
+        assert len(reloaded.tree) == 2
+        assert reloaded.lookup(_page(2))[0][2] == "shot-2"
+
+
+def _text_page(lines=((20, 20), (20, 120))):
+    """White page with striped 'text lines' at the given (x, y) offsets"""
+    arr = np.full((200, 320, 3), 255, dtype=np.uint8)
+    for x, y in lines:
+        for col in range(x, x + 160, 4):
+            arr[y:y + 12, col:col + 2] = 0
+    return arr
+
+def _fake_engine(crop, config):
+    """Deterministic stand-in OCR: summarizes the crop's ink"""
+    return f"ink{int((crop < 128).sum())}"
+
+@pytest.mark.unit
+class TestRegionOCR:
+    def test_detects_text_lines_only(self):
+        """Test text regions cover the striped lines and skip blank areas"""
+        boxes = sorted(detect_text_regions(_text_page()), key=lambda b: b[1])
+        assert len(boxes) == 2
+        for (x, y, w, h), line_y in zip(boxes, (20, 120)):
+            assert y <= line_y and y + h >= line_y + 12
+            assert x <= 20 and x + w >= 176
+        assert detect_text_regions(np.full((100, 100, 3), 255, dtype=np.uint8)) == []
+
+    def test_tile_cache_skips_repeated_regions(self):
+        """Test identical tiles are OCRed once across calls and within a batch"""
+        calls = []
+
+        def engine(crop, config):
+            calls.append(crop.shape)
+            return _fake_engine(crop, config)
+
+        ocr = RegionOCR(engine=engine, use_processes=False)
+        page = _text_page()
+        first = ocr.ocr_regions(page)
+        assert len(first) == 2 and len(calls) == 2
+        assert ocr.ocr_regions(page.copy()) == first
+        assert len(calls) == 2 and ocr.hits == 2
+
+        batch = ocr.ocr_batch([(page, None), (page, None)])
+        assert batch == [first, first] and len(calls) == 2
+
+    def test_batch_preserves_per_image_order(self):
+        """Test batch results map back to their own images and boxes"""
+        ocr = RegionOCR(engine=_fake_engine, use_processes=False)
+        a, b = _text_page(), _text_page(lines=((40, 60),))
+        results = ocr.ocr_batch([(a, None), (b, [(0, 0, 10, 10)]), (b, None)])
+        assert [len(r) for r in results] == [2, 1, 1]
+        assert results[1][0] == ((0, 0, 10, 10), "ink0")
+        assert results[2][0][1].startswith("ink") and results[2][0][1] != "ink0"
+
+    def test_analysis_ocrs_only_changed_text(self):
+        """Test streamed frames re-OCR only text regions inside changed tiles"""
+        calls = []
+
+        def engine(crop, config):
+            calls.append(crop.shape)
+            return _fake_engine(crop, config)
+
+        analyzer = VisionAnalyzer()
+        analyzer.ocr_available = True
+        analyzer._region_ocr = RegionOCR(engine=engine, use_processes=False, cache_size=0)
+        differ = FrameDiffer()
+
+        first = analyzer.analyze_array(_text_page(), differ=differ)
+        assert len(first.metadata["text_regions"]) == 2 and len(calls) == 2
+
+        changed = _text_page()
+        for col in range(180, 240, 4):
+            changed[120:132, col:col + 2] = 0  # lengthen the lower line only
+        second = analyzer.analyze_array(changed, differ=differ)
+        assert len(calls) == 3
+        regions = sorted(second.metadata["text_regions"], key=lambda r: r["box"][1])
+        assert regions[0] == sorted(first.metadata["text_regions"], key=lambda r: r["box"][1])[0]
+        assert second.text_content.split("\n")[0] == regions[0]["text"]
+
+
+def _button_page(buttons):
+    arr = np.full((600, 800, 3), 240, dtype=np.uint8)
+    for x, y, w, h in buttons:
+        arr[y:y + h, x:x + w] = (30, 90, 200)
+    return arr
+
+@pytest.mark.unit
+class TestUIElements:
+    def test_nms_keeps_best_of_overlaps(self):
+        """Test overlapping boxes collapse to the highest-scoring one"""
+        boxes = np.array([[0, 0, 100, 40], [4, 2, 100, 40], [300, 0, 50, 20]])
+        keep = nms(boxes, np.array([0.6, 0.9, 0.7]))
+        assert keep.tolist() == [1, 2]
+
+    def test_detects_buttons_from_array_and_path(self, tmp_path):
+        """Test buttons are found in memory and on disk with the same result"""
+        analyzer = VisionAnalyzer()
+        page = _button_page([(40, 40, 120, 36), (300, 40, 80, 30), (40, 200, 200, 60)])
+        index = analyzer.detect_ui_elements(page)
+        assert len(index) == 3
+        for element, (x, y) in zip(index, [(40, 40), (300, 40), (40, 200)]):
+            ex, ey, ew, eh = element.coordinates
+            assert abs(ex - x) <= 4 and abs(ey - y) <= 4
+            assert element.element_type == "button_candidate"
+
+        path = tmp_path / "page.png"
+        Image.fromarray(page).save(path)
+        assert [e.coordinates for e in analyzer.detect_ui_elements(str(path))] == \
+            [e.coordinates for e in index]
+
+    def test_component_labelling_matches_flood_fill(self, monkeypatch):
+        """Test OpenCV component boxes equal the pure-Python flood fill"""
+        pytest.importorskip("cv2")
+        rng = np.random.default_rng(3)
+        mask = rng.random((120, 200)) < 0.45
+        labelled = ui_elements._component_boxes(mask, 2, 397, 239)
+        monkeypatch.setattr(ui_elements, "cv2", None)
+        filled = ui_elements._component_boxes(mask, 2, 397, 239)
+        assert sorted(map(tuple, labelled.tolist())) == sorted(map(tuple, filled.tolist()))
+
+    def test_busy_page_is_not_truncated_and_ordered(self):
+        """Test every button on a busy page is returned in reading order"""
+        buttons = [(20 + col * 96, 20 + row * 56, 64, 28) for row in range(10) for col in range(8)]
+        index = VisionAnalyzer().detect_ui_elements(_button_page(buttons))
+        assert len(index) == 80
+        coords = [e.coordinates for e in index]
+        assert coords == sorted(coords, key=lambda c: (c[1], c[0]))
+
+    def test_spatial_queries(self):
+        """Test point and rectangle lookups against a brute-force scan"""
+        analyzer = VisionAnalyzer()
+        buttons = [(20 + col * 96, 20 + row * 56, 64, 28) for row in range(10) for col in range(8)]
+        index = analyzer.detect_ui_elements(_button_page(buttons))
+
+        hit = index.elements_at(20 + 96 * 3 + 10, 20 + 56 * 2 + 10)
+        assert len(hit) == 1
+        assert abs(hit[0].coordinates[0] - (20 + 96 * 3)) <= 4
+        assert index.elements_at(5, 5) == []
+
+        rect = (0, 0, 300, 200)
+        inside = [e for e in index
+                  if e.coordinates[0] + e.coordinates[2] <= 300 and e.coordinates[1] + e.coordinates[3] <= 200]
+        assert index.elements_in(rect) == inside and len(inside) == 9
+        assert len(index.elements_in(rect, partial=True)) > len(inside)